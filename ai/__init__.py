@@ -6,5 +6,11 @@ Proveedores intercambiables mediante la interfaz AIProvider.
 from ai.base import AIProvider
 from ai.gemini_provider import GeminiProvider
 from ai.static_provider import StaticProvider
+from ai.rate_limiter import TokenBucket
+from ai.retry import CircuitBreaker
+from ai.response_cache import RespuestaCache
 
-__all__ = ["AIProvider", "GeminiProvider", "StaticProvider"]
+__all__ = [
+    "AIProvider", "GeminiProvider", "StaticProvider", "TokenBucket", "CircuitBreaker",
+    "RespuestaCache",
+]
@@ -13,13 +13,15 @@ class AIProvider(ABC):
     """Interfaz común para todos los proveedores de IA del proyecto."""
 
     @abstractmethod
-    def generate(self, prompt: str, max_tokens: int = 1000) -> str:
+    def generate(self, prompt: str, max_tokens: int = 1000, system: str | None = None) -> str:
         """
         Genera texto a partir de un prompt.
 
         Args:
-            prompt: Texto de entrada.
+            prompt: Texto de entrada (datos variables de la solicitud).
             max_tokens: Límite de tokens en la respuesta.
+            system: Instrucción de sistema fija (rol y formato), enviada
+                antes del prompt para que el proveedor pueda cachear el prefijo.
 
         Returns:
             Texto generado por el modelo.
@@ -1,13 +1,90 @@
 """
-Proveedor de IA: Google Gemini (tier gratuito — 60 req/min).
+Proveedor de IA: Google Gemini (cuota configurable con GEMINI_RPM / GEMINI_TPM;
+por defecto 15 req/min, el tier gratuito de Flash).
 """
 
 from __future__ import annotations
 
+import asyncio
+import importlib.util
 import os
+import re
+import threading
+import time
+from functools import lru_cache
+from typing import Iterator
 from ai.base import AIProvider
+from ai.rate_limiter import TokenBucket, es_error_cuota, segundos_de_espera
+from ai.retry import calcular_espera, es_reintentable
 
-_ERROR_MARKERS = ("No se pudo generar", "RESOURCE_EXHAUSTED")
+# Textos que delatan una respuesta de error en lugar de un análisis
+_RE_ERROR = re.compile(r"No se pudo generar|RESOURCE_EXHAUSTED")
+
+# Solicitudes simultáneas como máximo en generate_many
+MAX_CONCURRENCIA = 4
+
+# Reintentos ante errores transitorios (429, 5xx, red). Cada llamada tiene
+# ESPERA_MAXIMA segundos en total para turnos del limitador y esperas entre
+# intentos: en la UI es preferible caer al análisis estático que dejar al
+# usuario esperando un minuto. Las pausas largas que pida el servidor
+# (cuota diaria agotada) quedan para generar_analisis.py
+MAX_INTENTOS = 4
+ESPERA_MAXIMA = 20.0
+
+# Cuota del modelo compartida por todas las instancias del proceso: las
+# llamadas esperan turno en lugar de recibir un 429 del servidor
+LIMITADOR = TokenBucket(
+    rpm=float(os.environ.get("GEMINI_RPM", "15")),
+    tpm=float(os.environ.get("GEMINI_TPM", "1000000")),
+)
+
+
+@lru_cache(maxsize=4)
+def crear_cliente_genai(api_key: str):
+    """
+    Crea un genai.Client con pool de conexiones keep-alive (y HTTP/2 cuando
+    el paquete h2 está instalado), de modo que las llamadas sucesivas
+    reutilizan la misma sesión TCP+TLS. Si la versión de google-genai no
+    admite argumentos del cliente HTTP, retorna un cliente estándar.
+
+    Memoizado por API key: el SDK se importa y el cliente se configura una
+    sola vez por proceso, y todas las instancias comparten el pool.
+    """
+    from google import genai  # type: ignore
+    import httpx
+
+    args = {
+        "limits": httpx.Limits(max_keepalive_connections=16, keepalive_expiry=300.0),
+    }
+    if importlib.util.find_spec("h2") is not None:
+        args["http2"] = True
+    try:
+        return genai.Client(
+            api_key=api_key,
+            http_options={"client_args": args, "async_client_args": args},
+        )
+    except Exception:
+        return genai.Client(api_key=api_key)
+
+
+_bucle: asyncio.AbstractEventLoop | None = None
+_bucle_lock = threading.Lock()
+
+
+def _bucle_fondo() -> asyncio.AbstractEventLoop:
+    """
+    Event loop del proceso para generate_many, vivo en un hilo daemon.
+    El cliente aio del SDK (memoizado en crear_cliente_genai) guarda sus
+    conexiones keep-alive atadas al loop en que se abrieron: con un
+    asyncio.run por lote, el segundo lote reutilizaría conexiones de un
+    loop ya cerrado ("Event loop is closed").
+    """
+    global _bucle
+    with _bucle_lock:
+        if _bucle is None:
+            _bucle = asyncio.new_event_loop()
+            threading.Thread(target=_bucle.run_forever, name="gemini-aio", daemon=True).start()
+        return _bucle
 
 
 class GeminiProvider(AIProvider):
@@ -15,21 +92,26 @@ class GeminiProvider(AIProvider):
     Implementación de AIProvider usando Google Gemini 2.0 Flash.
     La API key se lee de la variable de entorno GOOGLE_API_KEY
     o de st.secrets (cuando se ejecuta en Streamlit Cloud).
+    Con `model=GeminiProvider.MODEL_LIGERO` usa Flash-Lite, más rápido y
+    económico para textos cortos sobre pocos datos.
     """
 
     MODEL = "models/gemini-2.0-flash"
+    MODEL_LIGERO = "models/gemini-2.0-flash-lite"
+    # Temperatura baja: análisis sobre datos, no redacción creativa; además
+    # hace las respuestas más estables para la caché de respuestas
+    TEMPERATURE = 0.3
 
-    def __init__(self) -> None:
+    def __init__(self, model: str | None = None) -> None:
+        self.model = model or self.MODEL
         self._client = None
         self._init_client()
 
     def _init_client(self) -> None:
         try:
-            from google import genai  # type: ignore
-
             api_key = os.environ.get("GOOGLE_API_KEY") or self._key_from_secrets()
             if api_key:
-                self._client = genai.Client(api_key=api_key)
+                self._client = crear_cliente_genai(api_key)
         except Exception:
             self._client = None
 
@@ -44,18 +126,184 @@ class GeminiProvider(AIProvider):
     def is_available(self) -> bool:
         return self._client is not None
 
-    def generate(self, prompt: str, max_tokens: int = 1000) -> str:
+    @classmethod
+    def _config(cls, max_tokens: int, system: str | None) -> dict:
+        config = {"max_output_tokens": max_tokens, "temperature": cls.TEMPERATURE}
+        if system:
+            config["system_instruction"] = system
+        return config
+
+    @staticmethod
+    def _texto(response) -> str:
+        try:
+            text = response.text or ""
+        except Exception:
+            return ""
+        if _RE_ERROR.search(text):
+            return ""
+        return text
+
+    @staticmethod
+    def _tokens_estimados(prompt: str, max_tokens: int, system: str | None) -> int:
+        """Aproximación de ~4 caracteres por token más la salida máxima."""
+        return (len(prompt) + len(system or "")) // 4 + max_tokens
+
+    @staticmethod
+    def _registrar_uso(response, estimados: int) -> None:
+        """Devuelve al limitador los tokens reservados de más."""
+        uso = getattr(response, "usage_metadata", None)
+        usados = getattr(uso, "total_token_count", None)
+        if usados:
+            LIMITADOR.reembolsar(estimados - usados)
+
+    @staticmethod
+    def _registrar_error(exc: BaseException) -> None:
+        """
+        Ante un 429 se pausa el limitador el tiempo que indique el servidor,
+        como mucho ESPERA_MAXIMA: un retry-after de horas (cuota diaria) no
+        debe dejar la aplicación sin análisis durante todo ese tiempo.
+        """
+        if es_error_cuota(exc):
+            LIMITADOR.pausar(min(segundos_de_espera(exc, por_defecto=60.0), ESPERA_MAXIMA))
+
+    @staticmethod
+    def _restante(limite: float) -> float:
+        """Segundos que quedan del presupuesto de la llamada."""
+        return max(0.0, limite - time.monotonic())
+
+    @staticmethod
+    def _espera_reintento(exc: BaseException, intento: int, limite: float) -> float | None:
+        """
+        Segundos antes del siguiente intento (backoff exponencial con jitter,
+        o el retry-after del servidor en un 429), o None si no se reintenta
+        o la espera no cabe en el presupuesto de la llamada (`limite`).
+        En errores de cuota la espera se aplica como pausa del limitador,
+        de modo que las demás llamadas en vuelo también la respetan.
+        """
+        if not es_reintentable(exc) or intento >= MAX_INTENTOS - 1:
+            return None
+        espera = min(calcular_espera(exc, intento), ESPERA_MAXIMA)
+        if time.monotonic() + espera > limite:
+            return None
+        if es_error_cuota(exc):
+            LIMITADOR.pausar(espera)
+            return 0.0
+        return espera
+
+    def generate(self, prompt: str, max_tokens: int = 1000, system: str | None = None) -> str:
         if not self.is_available():
             return ""
+        estimados = self._tokens_estimados(prompt, max_tokens, system)
+        limite = time.monotonic() + ESPERA_MAXIMA
+        for intento in range(MAX_INTENTOS):
+            if not LIMITADOR.acquire(estimados, timeout=self._restante(limite)):
+                return ""
+            try:
+                response = self._client.models.generate_content(
+                    model=self.model,
+                    contents=prompt,
+                    config=self._config(max_tokens, system),
+                )
+            except Exception as e:
+                espera = self._espera_reintento(e, intento, limite)
+                if espera is None:
+                    self._registrar_error(e)
+                    return ""
+                time.sleep(espera)
+                continue
+            self._registrar_uso(response, estimados)
+            return self._texto(response)
+        return ""
+
+    def generate_stream(
+        self,
+        prompt: str,
+        max_tokens: int = 1000,
+        system: str | None = None,
+    ) -> Iterator[str]:
+        """
+        Igual que generate pero entrega el texto por fragmentos a medida que
+        el modelo los produce. A diferencia de generate, un fallo se propaga
+        (tras pausar el limitador si es de cuota): el consumidor puede haber
+        recibido ya parte del texto y debe saber que quedó incompleto.
+        Si el limitador no da turno en ESPERA_MAXIMA no entrega nada.
+        """
+        if not self.is_available():
+            return
+        estimados = self._tokens_estimados(prompt, max_tokens, system)
+        if not LIMITADOR.acquire(estimados, timeout=ESPERA_MAXIMA):
+            return
+        ultimo = None
         try:
-            response = self._client.models.generate_content(
-                model=self.MODEL,
+            for chunk in self._client.models.generate_content_stream(
+                model=self.model,
                 contents=prompt,
-                config={"max_output_tokens": max_tokens, "temperature": 0.7},
-            )
-            text = response.text or ""
-            if any(m in text for m in _ERROR_MARKERS):
-                return ""
-            return text
-        except Exception:
+                config=self._config(max_tokens, system),
+            ):
+                ultimo = chunk
+                texto = self._texto(chunk)
+                if texto:
+                    yield texto
+        except Exception as e:
+            self._registrar_error(e)
+            raise
+        if ultimo is not None:
+            # El último fragmento trae el uso total de la solicitud
+            self._registrar_uso(ultimo, estimados)
+
+    async def generate_async(
+        self,
+        prompt: str,
+        max_tokens: int = 1000,
+        system: str | None = None,
+    ) -> str:
+        """Versión asíncrona de generate (cliente aio del SDK)."""
+        if not self.is_available():
             return ""
+        estimados = self._tokens_estimados(prompt, max_tokens, system)
+        limite = time.monotonic() + ESPERA_MAXIMA
+        for intento in range(MAX_INTENTOS):
+            if not await LIMITADOR.acquire_async(estimados, timeout=self._restante(limite)):
+                return ""
+            try:
+                response = await self._client.aio.models.generate_content(
+                    model=self.model,
+                    contents=prompt,
+                    config=self._config(max_tokens, system),
+                )
+            except Exception as e:
+                espera = self._espera_reintento(e, intento, limite)
+                if espera is None:
+                    self._registrar_error(e)
+                    return ""
+                await asyncio.sleep(espera)
+                continue
+            self._registrar_uso(response, estimados)
+            return self._texto(response)
+        return ""
+
+    def generate_many(
+        self,
+        solicitudes: list[tuple[str, str | None, int]],
+        concurrencia: int = MAX_CONCURRENCIA,
+    ) -> list[str]:
+        """
+        Resuelve varias solicitudes (prompt, system, max_tokens) en paralelo,
+        con a lo sumo `concurrencia` en vuelo. El tiempo total es el de la
+        más lenta en lugar de la suma. Conserva el orden de entrada.
+        Las corrutinas corren siempre en el loop persistente de _bucle_fondo.
+        """
+        if not self.is_available() or not solicitudes:
+            return [""] * len(solicitudes)
+
+        async def _todas() -> list[str]:
+            semaforo = asyncio.Semaphore(concurrencia)
+
+            async def _una(prompt: str, system: str | None, max_tokens: int) -> str:
+                async with semaforo:
+                    return await self.generate_async(prompt, max_tokens, system)
+
+            return await asyncio.gather(*(_una(*sol) for sol in solicitudes))
+
+        futuro = asyncio.run_coroutine_threadsafe(_todas(), _bucle_fondo())
+        return list(futuro.result())
@@ -6,6 +6,10 @@ sin tocar la lógica de negocio.
 
 from __future__ import annotations
 
+import unicodedata
+from functools import lru_cache
+from string import Template
+
 # Contexto institucional por línea estratégica — da al modelo el "para qué"
 # de cada línea y evita análisis genéricos sin referencia real.
 _CONTEXTO_LINEA: dict[str, str] = {
@@ -36,9 +40,9 @@ _CONTEXTO_LINEA: dict[str, str] = {
 }
 
 
+@lru_cache(maxsize=64)
 def _ctx_linea(nombre: str) -> str:
     """Retorna el contexto institucional de la línea (insensible a acentos)."""
-    import unicodedata
     n = unicodedata.normalize("NFD", nombre.lower()).encode("ascii", "ignore").decode().strip()
     for key, ctx in _CONTEXTO_LINEA.items():
         if key in n or n in key:
@@ -46,54 +50,20 @@ def _ctx_linea(nombre: str) -> str:
     return "representa una dimensión estratégica del PDI 2022-2025."
 
 
-def prompt_analisis_general(
-    metricas: dict,
-    lineas_texto: str,
-    lineas_detalle: list[dict] | None = None,
-) -> str:
-    """
-    Prompt para resumen ejecutivo global del PDI.
-    lineas_detalle: lista de {linea, cumplimiento, indicadores, cumplidos, atencion}
-    """
-    año = metricas.get("año_actual", 2025)
-    cumpl_prom = metricas.get("cumplimiento_promedio", 0)
-    total = metricas.get("total_indicadores", 0)
-    cumplidos = metricas.get("indicadores_cumplidos", 0)
-    en_prog = metricas.get("en_progreso", 0)
-    no_cumpl = metricas.get("no_cumplidos", 0)
-    pct_cumpl = round(cumplidos / total * 100, 1) if total else 0
+# ---------------------------------------------------------------------------
+# Instrucciones de sistema
+# ---------------------------------------------------------------------------
+# El texto fijo (rol e instrucciones de redacción) va como instrucción de
+# sistema, idéntica en todas las llamadas del mismo tipo; el mensaje de
+# usuario solo lleva los datos. Así el prefijo común queda al inicio de la
+# solicitud y el proveedor puede reutilizarlo (caché de prefijo) entre llamadas.
+_PREAMBULO = "Eres analista estratégico del Politécnico Grancolombiano."
 
-    # Construir ranking con contexto
-    ranking_txt = ""
-    if lineas_detalle:
-        ordenadas = sorted(lineas_detalle, key=lambda x: x.get("cumplimiento", 0), reverse=True)
-        mejor = ordenadas[0] if ordenadas else None
-        peor  = ordenadas[-1] if len(ordenadas) > 1 else None
-        ranking_txt = "\n**Ranking de líneas (mejor → peor):**\n"
-        for ld in ordenadas:
-            nom = ld.get("linea", "")
-            p   = ld.get("cumplimiento", 0)
-            ni  = ld.get("indicadores", 0)
-            nc  = ld.get("cumplidos", 0)
-            na  = ld.get("atencion", 0)
-            gap = round(100 - p, 1) if p < 100 else 0
-            ranking_txt += (
-                f"  • {nom}: {p:.1f}% | {nc}/{ni} cumplidos"
-                + (f" | {na} en atención" if na else "")
-                + (f" | brecha {gap}pp" if gap > 0 else " | META SUPERADA")
-                + "\n"
-            )
-
-    return f"""Eres analista estratégico del Politécnico Grancolombiano. \
-Redacta un resumen ejecutivo del PDI {año} usando EXCLUSIVAMENTE los datos reales provistos. \
+SISTEMA_GENERAL = f"""{_PREAMBULO} \
+Redacta un resumen ejecutivo del PDI del año indicado usando EXCLUSIVAMENTE los datos reales provistos. \
 Nunca uses frases genéricas como "se evidencia un avance satisfactorio" o "se recomienda fortalecer". \
 Cada oración debe citar un número o nombre concreto.
 
-**Datos del PDI {año}:**
-- Cumplimiento promedio: {cumpl_prom:.1f}%
-- Total indicadores: {total} | Cumplidos (≥100%): {cumplidos} ({pct_cumpl}%) | \
-En progreso (80–99%): {en_prog} | Requieren atención (<80%): {no_cumpl}
-{lineas_texto}{ranking_txt}
 **Instrucciones de redacción:**
 Escribe exactamente 3 párrafos sin títulos, sin viñetas, sin markdown, en español:
 
@@ -108,24 +78,9 @@ PÁRRAFO 3 (cierre ejecutivo): Una sola acción prioritaria para el trimestre si
 vinculada al indicador o línea con mayor brecha. Menciona el nombre exacto y el gap numérico. \
 Evita frases vagas — propón qué medir o ajustar, no solo "mejorar"."""
 
+SISTEMA_LINEA = f"""{_PREAMBULO}
 
-def prompt_analisis_linea(
-    nombre_linea: str,
-    total_indicadores: int,
-    cumplimiento_promedio: float,
-    objetivos_texto: str,
-    indicadores_section: str = "",
-) -> str:
-    ctx = _ctx_linea(nombre_linea)
-    return f"""Eres analista estratégico del Politécnico Grancolombiano. \
-La línea "{nombre_linea}" {ctx}
-
-Cumplimiento promedio de la línea: {cumplimiento_promedio:.1f}% sobre {total_indicadores} indicadores.
-
-**Indicadores con sus datos reales:**
-{indicadores_section}
-
-**Instrucción:** Genera UN insight de 1 a 2 oraciones por cada indicador listado arriba. \
+**Instrucción:** Genera UN insight de 1 a 2 oraciones por cada indicador listado en los datos. \
 Formato exacto por indicador (sin asteriscos, sin markdown, en español):
 
 [Nombre exacto del indicador]: [insight específico que mencione su cumplimiento, \
@@ -141,6 +96,122 @@ Reglas:
 Usa verbos directos: ajustar, revisar, escalar, reducir, mantener, cerrar brecha.
 - No escribas un párrafo introductorio ni cierre. Solo la lista de indicadores con sus insights."""
 
+SISTEMA_INDICADOR = f"""{_PREAMBULO}
+
+Escribe un análisis de máximo 110 palabras en español, sin markdown, sin títulos. \
+Prohibido usar frases genéricas. Cada oración debe citar un dato numérico concreto del \
+histórico. Incluye obligatoriamente:
+1. Evolución del cumplimiento citando al menos dos años con sus valores.
+2. Brecha concreta del último período (meta − ejecución como número absoluto).
+3. Una recomendación accionable que mencione una cifra objetivo para el próximo período."""
+
+
+# Límite de salida acorde a la extensión pedida en cada instrucción (en
+# español ~2 tokens por palabra, con margen para no cortar la última frase)
+MAX_TOKENS_GENERAL = 600     # 3 párrafos
+MAX_TOKENS_LINEA = 1200      # 1–2 oraciones por indicador de la línea
+MAX_TOKENS_INDICADOR = 300   # máximo 110 palabras
+
+
+# ---------------------------------------------------------------------------
+# Mensajes de usuario (solo datos)
+# ---------------------------------------------------------------------------
+# Plantillas compiladas una vez al importar; cada llamada solo sustituye
+# los valores ya formateados.
+_TPL_GENERAL = Template("""**Datos del PDI $anio:**
+- Cumplimiento promedio: $cumpl_prom%
+- Total indicadores: $total | Cumplidos (≥100%): $cumplidos ($pct_cumpl%) | \
+En progreso (80–99%): $en_prog | Requieren atención (<80%): $no_cumpl
+$lineas_texto$ranking_txt""")
+
+_TPL_LINEA = Template("""La línea "$nombre_linea" $ctx
+
+Cumplimiento promedio de la línea: $cumplimiento% sobre $total_indicadores indicadores.
+
+**Indicadores con sus datos reales:**
+$indicadores_section""")
+
+_TPL_INDICADOR = Template("""La línea "$linea" $ctx
+
+**Indicador:** $nombre_indicador
+**Sentido:** $sentido — positivo si $direccion
+**Descripción:** $descripcion
+
+**Serie histórica (CSV; * = línea base):**
+$historico_texto
+
+**Tendencia calculada:** $tendencia (variación $variacion pp en el periodo, ajuste lineal)""")
+
+
+def prompt_analisis_general(
+    metricas: dict,
+    lineas_texto: str,
+    lineas_detalle: list[dict] | None = None,
+) -> str:
+    """
+    Datos para el resumen ejecutivo global del PDI (usar con SISTEMA_GENERAL).
+    lineas_detalle: lista de {linea, cumplimiento, indicadores, cumplidos, atencion}
+    """
+    año = metricas.get("año_actual", 2025)
+    cumpl_prom = metricas.get("cumplimiento_promedio", 0)
+    total = metricas.get("total_indicadores", 0)
+    cumplidos = metricas.get("indicadores_cumplidos", 0)
+    en_prog = metricas.get("en_progreso", 0)
+    no_cumpl = metricas.get("no_cumplidos", 0)
+    pct_cumpl = round(cumplidos / total * 100, 1) if total else 0
+
+    # Construir ranking con contexto
+    ranking_txt = ""
+    if lineas_detalle:
+        ordenadas = sorted(lineas_detalle, key=lambda x: x.get("cumplimiento", 0), reverse=True)
+        ranking_txt = "\n**Ranking de líneas (mejor → peor):**\n" + "".join(
+            _fila_ranking(ld) for ld in ordenadas
+        )
+
+    return _TPL_GENERAL.substitute(
+        anio=año,
+        cumpl_prom=f"{cumpl_prom:.1f}",
+        total=total,
+        cumplidos=cumplidos,
+        pct_cumpl=pct_cumpl,
+        en_prog=en_prog,
+        no_cumpl=no_cumpl,
+        lineas_texto=lineas_texto,
+        ranking_txt=ranking_txt,
+    )
+
+
+def _fila_ranking(ld: dict) -> str:
+    nom = ld.get("linea", "")
+    p   = ld.get("cumplimiento", 0)
+    ni  = ld.get("indicadores", 0)
+    nc  = ld.get("cumplidos", 0)
+    na  = ld.get("atencion", 0)
+    gap = round(100 - p, 1) if p < 100 else 0
+    return (
+        f"  • {nom}: {p:.1f}% | {nc}/{ni} cumplidos"
+        + (f" | {na} en atención" if na else "")
+        + (f" | brecha {gap}pp" if gap > 0 else " | META SUPERADA")
+        + "\n"
+    )
+
+
+def prompt_analisis_linea(
+    nombre_linea: str,
+    total_indicadores: int,
+    cumplimiento_promedio: float,
+    objetivos_texto: str,
+    indicadores_section: str = "",
+) -> str:
+    """Datos de una línea estratégica (usar con SISTEMA_LINEA)."""
+    return _TPL_LINEA.substitute(
+        nombre_linea=nombre_linea,
+        ctx=_ctx_linea(nombre_linea),
+        cumplimiento=f"{cumplimiento_promedio:.1f}",
+        total_indicadores=total_indicadores,
+        indicadores_section=indicadores_section,
+    )
+
 
 def prompt_analisis_indicador(
     nombre_indicador: str,
@@ -151,22 +222,15 @@ def prompt_analisis_indicador(
     variacion: float,
     sentido: str,
 ) -> str:
-    ctx = _ctx_linea(linea)
-    return f"""Eres analista estratégico del Politécnico Grancolombiano. \
-La línea "{linea}" {ctx}
-
-**Indicador:** {nombre_indicador}
-**Sentido:** {sentido} — positivo si {'aumenta' if sentido == 'Creciente' else 'disminuye'}
-**Descripción:** {descripcion or 'No disponible'}
-
-**Serie histórica (año: meta → ejecución → cumplimiento%):**
-{historico_texto}
-
-**Tendencia calculada:** {tendencia} (variación {variacion:+.1f} pp desde línea base)
-
-Escribe un análisis de máximo 110 palabras en español, sin markdown, sin títulos. \
-Prohibido usar frases genéricas. Cada oración debe citar un dato numérico concreto del \
-histórico. Incluye obligatoriamente:
-1. Evolución del cumplimiento citando al menos dos años con sus valores.
-2. Brecha concreta del último período (meta − ejecución como número absoluto).
-3. Una recomendación accionable que mencione una cifra objetivo para el próximo período."""
+    """Datos de un indicador y su serie histórica (usar con SISTEMA_INDICADOR)."""
+    return _TPL_INDICADOR.substitute(
+        linea=linea,
+        ctx=_ctx_linea(linea),
+        nombre_indicador=nombre_indicador,
+        sentido=sentido,
+        direccion="aumenta" if sentido == "Creciente" else "disminuye",
+        descripcion=descripcion or "No disponible",
+        historico_texto=historico_texto,
+        tendencia=tendencia,
+        variacion=f"{variacion:+.1f}",
+    )
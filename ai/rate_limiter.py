@@ -0,0 +1,139 @@
+"""
+Limitador de tasa tipo token bucket para las llamadas a proveedores de IA.
+
+Mantiene dos cubetas que se recargan de forma continua: solicitudes por
+minuto (RPM) y tokens por minuto (TPM). Una llamada espera solo lo necesario
+para que ambas tengan capacidad, en lugar de dormir un tiempo fijo.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import re
+import threading
+import time
+from typing import Optional
+
+# "retry in 23.5s", "retryDelay': '23s'", "Retry-After: 30"
+_RE_ESPERA = re.compile(
+    r"retry(?:[ _-]?after|delay|\s+in)['\"]?\s*[:=]?\s*['\"]?(\d+(?:\.\d+)?)\s*s?",
+    re.IGNORECASE,
+)
+
+
+class TokenBucket:
+    """
+    Cubetas de solicitudes (rpm) y tokens (tpm) con recarga proporcional
+    al tiempo transcurrido. Segura para hilos; ofrece variante asíncrona.
+    """
+
+    def __init__(self, rpm: float, tpm: Optional[float] = None) -> None:
+        self.rpm = float(rpm)
+        self.tpm = float(tpm) if tpm else None
+        self._solicitudes = self.rpm
+        self._tokens = self.tpm or 0.0
+        self._ultimo = time.monotonic()
+        self._pausa_hasta = 0.0
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # API pública
+    # ------------------------------------------------------------------
+    def acquire(self, tokens: int = 0, timeout: Optional[float] = None) -> bool:
+        """
+        Espera hasta que haya capacidad y la consume. Con `timeout` no espera
+        más de esos segundos: si la capacidad (o el fin de una pausa) llega
+        después, retorna False de inmediato sin consumir nada.
+        """
+        limite = None if timeout is None else time.monotonic() + timeout
+        while True:
+            espera = self._intentar_consumir(tokens)
+            if espera <= 0:
+                return True
+            if limite is not None and time.monotonic() + espera > limite:
+                return False
+            time.sleep(espera)
+
+    async def acquire_async(self, tokens: int = 0, timeout: Optional[float] = None) -> bool:
+        """Versión asíncrona de acquire (no bloquea el event loop)."""
+        limite = None if timeout is None else time.monotonic() + timeout
+        while True:
+            espera = self._intentar_consumir(tokens)
+            if espera <= 0:
+                return True
+            if limite is not None and time.monotonic() + espera > limite:
+                return False
+            await asyncio.sleep(espera)
+
+    def reembolsar(self, tokens: int) -> None:
+        """Devuelve tokens estimados de más una vez conocido el uso real."""
+        if self.tpm is None or tokens <= 0:
+            return
+        with self._lock:
+            self._tokens = min(self.tpm, self._tokens + tokens)
+
+    def pausar(self, segundos: float) -> None:
+        """Detiene todas las adquisiciones (p. ej. tras un 429 con retry-after)."""
+        with self._lock:
+            self._pausa_hasta = max(self._pausa_hasta, time.monotonic() + segundos)
+
+    # ------------------------------------------------------------------
+    # Internos
+    # ------------------------------------------------------------------
+    def _recargar(self, ahora: float) -> None:
+        transcurrido = ahora - self._ultimo
+        self._ultimo = ahora
+        self._solicitudes = min(self.rpm, self._solicitudes + transcurrido * self.rpm / 60)
+        if self.tpm is not None:
+            self._tokens = min(self.tpm, self._tokens + transcurrido * self.tpm / 60)
+
+    def _intentar_consumir(self, tokens: int) -> float:
+        """Consume si hay capacidad (retorna 0) o retorna los segundos a esperar."""
+        with self._lock:
+            ahora = time.monotonic()
+            if ahora < self._pausa_hasta:
+                return self._pausa_hasta - ahora
+            self._recargar(ahora)
+
+            faltan_sol = 1 - self._solicitudes
+            espera = max(0.0, faltan_sol * 60 / self.rpm)
+            if self.tpm is not None:
+                # Una solicitud mayor que la capacidad se limita a la capacidad
+                necesarios = min(tokens, self.tpm)
+                espera = max(espera, (necesarios - self._tokens) * 60 / self.tpm)
+
+            if espera > 0:
+                return espera
+            self._solicitudes -= 1
+            if self.tpm is not None:
+                self._tokens -= min(tokens, self.tpm)
+            return 0.0
+
+
+def segundos_de_espera(exc: BaseException, por_defecto: float) -> float:
+    """
+    Extrae el tiempo de espera sugerido por el servidor en un error de cuota:
+    primero el encabezado Retry-After de la respuesta HTTP y, si no existe,
+    el valor retryDelay incluido en el mensaje. Si no hay dato, `por_defecto`.
+    """
+    respuesta = getattr(exc, "response", None)
+    encabezados = getattr(respuesta, "headers", None)
+    if encabezados is not None:
+        try:
+            valor = encabezados.get("retry-after")
+            if valor is not None:
+                return float(valor)
+        except (TypeError, ValueError):
+            pass
+    m = _RE_ESPERA.search(str(exc))
+    if m:
+        return float(m.group(1))
+    return por_defecto
+
+
+def es_error_cuota(exc: BaseException) -> bool:
+    """True si la excepción corresponde a un 429 / RESOURCE_EXHAUSTED."""
+    if getattr(exc, "code", None) == 429:
+        return True
+    texto = str(exc)
+    return "429" in texto or "RESOURCE_EXHAUSTED" in texto
@@ -0,0 +1,101 @@
+"""
+Caché persistente de respuestas de IA en SQLite.
+
+La clave es el SHA-256 de la solicitud completa (modelo, instrucción de
+sistema, prompt y parámetros de generación), de modo que una misma
+consulta no vuelve a llamar a la API mientras la entrada no expire y el
+resultado sobrevive a reinicios del proceso de Streamlit.
+
+Los prompts formatean las métricas con un decimal, así que variaciones
+menores en los datos producen el mismo texto y reutilizan la respuesta.
+Solo se guardan respuestas reales del modelo: los textos de respaldo y
+los fallos nunca quedan en caché.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+
+def clave_respuesta(modelo: str, prompt: str, **parametros) -> str:
+    """SHA-256 estable de la solicitud (parámetros ordenados por nombre)."""
+    datos = {"modelo": modelo, "prompt": prompt, **parametros}
+    serializado = json.dumps(datos, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(serializado.encode("utf-8")).hexdigest()
+
+
+class RespuestaCache:
+    """
+    Almacén clave → texto con expiración (`ttl` en segundos). Cualquier
+    error de SQLite (disco de solo lectura, archivo bloqueado) se trata
+    como un fallo de caché: la aplicación sigue funcionando sin ella.
+    """
+
+    def __init__(self, path: Path, ttl: float = 86400.0) -> None:
+        self.path = Path(path)
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=5.0)
+            # WAL: varios procesos (workers de Streamlit) pueden
+            # leer mientras otro escribe, sin bloquearse entre sí
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS respuestas ("
+                " clave TEXT PRIMARY KEY, texto TEXT NOT NULL, creado REAL NOT NULL)"
+            )
+            # Las entradas expiradas no se vuelven a leer: se purgan al abrir
+            self._conn.execute(
+                "DELETE FROM respuestas WHERE creado < ?", (time.time() - self.ttl,)
+            )
+            self._conn.commit()
+        except (OSError, sqlite3.Error):
+            self._conn = None
+
+    def get(self, clave: str) -> Optional[str]:
+        """Texto guardado para `clave`, o None si no existe o ya expiró."""
+        if self._conn is None:
+            return None
+        try:
+            with self._lock:
+                fila = self._conn.execute(
+                    "SELECT texto, creado FROM respuestas WHERE clave = ?", (clave,)
+                ).fetchone()
+        except sqlite3.Error:
+            return None
+        if fila is None or time.time() - fila[1] > self.ttl:
+            return None
+        return fila[0]
+
+    def limpiar(self) -> None:
+        """Borra todas las respuestas (p. ej. para regenerar los análisis)."""
+        if self._conn is None:
+            return
+        try:
+            with self._lock:
+                self._conn.execute("DELETE FROM respuestas")
+                self._conn.commit()
+        except sqlite3.Error:
+            pass
+
+    def set(self, clave: str, texto: str) -> None:
+        if self._conn is None or not texto:
+            return
+        try:
+            with self._lock:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO respuestas (clave, texto, creado) VALUES (?, ?, ?)",
+                    (clave, texto, time.time()),
+                )
+                self._conn.commit()
+        except sqlite3.Error:
+            pass
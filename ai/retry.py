@@ -0,0 +1,94 @@
+"""
+Política de reintentos para llamadas a proveedores de IA:
+backoff exponencial con jitter completo, respeto del retry-after del servidor
+y circuit breaker para dejar de llamar durante una caída del proveedor.
+"""
+
+from __future__ import annotations
+
+import random
+import threading
+import time
+
+from ai.rate_limiter import es_error_cuota, segundos_de_espera
+
+# Códigos HTTP que no mejoran reintentando (petición o credenciales inválidas)
+_CODIGOS_DEFINITIVOS = {400, 401, 403, 404}
+_CODIGOS_TRANSITORIOS = {408, 429, 500, 502, 503, 504}
+_MARCAS_TRANSITORIAS = ("UNAVAILABLE", "INTERNAL", "DEADLINE_EXCEEDED", "RESOURCE_EXHAUSTED")
+
+
+def _codigo_http(exc: BaseException) -> int | None:
+    codigo = getattr(exc, "code", None) or getattr(exc, "status_code", None)
+    return codigo if isinstance(codigo, int) else None
+
+
+def es_reintentable(exc: BaseException) -> bool:
+    """True para errores transitorios: cuota, 5xx, timeouts y fallos de red."""
+    codigo = _codigo_http(exc)
+    if codigo in _CODIGOS_DEFINITIVOS:
+        return False
+    if codigo in _CODIGOS_TRANSITORIOS:
+        return True
+    if isinstance(exc, (ConnectionError, TimeoutError)):
+        return True
+    texto = str(exc)
+    return es_error_cuota(exc) or any(m in texto for m in _MARCAS_TRANSITORIAS)
+
+
+def espera_backoff(intento: int, base: float = 1.0, tope: float = 60.0) -> float:
+    """Backoff exponencial con jitter completo: uniforme en [0, min(tope, base·2^intento)]."""
+    return random.uniform(0, min(tope, base * 2 ** intento))
+
+
+def calcular_espera(exc: BaseException, intento: int) -> float:
+    """
+    Segundos a esperar antes del siguiente intento. En errores de cuota se
+    usa el tiempo indicado por el servidor más hasta un 50 % de jitter, para
+    que los workers no reintenten todos en el mismo instante.
+    """
+    if es_error_cuota(exc):
+        espera = segundos_de_espera(exc, por_defecto=0.0)
+        if espera > 0:
+            return espera + random.uniform(0, 0.5 * espera)
+    return espera_backoff(intento)
+
+
+class CircuitBreaker:
+    """
+    Abre el circuito tras `umbral_fallos` fallos consecutivos; mientras está
+    abierto (`tiempo_reapertura` segundos) las llamadas deben fallar localmente
+    sin tocar la red. Pasado ese tiempo vuelven a admitirse llamadas (no solo
+    una: todas las que lleguen mientras tanto pasan); el contador de fallos
+    se conserva, así que el primer éxito cierra el circuito y el primer fallo
+    lo abre de nuevo otros `tiempo_reapertura` segundos.
+    """
+
+    def __init__(self, umbral_fallos: int = 5, tiempo_reapertura: float = 60.0) -> None:
+        self.umbral_fallos = umbral_fallos
+        self.tiempo_reapertura = tiempo_reapertura
+        self._fallos = 0
+        self._abierto_desde: float | None = None
+        self._lock = threading.Lock()
+
+    def esta_abierto(self) -> bool:
+        return self.tiempo_para_cerrar() > 0
+
+    def tiempo_para_cerrar(self) -> float:
+        """Segundos que faltan para admitir la siguiente llamada de prueba."""
+        with self._lock:
+            if self._abierto_desde is None:
+                return 0.0
+            restante = self.tiempo_reapertura - (time.monotonic() - self._abierto_desde)
+            return max(0.0, restante)
+
+    def registrar_exito(self) -> None:
+        with self._lock:
+            self._fallos = 0
+            self._abierto_desde = None
+
+    def registrar_fallo(self) -> None:
+        with self._lock:
+            self._fallos += 1
+            if self._fallos >= self.umbral_fallos:
+                self._abierto_desde = time.monotonic()
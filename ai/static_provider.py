@@ -5,7 +5,57 @@ Genera análisis basados en reglas cuando ningún proveedor de IA está disponib
 
 from __future__ import annotations
 
+from bisect import bisect_right
+
 from ai.base import AIProvider
+from core.config import UMBRAL_ALERTA, UMBRAL_CUMPLIDO
+
+# Tablas de clasificación: el nivel de un valor es el número de umbrales
+# alcanzados (>=), y cada tupla de textos va de peor a mejor nivel.
+_UMBRALES_GENERAL = (70, 80, 90, UMBRAL_CUMPLIDO)
+_ESTADOS_GENERAL = (
+    ("CRÍTICO", "El PDI tiene un cumplimiento del {:.1f}% que requiere acción inmediata."),
+    ("REGULAR", "El PDI presenta un cumplimiento del {:.1f}% que requiere atención."),
+    ("BUENO", "El PDI tiene un cumplimiento aceptable del {:.1f}%, aunque hay oportunidades de mejora."),
+    ("MUY BUENO", "El PDI muestra un cumplimiento muy satisfactorio del {:.1f}%."),
+    ("EXCELENTE", "El PDI presenta un cumplimiento sobresaliente del {:.1f}%."),
+)
+
+_UMBRALES_SEMAFORO = (UMBRAL_ALERTA, UMBRAL_CUMPLIDO)
+_ESTADOS_LINEA = (
+    ("requiere atención", "[X]"),
+    ("satisfactorio", "[!]"),
+    ("sobresaliente", "[OK]"),
+)
+_RECOMENDACIONES_LINEA = (
+    "**Recomendación:** Revisar y ajustar las estrategias actuales. Considerar reasignar recursos a los objetivos críticos.",
+    "**Recomendación:** Intensificar esfuerzos en los indicadores cercanos a la meta para alcanzar el 100%.",
+    "**Recomendación:** Documentar las estrategias exitosas y compartir con otras líneas.",
+)
+_ESTADOS_INDICADOR = ("[X] Requiere atención", "[!] En progreso", "[OK] Meta cumplida")
+
+_RECOMENDACIONES_GENERAL = {
+    "priorizar": "**Recomendación:** Priorizar las líneas con menor cumplimiento y establecer planes de acción inmediatos.",
+    "mantener": "**Recomendación:** Mantener las estrategias actuales y documentar las mejores prácticas.",
+    "revisar": "**Recomendación:** Revisar los indicadores en progreso para asegurar que alcancen la meta antes del cierre del período.",
+}
+_RECOMENDACIONES_INDICADOR = {
+    "mantener": "**Recomendación:** Mantener las acciones actuales y documentar las buenas prácticas.",
+    "continuar": "**Recomendación:** Continuar con la estrategia actual, la tendencia es favorable.",
+    "corregir": "**Recomendación:** Revisar las acciones implementadas, hay una tendencia descendente que requiere corrección.",
+    "intensificar": "**Recomendación:** Intensificar las acciones y revisar los recursos asignados al indicador.",
+}
+_SIN_HISTORICO = "**{}**\n\nNo hay datos históricos disponibles para analizar."
+
+
+def _truncar(texto: str, n: int) -> str:
+    """`texto` recortado a `n` caracteres con "..." si es más largo."""
+    return texto if len(texto) <= n else f"{texto[:n]}..."
+
+
+def _nivel(valor: float, umbrales: tuple) -> int:
+    """Número de umbrales alcanzados por `valor`; NaN cuenta como el peor nivel."""
+    return bisect_right(umbrales, valor) if valor == valor else 0
 
 
 class StaticProvider(AIProvider):
@@ -17,7 +67,7 @@ class StaticProvider(AIProvider):
     def is_available(self) -> bool:
         return True  # Siempre disponible
 
-    def generate(self, prompt: str, max_tokens: int = 1000) -> str:
+    def generate(self, prompt: str, max_tokens: int = 1000, system: str | None = None) -> str:
         # El StaticProvider no interpreta el prompt;
         # la generación real la hace AIService al construir el texto estático.
         return ""
@@ -36,16 +86,8 @@ class StaticProvider(AIProvider):
         en_progreso = metricas.get("en_progreso", 0)
         no_cumplidos = metricas.get("no_cumplidos", 0)
 
-        if cumplimiento >= 100:
-            estado, mensaje = "EXCELENTE", f"El PDI presenta un cumplimiento sobresaliente del {cumplimiento:.1f}%."
-        elif cumplimiento >= 90:
-            estado, mensaje = "MUY BUENO", f"El PDI muestra un cumplimiento muy satisfactorio del {cumplimiento:.1f}%."
-        elif cumplimiento >= 80:
-            estado, mensaje = "BUENO", f"El PDI tiene un cumplimiento aceptable del {cumplimiento:.1f}%, aunque hay oportunidades de mejora."
-        elif cumplimiento >= 70:
-            estado, mensaje = "REGULAR", f"El PDI presenta un cumplimiento del {cumplimiento:.1f}% que requiere atención."
-        else:
-            estado, mensaje = "CRÍTICO", f"El PDI tiene un cumplimiento del {cumplimiento:.1f}% que requiere acción inmediata."
+        estado, plantilla = _ESTADOS_GENERAL[_nivel(cumplimiento, _UMBRALES_GENERAL)]
+        mensaje = plantilla.format(cumplimiento)
 
         lineas_dest = [f"{l['linea']} ({l['cumplimiento']:.1f}%)" for l in cumplimiento_por_linea if l["cumplimiento"] >= 100]
         lineas_crit = [f"{l['linea']} ({l['cumplimiento']:.1f}%)" for l in cumplimiento_por_linea if l["cumplimiento"] < 80]
@@ -65,11 +107,11 @@ class StaticProvider(AIProvider):
         if lineas_crit:
             texto += f"**Líneas que requieren atención:** {', '.join(lineas_crit[:3])}\n\n"
         if no_cumplidos > cumplidos:
-            texto += "**Recomendación:** Priorizar las líneas con menor cumplimiento y establecer planes de acción inmediatos."
-        elif cumplimiento >= 100:
-            texto += "**Recomendación:** Mantener las estrategias actuales y documentar las mejores prácticas."
+            texto += _RECOMENDACIONES_GENERAL["priorizar"]
+        elif cumplimiento >= UMBRAL_CUMPLIDO:
+            texto += _RECOMENDACIONES_GENERAL["mantener"]
         else:
-            texto += "**Recomendación:** Revisar los indicadores en progreso para asegurar que alcancen la meta antes del cierre del período."
+            texto += _RECOMENDACIONES_GENERAL["revisar"]
         return texto
 
     def analisis_linea(
@@ -79,12 +121,8 @@ class StaticProvider(AIProvider):
         cumplimiento_promedio: float,
         objetivos_data: list[dict],
     ) -> str:
-        if cumplimiento_promedio >= 100:
-            estado, icono = "sobresaliente", "[OK]"
-        elif cumplimiento_promedio >= 80:
-            estado, icono = "satisfactorio", "[!]"
-        else:
-            estado, icono = "requiere atención", "[X]"
+        nivel = _nivel(cumplimiento_promedio, _UMBRALES_SEMAFORO)
+        estado, icono = _ESTADOS_LINEA[nivel]
 
         texto = (
             f"**ANÁLISIS: {nombre_linea}**\n\n"
@@ -97,15 +135,10 @@ class StaticProvider(AIProvider):
             if obj_cumpl:
                 texto += f"**Objetivos destacados:** {len(obj_cumpl)} de {len(objetivos_data)} objetivos han alcanzado o superado la meta.\n\n"
             if obj_crit:
-                nombres = [o["objetivo"][:50] + ("..." if len(o["objetivo"]) > 50 else "") for o in obj_crit[:2]]
+                nombres = [_truncar(o["objetivo"], 50) for o in obj_crit[:2]]
                 texto += f"**Objetivos a mejorar:** {', '.join(nombres)}\n\n"
 
-        if cumplimiento_promedio >= 100:
-            texto += "**Recomendación:** Documentar las estrategias exitosas y compartir con otras líneas."
-        elif cumplimiento_promedio >= 80:
-            texto += "**Recomendación:** Intensificar esfuerzos en los indicadores cercanos a la meta para alcanzar el 100%."
-        else:
-            texto += "**Recomendación:** Revisar y ajustar las estrategias actuales. Considerar reasignar recursos a los objetivos críticos."
+        texto += _RECOMENDACIONES_LINEA[nivel]
         return texto
 
     def analisis_indicador(
@@ -116,7 +149,7 @@ class StaticProvider(AIProvider):
         sentido: str = "Creciente",
     ) -> str:
         if not historico_data:
-            return f"**{nombre_indicador}**\n\nNo hay datos históricos disponibles para analizar."
+            return _SIN_HISTORICO.format(nombre_indicador)
 
         primero = historico_data[0]
         ultimo = historico_data[-1]
@@ -130,15 +163,11 @@ class StaticProvider(AIProvider):
         else:
             tendencia, icono_t = "estable", "-"
 
-        if cumpl_actual >= 100:
-            estado = "[OK] Meta cumplida"
-        elif cumpl_actual >= 80:
-            estado = "[!] En progreso"
-        else:
-            estado = "[X] Requiere atención"
+        nivel = _nivel(cumpl_actual, _UMBRALES_SEMAFORO)
+        estado = _ESTADOS_INDICADOR[nivel]
 
         texto = (
-            f"**ANÁLISIS: {nombre_indicador[:60]}{'...' if len(nombre_indicador) > 60 else ''}**\n\n"
+            f"**ANÁLISIS: {_truncar(nombre_indicador, 60)}**\n\n"
             f"**Línea Estratégica:** {linea}\n"
             f"**Sentido:** {sentido} ({'mayor es mejor' if sentido == 'Creciente' else 'menor es mejor'})\n\n"
             f"**Estado actual:** {estado} — Cumplimiento: **{cumpl_actual:.1f}%**\n\n"
@@ -154,12 +183,12 @@ class StaticProvider(AIProvider):
             else:
                 texto += f"**Desempeño:** Supera la meta en {abs(brecha):.2f} unidades.\n\n"
 
-        if cumpl_actual >= 100:
-            texto += "**Recomendación:** Mantener las acciones actuales y documentar las buenas prácticas."
-        elif cumpl_actual >= 80 and variacion > 0:
-            texto += "**Recomendación:** Continuar con la estrategia actual, la tendencia es favorable."
+        if nivel == 2:
+            texto += _RECOMENDACIONES_INDICADOR["mantener"]
+        elif nivel == 1 and variacion > 0:
+            texto += _RECOMENDACIONES_INDICADOR["continuar"]
         elif variacion < 0:
-            texto += "**Recomendación:** Revisar las acciones implementadas, hay una tendencia descendente que requiere corrección."
+            texto += _RECOMENDACIONES_INDICADOR["corregir"]
         else:
-            texto += "**Recomendación:** Intensificar las acciones y revisar los recursos asignados al indicador."
+            texto += _RECOMENDACIONES_INDICADOR["intensificar"]
         return texto
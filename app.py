@@ -3,6 +3,7 @@ Dashboard Estratégico POLI - Aplicación Principal
 Politécnico Grancolombiano - Plan de Desarrollo Institucional 2021-2025
 """
 
+import importlib
 import streamlit as st
 from datetime import datetime
 
@@ -19,7 +20,8 @@ import sys
 from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent))
 
-from utils.data_loader import cargar_datos, calcular_metricas_generales, COLORS
+from utils.data_loader import cargar_datos, calcular_metricas_generales, indexar_por_indicador, metadatos_por_indicador, huella_datos, COLORS
+from utils.ai_analysis import limpiar_cache_ia
 from components.styling import inject_global_css
 
 # CSS personalizado global
@@ -27,112 +29,166 @@ inject_global_css()
 
 
 
-# Cargar datos en estado de sesión para compartir entre páginas
-@st.cache_data(ttl=3600)
+# Páginas disponibles: etiqueta de navegación -> módulo de la vista
+PAGINAS = {
+    "📊 Dashboard General": "views.dashboard",
+    "🎯 CMI Estratégico": "views.cmi_estrategico",
+    "📈 Análisis por Línea": "views.analisis_linea",
+    "🔍 Detalle de Indicadores": "views.detalle_indicador",
+}
+
+
+@st.cache_resource
+def obtener_vista(modulo):
+    """Importa la vista una sola vez por proceso y retorna su mostrar_pagina."""
+    return importlib.import_module(modulo).mostrar_pagina
+
+
+# Bloques HTML estáticos del sidebar (se construyen una sola vez al importar)
+SIDEBAR_LOGO_HTML = """
+<div style="
+    background: linear-gradient(135deg, {primary} 0%, {secondary} 100%);
+    padding: 20px;
+    border-radius: 10px;
+    text-align: center;
+    color: white;
+    margin-bottom: 20px;
+">
+    <div style="font-size: 24px; font-weight: bold;">📊 POLI</div>
+    <div style="font-size: 12px; opacity: 0.9;">Plan Estratégico 2021-2025</div>
+</div>
+""".format_map(COLORS)
+
+_SEMAFORO_ITEM = (
+    '<div style="margin: 5px 0;">'
+    '<span style="display: inline-block; width: 12px; height: 12px; '
+    'background: {color}; border-radius: 50%;"></span>'
+    '<small> {texto}</small></div>'
+)
+SIDEBAR_SEMAFORO_HTML = (
+    '<div style="padding: 10px; background: white; border-radius: 5px;">'
+    + "".join(
+        _SEMAFORO_ITEM.format(color=COLORS[clave], texto=texto)
+        for clave, texto in (
+            ("success", "≥100% Meta cumplida"),
+            ("warning", "80-99% Alerta"),
+            ("danger", "&lt;80% Peligro"),
+        )
+    )
+    + "</div>"
+)
+
+
+@st.cache_data(ttl=60)
+def marcas_de_tiempo():
+    """Fecha (sidebar) y fecha-hora (footer) formateadas; se refrescan cada minuto."""
+    ahora = datetime.now()
+    return ahora.strftime('%d/%m/%Y'), ahora.strftime('%d/%m/%Y a las %H:%M')
+
+
+def mostrar_informacion_sidebar(fecha, total_indicadores):
+    """Bloque informativo del sidebar (periodo, actualización, total)."""
+    st.markdown("### 📋 Información")
+    st.info(f"""
+    **Periodo:** 2022-2025
+    **Última actualización:** {fecha}
+    **Total Indicadores:** {total_indicadores}
+    """)
+
+
+def mostrar_leyenda_semaforo():
+    """Leyenda estática del semáforo de cumplimiento."""
+    st.markdown("### 🚦 Semáforo")
+    st.markdown(SIDEBAR_SEMAFORO_HTML, unsafe_allow_html=True)
+
+
+# Cargar datos en estado de sesión para compartir entre páginas.
+# st.cache_resource entrega la misma referencia a todas las sesiones (sin la
+# copia que hace st.cache_data en cada acceso). Contrato: las vistas NO deben
+# mutar df_base/df_unificado; si necesitan modificarlos, trabajan sobre .copy().
+@st.cache_resource(ttl=3600)
 def cargar_datos_cached():
     return cargar_datos()
 
 
+# Metadatos de df_base como diccionario y copia de df_unificado indexada por
+# Indicador, construidos una vez y compartidos igual que los datos: las
+# vistas consultan un indicador sin recorrer el DataFrame con máscaras.
+# La huella del contenido identifica la carga: las vistas la usan como clave
+# de st.cache_data en lugar de hashear los DataFrames en cada rerun.
+@st.cache_resource(ttl=3600)
+def indexar_datos_cached():
+    df_base, df_unificado, _ = cargar_datos_cached()
+    return (
+        metadatos_por_indicador(df_base),
+        indexar_por_indicador(df_unificado),
+        huella_datos(df_base, df_unificado),
+    )
+
+
 # Inicializar datos si no existen en el estado de sesión
 if 'datos_cargados' not in st.session_state:
     df_base, df_unificado, _ = cargar_datos_cached()
     st.session_state['df_base'] = df_base
     st.session_state['df_unificado'] = df_unificado
+    (
+        st.session_state['meta_by_ind'],
+        st.session_state['df_unificado_por_ind'],
+        st.session_state['version_datos'],
+    ) = indexar_datos_cached()
+    st.session_state['total_indicadores'] = (
+        int(df_unificado['Indicador'].nunique())
+        if df_unificado is not None and 'Indicador' in df_unificado.columns
+        else 0
+    )
     st.session_state['datos_cargados'] = True
 
 
+fecha_hoy, fecha_hora = marcas_de_tiempo()
+
 # Sidebar
 with st.sidebar:
     # Logo placeholder
-    st.markdown(f"""
-    <div style="
-        background: linear-gradient(135deg, {COLORS['primary']} 0%, {COLORS['secondary']} 100%);
-        padding: 20px;
-        border-radius: 10px;
-        text-align: center;
-        color: white;
-        margin-bottom: 20px;
-    ">
-        <div style="font-size: 24px; font-weight: bold;">📊 POLI</div>
-        <div style="font-size: 12px; opacity: 0.9;">Plan Estratégico 2021-2025</div>
-    </div>
-    """, unsafe_allow_html=True)
+    st.markdown(SIDEBAR_LOGO_HTML, unsafe_allow_html=True)
 
     st.markdown("---")
 
     # Navegación
     pagina = st.radio(
         "📍 Navegación",
-        ["📊 Dashboard General", "🎯 CMI Estratégico", "📈 Análisis por Línea", "🔍 Detalle de Indicadores"],
+        list(PAGINAS),
         label_visibility="visible"
     )
 
     st.markdown("---")
 
     # Información del informe
-    st.markdown("### 📋 Información")
-
-    df_unificado = st.session_state.get('df_unificado')
-    total_indicadores = 0
-    if df_unificado is not None and 'Indicador' in df_unificado.columns:
-        total_indicadores = df_unificado['Indicador'].nunique()
-
-    st.info(f"""
-    **Periodo:** 2022-2025
-    **Última actualización:** {datetime.now().strftime('%d/%m/%Y')}
-    **Total Indicadores:** {total_indicadores}
-    """)
+    mostrar_informacion_sidebar(fecha_hoy, st.session_state.get('total_indicadores', 0))
 
     st.markdown("---")
 
     # Botón de actualización
     if st.button("🔄 Actualizar Datos", use_container_width=True):
         st.cache_data.clear()
-        for key in ['df_base', 'df_unificado', 'datos_cargados']:
+        limpiar_cache_ia()
+        cargar_datos_cached.clear()
+        indexar_datos_cached.clear()
+        for key in ['df_base', 'df_unificado', 'meta_by_ind', 'df_unificado_por_ind',
+                    'version_datos', 'total_indicadores', 'datos_cargados']:
             if key in st.session_state:
                 del st.session_state[key]
         st.rerun()
 
     # Leyenda de semáforo
-    st.markdown("### 🚦 Semáforo")
-    st.markdown(f"""
-    <div style="padding: 10px; background: white; border-radius: 5px;">
-        <div style="margin: 5px 0;">
-            <span style="display: inline-block; width: 12px; height: 12px; background: {COLORS['success']}; border-radius: 50%;"></span>
-            <small> ≥100% Meta cumplida</small>
-        </div>
-        <div style="margin: 5px 0;">
-            <span style="display: inline-block; width: 12px; height: 12px; background: {COLORS['warning']}; border-radius: 50%;"></span>
-            <small> 80-99% Alerta</small>
-        </div>
-        <div style="margin: 5px 0;">
-            <span style="display: inline-block; width: 12px; height: 12px; background: {COLORS['danger']}; border-radius: 50%;"></span>
-            <small> &lt;80% Peligro</small>
-        </div>
-    </div>
-    """, unsafe_allow_html=True)
+    mostrar_leyenda_semaforo()
 
 
 # Guardar página seleccionada en estado de sesión
 st.session_state['pagina_actual'] = pagina
 
 
-# Importar y mostrar la página correspondiente
-if pagina == "📊 Dashboard General":
-    from views import dashboard
-    dashboard.mostrar_pagina()
-
-elif pagina == "🎯 CMI Estratégico":
-    from views import cmi_estrategico
-    cmi_estrategico.mostrar_pagina()
-
-elif pagina == "📈 Análisis por Línea":
-    from views import analisis_linea
-    analisis_linea.mostrar_pagina()
-
-elif pagina == "🔍 Detalle de Indicadores":
-    from views import detalle_indicador
-    detalle_indicador.mostrar_pagina()
+# Mostrar la página correspondiente (la vista se importa solo al visitarla)
+obtener_vista(PAGINAS[pagina])()
 
 
 # Footer
@@ -140,6 +196,6 @@ st.markdown("---")
 st.markdown(f"""
 <div style="text-align: center; color: {COLORS['gray']}; font-size: 12px; padding: 20px;">
     <strong>Dashboard Estratégico POLI</strong> | Politécnico Grancolombiano | Plan de Desarrollo Institucional 2021-2025<br>
-    <em>Generado automáticamente el {datetime.now().strftime('%d/%m/%Y a las %H:%M')}</em>
+    <em>Generado automáticamente el {fecha_hora}</em>
 </div>
 """, unsafe_allow_html=True)
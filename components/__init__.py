@@ -3,5 +3,6 @@ components — Componentes de UI reutilizables del Dashboard Estratégico POLI.
 """
 
 from components.styling import inject_global_css
+from components.analisis_ia import analisis_a_html, mostrar_analisis_ia
 
-__all__ = ["inject_global_css"]
+__all__ = ["inject_global_css", "analisis_a_html", "mostrar_analisis_ia"]
@@ -0,0 +1,35 @@
+"""
+Bloque de análisis inteligente: muestra el texto de la IA dentro del
+contenedor .ai-analysis y lo va actualizando a medida que llegan fragmentos.
+"""
+
+from __future__ import annotations
+
+import re
+from typing import Iterable
+
+import streamlit as st
+
+_RE_NEGRITA = re.compile(r"\*\*([^*]+)\*\*")
+
+
+def analisis_a_html(texto: str) -> str:
+    """Convierte **negrita** y saltos de línea del texto de la IA a HTML."""
+    return _RE_NEGRITA.sub(r"<strong>\1</strong>", texto).replace("\n", "<br>")
+
+
+def mostrar_analisis_ia(fragmentos: Iterable[str], estilo: str = "") -> str:
+    """
+    Pinta el análisis en un único placeholder que se reescribe con cada
+    fragmento, de modo que el usuario ve el texto desde el primer token.
+    Retorna el texto completo.
+    """
+    contenedor = st.empty()
+    texto = ""
+    for fragmento in fragmentos:
+        texto += fragmento
+        contenedor.markdown(
+            f'<div class="ai-analysis" style="{estilo}">{analisis_a_html(texto)}</div>',
+            unsafe_allow_html=True,
+        )
+    return texto
@@ -11,7 +11,7 @@ from core.config import COLORS
 
 def inject_global_css() -> None:
     """Inyecta el CSS corporativo en la página activa de Streamlit."""
-    st.markdown(_build_css(), unsafe_allow_html=True)
+    st.markdown(_CSS_HTML, unsafe_allow_html=True)
 
 
 def _build_css() -> str:
@@ -152,3 +152,8 @@ def _build_css() -> str:
     .header-subtitle {{ font-size: 16px; opacity: 0.9; }}
 </style>
 """
+
+
+# La paleta es constante: el bloque CSS se construye una sola vez al importar
+# el módulo y cada rerun reutiliza el mismo string.
+_CSS_HTML: str = _build_css()
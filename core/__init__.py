@@ -15,6 +15,8 @@ from core.models import (
 )
 from core.calculations import (
     calcular_cumplimiento,
+    calcular_cumplimiento_vec,
+    tendencia_cumplimiento,
     obtener_color_semaforo,
     obtener_estado_semaforo,
     es_objetivo_standby,
@@ -23,9 +25,14 @@ from core.calculations import (
 from core.filters import (
     filtrar_por_linea,
     filtrar_por_objetivo,
+    filtrar_corte,
     filtrar_indicadores,
     filtrar_proyectos,
     excluir_standby,
+    indexar_por_indicador,
+    filas_indicador,
+    metadatos_por_indicador,
+    huella_datos,
     obtener_lista_indicadores,
     obtener_lista_objetivos,
     obtener_año_mas_reciente,
@@ -39,11 +46,13 @@ __all__ = [
     "MetricasGenerales", "CumplimientoLinea", "CumplimientoObjetivo",
     "EstadoProyectos", "PuntoHistorico", "MetadatosIndicador", "FilaCascada",
     # calculations
-    "calcular_cumplimiento", "obtener_color_semaforo", "obtener_estado_semaforo",
+    "calcular_cumplimiento", "calcular_cumplimiento_vec", "tendencia_cumplimiento",
+    "obtener_color_semaforo", "obtener_estado_semaforo",
     "es_objetivo_standby", "cumplimiento_jerarquico",
     # filters
-    "filtrar_por_linea", "filtrar_por_objetivo", "filtrar_indicadores",
-    "filtrar_proyectos", "excluir_standby", "obtener_lista_indicadores",
+    "filtrar_por_linea", "filtrar_por_objetivo", "filtrar_corte", "filtrar_indicadores",
+    "filtrar_proyectos", "excluir_standby", "indexar_por_indicador", "filas_indicador",
+    "metadatos_por_indicador", "huella_datos", "obtener_lista_indicadores",
     "obtener_lista_objetivos", "obtener_año_mas_reciente",
     # repository
     "DataRepository", "DataLoadError",
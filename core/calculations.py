@@ -6,6 +6,7 @@ Todas las funciones son deterministas y testeables de forma aislada.
 
 from __future__ import annotations
 
+import numpy as np
 import pandas as pd
 from typing import Optional, Tuple
 
@@ -44,6 +45,70 @@ def calcular_cumplimiento(
     return (ejecucion / meta) * 100.0
 
 
+def calcular_cumplimiento_vec(
+    meta,
+    ejecucion,
+    sentido="Creciente",
+) -> np.ndarray:
+    """
+    Versión vectorizada de calcular_cumplimiento sobre arreglos alineados.
+    `sentido` puede ser un único valor o un arreglo por elemento.
+
+    Retorna un arreglo float con NaN donde la versión escalar retorna None.
+    """
+    meta = np.asarray(meta, dtype=float)
+    ejecucion = np.asarray(ejecucion, dtype=float)
+    if isinstance(sentido, str):
+        decreciente = np.full(meta.shape, sentido == "Decreciente")
+    else:
+        decreciente = np.asarray(sentido, dtype=object) == "Decreciente"
+
+    # Un solo búfer de salida: el caso creciente se calcula en sitio y el
+    # decreciente solo sobre sus posiciones (la mayoría de filas no lo son)
+    resultado = np.empty(np.broadcast(meta, ejecucion).shape)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        np.divide(ejecucion, meta, out=resultado)
+        resultado *= 100.0
+        if decreciente.any():
+            m = np.broadcast_to(meta, resultado.shape)[decreciente]
+            e = np.broadcast_to(ejecucion, resultado.shape)[decreciente]
+            resultado[decreciente] = np.where(
+                e <= m,
+                100.0 + (m - e) / m * 100.0,
+                m / e * 100.0,
+            )
+
+    resultado[np.isnan(meta) | np.isnan(ejecucion) | (meta == 0)] = np.nan
+    return resultado
+
+
+def tendencia_cumplimiento(
+    años,
+    cumplimientos,
+    umbral: float = 5.0,
+) -> Tuple[float, str]:
+    """
+    Tendencia de una serie de cumplimiento por mínimos cuadrados: retorna
+    (variación ajustada en pp entre el primer y el último punto, etiqueta).
+    A diferencia de comparar solo extremos, un valor atípico al inicio o al
+    final no invierte la tendencia. Si los años faltan o son todos iguales
+    se usa la posición en la serie.
+    """
+    y = np.asarray(cumplimientos, dtype=float)
+    if y.size < 2:
+        return 0.0, "no determinada"
+    x = np.asarray([np.nan if a is None else a for a in años], dtype=float)
+    if np.isnan(x).any() or np.ptp(x) == 0:
+        x = np.arange(y.size, dtype=float)
+    pendiente = np.polyfit(x - x.mean(), y, 1)[0]  # centrado: mejor condicionado
+    variacion = float(pendiente * (x.max() - x.min()))
+    if variacion > umbral:
+        return variacion, "ascendente"
+    if variacion < -umbral:
+        return variacion, "descendente"
+    return variacion, "estable"
+
+
 # ---------------------------------------------------------------------------
 # Semáforo
 # ---------------------------------------------------------------------------
@@ -116,8 +181,8 @@ def cumplimiento_jerarquico(
     df[col_cumplimiento] = df[col_cumplimiento].fillna(0)
 
     if col_objetivo in df.columns and col_linea in df.columns:
-        por_objetivo = df.groupby([col_linea, col_objetivo])[col_cumplimiento].mean()
-        por_linea = por_objetivo.groupby(level=0).mean()
+        por_objetivo = df.groupby([col_linea, col_objetivo], observed=True)[col_cumplimiento].mean()
+        por_linea = por_objetivo.groupby(level=0, observed=True).mean()
         result = por_linea.mean()
     else:
         result = df[col_cumplimiento].mean()
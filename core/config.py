@@ -72,6 +72,14 @@ OBJETIVO_STANDBY: str = (
 FUENTE_AVANCE: str = "Avance"
 FUENTE_CIERRE: str = "Cierre"
 
+# ---------------------------------------------------------------------------
+# Columnas de texto repetido que se cargan como category
+# (los groupby sobre ellas deben usar observed=True)
+# ---------------------------------------------------------------------------
+COLUMNAS_CATEGORIA: list[str] = [
+    "Linea", "Objetivo", "Indicador", "Sentido", "Periodicidad", "Fuente",
+]
+
 # ---------------------------------------------------------------------------
 # Ruta del dataset principal (relativa a la raíz del proyecto)
 # ---------------------------------------------------------------------------
@@ -80,3 +88,17 @@ DATASET_FILENAME: str = "Dataset_Unificado.xlsx"
 SHEET_BASE: str = "Base_Indicadores"
 SHEET_UNIFICADO: str = "Unificado"
 CACHE_ANALISIS_PATH: str = "data/cache/analisis_cache.json"
+
+# Caché persistente de respuestas de la IA en vivo (SQLite) y su vigencia
+CACHE_RESPUESTAS_PATH: str = "data/cache/respuestas_ia.sqlite3"
+CACHE_RESPUESTAS_TTL: int = 86400
+# Tras un fallo de la IA en vivo, segundos durante los que la misma solicitud
+# sale directamente del análisis estático (los reruns no vuelven a llamar)
+CACHE_FALLOS_TTL: int = 300
+
+# ---------------------------------------------------------------------------
+# Caché en disco del dataset procesado (subcarpeta junto al Excel)
+# Incrementar la versión cuando cambie el procesamiento en core/processor.py
+# ---------------------------------------------------------------------------
+CACHE_DATASET_DIR: str = "cache"
+CACHE_DATASET_VERSION: int = 3
@@ -5,6 +5,7 @@ Sin dependencias de Streamlit.
 
 from __future__ import annotations
 
+import numpy as np
 import pandas as pd
 from typing import Optional
 
@@ -65,6 +66,98 @@ def filtrar_años_validos(df: pd.DataFrame, años: list[int]) -> pd.DataFrame:
     return df[df["Año"].isin(años)]
 
 
+def filtrar_corte(
+    df: pd.DataFrame,
+    año: Optional[int] = None,
+    años_validos: Optional[list[int]] = None,
+    fuente: Optional[str] = None,
+    proyectos: Optional[int] = None,
+) -> pd.DataFrame:
+    """
+    Aplica en una sola pasada los filtros habituales de un corte:
+    año, años válidos del PDI, fuente y tipo (Proyectos == 0 | 1).
+    Combina una sola máscara booleana y materializa el resultado una vez,
+    en lugar de crear un DataFrame intermedio por cada filtro encadenado.
+    Los criterios en None (o cuya columna no existe) se omiten.
+    """
+    if df is None:
+        return df
+    mask = np.ones(len(df), dtype=bool)
+    if año is not None and "Año" in df.columns:
+        mask &= (df["Año"] == año).to_numpy()
+    if años_validos is not None and "Año" in df.columns:
+        mask &= df["Año"].isin(años_validos).to_numpy()
+    if fuente is not None and "Fuente" in df.columns:
+        mask &= (df["Fuente"] == fuente).to_numpy()
+    if proyectos is not None and "Proyectos" in df.columns:
+        mask &= (df["Proyectos"] == proyectos).to_numpy()
+    return df[mask]
+
+
+# ---------------------------------------------------------------------------
+# Índice por indicador
+# ---------------------------------------------------------------------------
+def indexar_por_indicador(
+    df: pd.DataFrame,
+    unico: bool = False,
+) -> Optional[pd.DataFrame]:
+    """
+    Copia indexada y ordenada por Indicador (la columna se conserva), para
+    búsquedas con .loc en lugar de recorrer el DataFrame con una máscara.
+    Dentro de cada indicador las filas quedan ordenadas por Año, de modo que
+    un año se puede recortar con searchsorted.
+    Con `unico=True` se deja la primera fila de cada indicador.
+    """
+    if df is None or "Indicador" not in df.columns:
+        return None
+    if unico:
+        df = df.drop_duplicates("Indicador")
+    elif "Año" in df.columns:
+        df = df.sort_values("Año", kind="stable")
+    return df.set_index("Indicador", drop=False).rename_axis(None).sort_index(kind="stable")
+
+
+def metadatos_por_indicador(
+    df: Optional[pd.DataFrame],
+    columnas: tuple = ("Periodicidad", "Sentido", "Meta_PDI"),
+) -> dict:
+    """
+    Diccionario {indicador: {columna: valor}} con los metadatos de la primera
+    fila de cada indicador, para consultarlos sin filtrar el DataFrame.
+    """
+    if df is None or "Indicador" not in df.columns:
+        return {}
+    cols = [c for c in columnas if c in df.columns]
+    unicos = df.drop_duplicates("Indicador")
+    return unicos.set_index("Indicador")[cols].to_dict("index")
+
+
+def huella_datos(*dfs: Optional[pd.DataFrame]) -> str:
+    """
+    Huella del contenido de los DataFrames (columnas, índice y valores).
+    Cambia cuando cambian los datos; se calcula una vez por carga y sirve
+    de clave para cachés que no deben hashear los DataFrames en cada uso.
+    """
+    partes = []
+    for df in dfs:
+        if df is None:
+            partes.append("-")
+            continue
+        columnas = int(pd.util.hash_pandas_object(df.columns.astype(str)).sum())
+        valores = int(pd.util.hash_pandas_object(df, index=True).sum())
+        partes.append(f"{len(df)}:{columnas:x}:{valores:x}")
+    return "|".join(partes)
+
+
+def filas_indicador(df_indexado: Optional[pd.DataFrame], indicador: str) -> pd.DataFrame:
+    """Filas de un indicador sobre una copia de indexar_por_indicador."""
+    if df_indexado is None:
+        return pd.DataFrame()
+    if indicador not in df_indexado.index:
+        return df_indexado.iloc[0:0]
+    return df_indexado.loc[[indicador]]
+
+
 # ---------------------------------------------------------------------------
 # Consultas de catálogo
 # ---------------------------------------------------------------------------
@@ -75,7 +168,7 @@ def obtener_lista_indicadores(
 ) -> list[str]:
     if df is None:
         return []
-    temp = df.copy()
+    temp = df  # solo lectura: los filtros crean frames nuevos
     if linea and "Linea" in temp.columns:
         temp = temp[temp["Linea"] == linea]
     if objetivo and "Objetivo" in temp.columns:
@@ -91,7 +184,7 @@ def obtener_lista_objetivos(
 ) -> list[str]:
     if df is None:
         return []
-    temp = df.copy()
+    temp = df  # solo lectura: los filtros crean frames nuevos
     if linea and "Linea" in temp.columns:
         temp = temp[temp["Linea"] == linea]
     if "Objetivo" not in temp.columns:
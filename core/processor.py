@@ -6,9 +6,10 @@ Sin dependencias de Streamlit — operable en cualquier contexto Python.
 from __future__ import annotations
 
 import unicodedata
+from typing import Optional
 import pandas as pd
 
-from core.calculations import calcular_cumplimiento
+from core.calculations import calcular_cumplimiento_vec
 
 
 # ---------------------------------------------------------------------------
@@ -71,19 +72,55 @@ def procesar_datos_unificado(df: pd.DataFrame) -> pd.DataFrame:
 
     # Calcular Cumplimiento si no existe
     if "Cumplimiento" not in df.columns and "Meta" in df.columns and "Ejecución" in df.columns:
-        sentido_col = "Sentido" if "Sentido" in df.columns else None
-        df["Cumplimiento"] = df.apply(
-            lambda row: calcular_cumplimiento(
-                row["Meta"],
-                row["Ejecución"],
-                str(row[sentido_col]) if sentido_col else "Creciente",
-            ),
-            axis=1,
+        sentido = df["Sentido"].astype(str).to_numpy() if "Sentido" in df.columns else "Creciente"
+        df["Cumplimiento"] = calcular_cumplimiento_vec(
+            df["Meta"].to_numpy(), df["Ejecución"].to_numpy(), sentido
         )
 
     return df
 
 
+# ---------------------------------------------------------------------------
+# Reducción de memoria (tipos compactos)
+# ---------------------------------------------------------------------------
+def optimizar_tipos(
+    df: pd.DataFrame,
+    columnas_categoria: Optional[list[str]] = None,
+    umbral_categoria: float = 0.5,
+    reducir_enteros: bool = True,
+) -> pd.DataFrame:
+    """
+    Reduce el tamaño del DataFrame sin alterar sus valores:
+    - columnas enteras → el entero más pequeño que las contiene (int8/int16…);
+    - columnas de texto → category (códigos enteros + diccionario).
+
+    Si se indica `columnas_categoria`, solo esas se convierten; si no, toda
+    columna de texto con cardinalidad menor a `umbral_categoria` · len(df).
+    Con `reducir_enteros=False` los enteros conservan su tipo original.
+    Los flotantes (Meta, Ejecución, Cumplimiento) se mantienen en float64:
+    hay valores del orden de 10^6 con decimales que float32 no representa.
+
+    Con columnas category, los groupby deben usar observed=True.
+    """
+    df = df.copy()
+    for col in df.columns if reducir_enteros else []:
+        serie = df[col]
+        if pd.api.types.is_integer_dtype(serie.dtype) and not isinstance(serie.dtype, pd.CategoricalDtype):
+            df[col] = pd.to_numeric(serie, downcast="integer")
+
+    if columnas_categoria is None:
+        limite = umbral_categoria * len(df)
+        columnas_categoria = [
+            col for col in df.columns
+            if (pd.api.types.is_object_dtype(df[col].dtype) or pd.api.types.is_string_dtype(df[col].dtype))
+            and df[col].nunique(dropna=True) < limite
+        ]
+    for col in columnas_categoria:
+        if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype("category")
+    return df
+
+
 # ---------------------------------------------------------------------------
 # Limpieza post-carga (nombres de columnas + tipos)
 # ---------------------------------------------------------------------------
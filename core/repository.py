@@ -6,17 +6,38 @@ en la capa de servicios o en app.py, no aquí.
 
 from __future__ import annotations
 
+import hashlib
+import importlib.util
+import os
+import pickle
+from functools import lru_cache
 from pathlib import Path
 from typing import Optional, Tuple
 import pandas as pd
 
 from core.config import (
+    CACHE_DATASET_DIR,
+    CACHE_DATASET_VERSION,
+    COLUMNAS_CATEGORIA,
     DATA_DIR,
     DATASET_FILENAME,
     SHEET_BASE,
     SHEET_UNIFICADO,
 )
-from core.processor import limpiar_dataframe, procesar_datos_unificado
+from core.processor import limpiar_dataframe, optimizar_tipos, procesar_datos_unificado
+
+
+@lru_cache(maxsize=1)
+def motor_excel() -> str:
+    """
+    Motor para pd.read_excel: 'calamine' (lector en Rust, varias veces más
+    rápido y sin cargar estilos) cuando python-calamine está instalado y
+    pandas >= 2.2 lo soporta; en otro caso 'openpyxl'.
+    """
+    version = tuple(int(p) for p in pd.__version__.split(".")[:2] if p.isdigit())
+    if version >= (2, 2) and importlib.util.find_spec("python_calamine") is not None:
+        return "calamine"
+    return "openpyxl"
 
 
 class DataLoadError(Exception):
@@ -29,8 +50,13 @@ class DataRepository:
     Retorna DataFrames limpios y procesados, listos para la capa de servicios.
     """
 
-    def __init__(self, base_path: Optional[Path] = None) -> None:
+    def __init__(
+        self,
+        base_path: Optional[Path] = None,
+        usar_cache_disco: bool = True,
+    ) -> None:
         self._base_path = base_path or self._detectar_raiz()
+        self._usar_cache_disco = usar_cache_disco
 
     # ------------------------------------------------------------------
     # Carga principal
@@ -39,6 +65,10 @@ class DataRepository:
         """
         Carga y procesa ambas hojas del Excel.
 
+        Si existe una copia en disco generada a partir de la misma versión
+        del archivo (ruta, mtime y tamaño), se usa en lugar de volver a
+        parsear el Excel; así un arranque en frío no paga el costo de openpyxl.
+
         Returns:
             (df_base, df_unificado)
 
@@ -47,9 +77,18 @@ class DataRepository:
         """
         path = self._resolver_ruta()
 
+        cache_path = self._ruta_cache(path) if self._usar_cache_disco else None
+        if cache_path is not None:
+            cacheado = self._leer_cache(cache_path)
+            if cacheado is not None:
+                return cacheado
+
         try:
-            df_base = pd.read_excel(path, sheet_name=SHEET_BASE, engine="openpyxl")
-            df_unificado = pd.read_excel(path, sheet_name=SHEET_UNIFICADO, engine="openpyxl")
+            # Ambas hojas en una sola lectura: el .xlsx se descomprime una vez
+            hojas = pd.read_excel(
+                path, sheet_name=[SHEET_BASE, SHEET_UNIFICADO], engine=motor_excel()
+            )
+            df_base, df_unificado = hojas[SHEET_BASE], hojas[SHEET_UNIFICADO]
         except PermissionError:
             raise DataLoadError(
                 "El archivo Excel está abierto en otro programa. "
@@ -62,6 +101,13 @@ class DataRepository:
         df_unificado = limpiar_dataframe(df_unificado)
         df_unificado = procesar_datos_unificado(df_unificado)
 
+        # Texto repetido como category: comparaciones por código entero
+        df_base = optimizar_tipos(df_base, COLUMNAS_CATEGORIA, reducir_enteros=False)
+        df_unificado = optimizar_tipos(df_unificado, COLUMNAS_CATEGORIA, reducir_enteros=False)
+
+        if cache_path is not None:
+            self._escribir_cache(cache_path, (df_base, df_unificado))
+
         return df_base, df_unificado
 
     # ------------------------------------------------------------------
@@ -82,6 +128,46 @@ class DataRepository:
             + ", ".join(str(c) for c in candidatos)
         )
 
+    @staticmethod
+    def _ruta_cache(path: Path) -> Path:
+        """Ruta del pickle asociado a la versión actual del Excel."""
+        stat = path.stat()
+        firma = f"{path.resolve()}|{stat.st_mtime_ns}|{stat.st_size}|{CACHE_DATASET_VERSION}"
+        clave = hashlib.sha1(firma.encode("utf-8")).hexdigest()
+        return path.parent / CACHE_DATASET_DIR / f"dataset_{clave}.pkl"
+
+    @staticmethod
+    def _leer_cache(cache_path: Path) -> Optional[Tuple[pd.DataFrame, pd.DataFrame]]:
+        """Lee el pickle del dataset; cualquier fallo equivale a un miss."""
+        if not cache_path.exists():
+            return None
+        try:
+            with open(cache_path, "rb") as f:
+                df_base, df_unificado = pickle.load(f)
+        except Exception:
+            return None
+        return df_base, df_unificado
+
+    @staticmethod
+    def _escribir_cache(
+        cache_path: Path, datos: Tuple[pd.DataFrame, pd.DataFrame]
+    ) -> None:
+        """
+        Persiste el dataset procesado de forma atómica y elimina las copias
+        de versiones anteriores. Los errores se ignoran: el caché es opcional.
+        """
+        tmp = cache_path.with_suffix(".tmp")
+        try:
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(tmp, "wb") as f:
+                pickle.dump(datos, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, cache_path)
+            for viejo in cache_path.parent.glob("dataset_*.pkl"):
+                if viejo != cache_path:
+                    viejo.unlink(missing_ok=True)
+        except OSError:
+            tmp.unlink(missing_ok=True)
+
     @staticmethod
     def _detectar_raiz() -> Path:
         """Sube desde este archivo hasta encontrar app.py (raíz del proyecto)."""
@@ -1,230 +1,652 @@
 """
 Script para pre-generar analisis con IA y guardarlo en un archivo JSON.
 Ejecutar localmente: python generar_analisis.py
+Modo lote (Batch API, ~50% del costo, fuera de la cuota interactiva):
+    python generar_analisis.py --batch
 
 Los analisis se guardan en Data/analisis_cache.json y se cargan
 automaticamente en la aplicacion sin necesidad de llamar a la API.
 """
 
 import os
+import sys
 import json
+import hashlib
 import time
+import asyncio
+import tempfile
+from collections import namedtuple
+from dataclasses import dataclass
 from pathlib import Path
-from dotenv import load_dotenv
-
-# Cargar variables de entorno
-load_dotenv()
-
-# Configurar API de Gemini (nuevo paquete google.genai)
-from google import genai
-
-api_key = os.environ.get("GOOGLE_API_KEY")
-if not api_key:
-    print("ERROR: No se encontro GOOGLE_API_KEY en las variables de entorno")
-    print("Crea un archivo .env con: GOOGLE_API_KEY=tu_api_key")
-    exit(1)
-
-# Crear cliente de Gemini
-client = genai.Client(api_key=api_key)
+from typing import Any
 
-# Listar modelos disponibles y elegir uno
-print("Buscando modelos disponibles...")
-modelos_preferidos = ['gemini-2.0-flash-lite', 'gemini-1.5-flash-8b', 'gemini-1.5-flash', 'gemini-2.0-flash']
-modelo_nombre = None
+import numpy as np
+import pandas as pd
+from dotenv import load_dotenv
 
-try:
-    modelos_disponibles = [m.name for m in client.models.list()]
+from ai.rate_limiter import TokenBucket, es_error_cuota
+from ai.retry import CircuitBreaker, calcular_espera, es_reintentable
+from ai.gemini_provider import crear_cliente_genai
+from core.processor import optimizar_tipos
+from core.repository import motor_excel
+
+try:  # serializacion rapida opcional; json estandar si no esta instalado
+    import orjson
+except ImportError:
+    orjson = None
+
+# Ruta base del proyecto (Data/ cuelga de aqui)
+BASE_PATH = Path(__file__).parent
+
+# Llamadas simultaneas a la API (ajustar segun el RPM del tier contratado)
+MAX_CONCURRENCIA = int(os.environ.get("GEMINI_CONCURRENCIA", "4"))
+
+# Configuracion de generacion compartida por el modo en linea y el modo lote
+CONFIG_GENERACION = {
+    'max_output_tokens': 500,
+    'temperature': 0.7
+}
+
+# Indicadores por prompt en el modo en linea (1 = un prompt por indicador)
+INDICADORES_POR_PROMPT = int(os.environ.get("GEMINI_INDICADORES_POR_PROMPT", "5"))
+
+# Intentos por llamada ante errores transitorios (cuota, 5xx, red)
+MAX_INTENTOS = 6
+
+# Analisis exitosos acumulados antes de reescribir el cache en disco
+GUARDAR_CADA = 10
+
+# Segundos entre consultas de estado de un trabajo de la Batch API
+INTERVALO_SONDEO_BATCH = 60
+ESTADOS_FINALES_BATCH = {
+    'JOB_STATE_SUCCEEDED', 'JOB_STATE_FAILED',
+    'JOB_STATE_CANCELLED', 'JOB_STATE_EXPIRED',
+}
+
+# Modelos en orden de preferencia (el primero disponible se usa)
+MODELOS_PREFERIDOS = ['gemini-2.0-flash-lite', 'gemini-1.5-flash-8b', 'gemini-1.5-flash', 'gemini-2.0-flash']
+
+
+@dataclass
+class Contexto:
+    """Estado de una ejecucion: cliente, modelo, datos, cache y control de cuota."""
+    client: Any
+    modelo: str
+    df_base: Any
+    df_unificado: Any
+    cache: dict
+    cache_path: Path
+    wal_path: Path
+    limitador: TokenBucket
+    breaker: CircuitBreaker
+
+
+def elegir_modelo(client):
+    """Primer modelo preferido disponible (o el primer 'flash'); None si no hay."""
+    print("Buscando modelos disponibles...")
+    try:
+        modelos_disponibles = [m.name for m in client.models.list()]
+    except Exception as e:
+        print(f"Error listando modelos: {e}")
+        return 'models/gemini-2.0-flash-lite'
     print(f"Modelos disponibles: {len(modelos_disponibles)}")
 
-    for m in modelos_preferidos:
+    for m in MODELOS_PREFERIDOS:
         nombre_completo = f"models/{m}"
         if nombre_completo in modelos_disponibles:
-            modelo_nombre = nombre_completo
-            break
-
-    if not modelo_nombre and modelos_disponibles:
-        # Usar el primer modelo flash disponible
-        for m in modelos_disponibles:
-            if 'flash' in m.lower():
-                modelo_nombre = m
-                break
-except Exception as e:
-    print(f"Error listando modelos: {e}")
-    modelo_nombre = 'models/gemini-2.0-flash-lite'
+            return nombre_completo
+
+    # Usar el primer modelo flash disponible
+    for m in modelos_disponibles:
+        if 'flash' in m.lower():
+            return m
+    return None
+
+
+def cargar_datos(data_path):
+    """Lee ambas hojas del dataset con columnas limpias y tipos compactos."""
+    print(f"Cargando datos de: {data_path}")
+    # Una sola apertura/parseo del libro para ambas hojas
+    hojas = pd.read_excel(data_path, sheet_name=['Base_Indicadores', 'Unificado'], engine=motor_excel())
+    df_base, df_unificado = hojas['Base_Indicadores'], hojas['Unificado']
+
+    # Limpiar nombres de columnas
+    df_base.columns = df_base.columns.str.strip()
+    df_unificado.columns = df_unificado.columns.str.strip()
+
+    # Tipos compactos: enteros reducidos y texto repetido como category
+    return optimizar_tipos(df_base), optimizar_tipos(df_unificado)
+
+
+def cargar_cache(cache_path, wal_path):
+    """Cache existente mas los analisis de la bitacora de una ejecucion interrumpida."""
+    cache = {}
+    if cache_path.exists():
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            cache = json.load(f)
+        print(f"Cache existente cargado: {len(cache)} analisis")
+
+    # Reaplicar analisis de una ejecucion interrumpida antes de su ultimo guardado
+    if wal_path.exists():
+        recuperados = 0
+        with open(wal_path, 'r', encoding='utf-8') as f:
+            for linea_wal in f:
+                try:
+                    registro = json.loads(linea_wal)
+                except json.JSONDecodeError:
+                    continue  # ultima linea truncada por una interrupcion
+                cache[registro['indicador']] = registro['payload']
+                recuperados += 1
+        print(f"Recuperados de la bitacora: {recuperados} analisis")
+    return cache
+
+
+def setup():
+    """
+    Inicializa todo lo que requiere red o disco (credenciales, cliente,
+    modelo, dataset y cache). Importar el modulo no tiene efectos.
+    """
+    # Cargar variables de entorno
+    load_dotenv()
+
+    # Configurar API de Gemini (nuevo paquete google.genai)
+    api_key = os.environ.get("GOOGLE_API_KEY")
+    if not api_key:
+        print("ERROR: No se encontro GOOGLE_API_KEY en las variables de entorno")
+        print("Crea un archivo .env con: GOOGLE_API_KEY=tu_api_key")
+        sys.exit(1)
+
+    # Crear cliente de Gemini (persistente: keep-alive y HTTP/2 si h2 esta instalado)
+    client = crear_cliente_genai(api_key)
+
+    modelo = elegir_modelo(client)
+    if not modelo:
+        print("ERROR: No se encontro ningun modelo disponible")
+        sys.exit(1)
+    print(f"Usando modelo: {modelo}")
+
+    df_base, df_unificado = cargar_datos(BASE_PATH / 'Data' / 'Dataset_Unificado.xlsx')
+    print(f"Indicadores cargados: {df_unificado['Indicador'].nunique()}")
+
+    # Archivo de cache y bitacora de escritura anticipada (una linea por analisis)
+    cache_path = BASE_PATH / 'Data' / 'analisis_cache.json'
+    wal_path = cache_path.with_suffix('.jsonl')
+
+    return Contexto(
+        client=client,
+        modelo=modelo,
+        df_base=df_base,
+        df_unificado=df_unificado,
+        cache=cargar_cache(cache_path, wal_path),
+        cache_path=cache_path,
+        wal_path=wal_path,
+        # Limites de cuota del modelo (solicitudes y tokens por minuto)
+        limitador=TokenBucket(
+            rpm=float(os.environ.get("GEMINI_RPM", "15")),
+            tpm=float(os.environ.get("GEMINI_TPM", "1000000")),
+        ),
+        # Corta las llamadas tras 5 fallos seguidos (caida del servicio) durante 60 s
+        breaker=CircuitBreaker(umbral_fallos=5, tiempo_reapertura=60),
+    )
+
+
+_INSTRUCCIONES_ANALISIS = """Genera un ANALISIS de maximo 100 palabras que incluya:
+1. Evaluacion de la tendencia
+2. Identificacion de brechas significativas
+3. Una recomendacion especifica y accionable
 
-if not modelo_nombre:
-    print("ERROR: No se encontro ningun modelo disponible")
-    exit(1)
+Se conciso, profesional y enfocado en la accion. Escribe en espanol."""
 
-print(f"Usando modelo: {modelo_nombre}")
 
-# Cargar datos
-import pandas as pd
+def generar_seccion_indicador(indicador, linea, objetivo, sentido, historico):
+    """Bloque de datos de un indicador (comun al prompt individual y al multiple)."""
+    historico_texto = "\n".join([
+        f"- {item['periodo']}: Meta: {item['meta']:.2f}, Ejecucion: {item['ejecucion']:.2f}, Cumplimiento: {item['cumplimiento']:.1f}%"
+        for item in historico
+    ]) if historico else "No hay datos historicos"
 
-base_path = Path(__file__).parent
-data_path = base_path / 'Data' / 'Dataset_Unificado.xlsx'
+    return f"""**Indicador:** {indicador}
+**Linea Estrategica:** {linea}
+**Objetivo:** {objetivo}
+**Sentido:** {sentido} (el indicador se considera positivo si {'aumenta' if sentido == 'Creciente' else 'disminuye'})
 
-print(f"Cargando datos de: {data_path}")
-df_base = pd.read_excel(data_path, sheet_name='Base_Indicadores', engine='openpyxl')
-df_unificado = pd.read_excel(data_path, sheet_name='Unificado', engine='openpyxl')
+**Historico de Desempeno:**
+{historico_texto}"""
 
-# Limpiar nombres de columnas
-df_base.columns = df_base.columns.str.strip()
-df_unificado.columns = df_unificado.columns.str.strip()
 
-print(f"Indicadores cargados: {df_unificado['Indicador'].nunique()}")
+def generar_prompt_indicador(seccion):
+    """Genera el prompt para analizar un indicador."""
+    return f"""Eres un analista estrategico del Politecnico Grancolombiano. Analiza el siguiente indicador del PDI 2021-2025:
 
-# Archivo de cache
-cache_path = base_path / 'Data' / 'analisis_cache.json'
+{seccion}
 
-# Cargar cache existente si existe
-cache = {}
-if cache_path.exists():
-    with open(cache_path, 'r', encoding='utf-8') as f:
-        cache = json.load(f)
-    print(f"Cache existente cargado: {len(cache)} analisis")
+{_INSTRUCCIONES_ANALISIS}"""
 
 
-def generar_prompt_indicador(indicador, linea, objetivo, sentido, historico):
-    """Genera el prompt para analizar un indicador."""
-    historico_texto = "\n".join([
-        f"- {item['periodo']}: Meta: {item['meta']:.2f}, Ejecucion: {item['ejecucion']:.2f}, Cumplimiento: {item['cumplimiento']:.1f}%"
-        for item in historico
-    ]) if historico else "No hay datos historicos"
+def generar_prompt_multiple(items):
+    """Un solo prompt para varios indicadores; la respuesta es un arreglo JSON."""
+    secciones = "\n\n".join(
+        f"### Indicador {n}\n{item.seccion}" for n, item in enumerate(items)
+    )
+    return f"""Eres un analista estrategico del Politecnico Grancolombiano. Analiza por separado cada uno de los siguientes {len(items)} indicadores del PDI 2021-2025:
 
-    return f"""Eres un analista estrategico del Politecnico Grancolombiano. Analiza el siguiente indicador del PDI 2021-2025:
+{secciones}
 
-**Indicador:** {indicador}
-**Linea Estrategica:** {linea}
-**Objetivo:** {objetivo}
-**Sentido:** {sentido} (el indicador se considera positivo si {'aumenta' if sentido == 'Creciente' else 'disminuye'})
+Para CADA indicador: {_INSTRUCCIONES_ANALISIS}
 
-**Historico de Desempeno:**
-{historico_texto}
+Responde con un arreglo JSON con un objeto por indicador: {{"id": <numero del indicador>, "analisis": "<texto>"}}."""
 
-Genera un ANALISIS de maximo 100 palabras que incluya:
-1. Evaluacion de la tendencia
-2. Identificacion de brechas significativas
-3. Una recomendacion especifica y accionable
 
-Se conciso, profesional y enfocado en la accion. Escribe en espanol."""
+def config_multiple(k):
+    """Configuracion con salida JSON estructurada para un prompt de k indicadores."""
+    return {
+        **CONFIG_GENERACION,
+        'max_output_tokens': CONFIG_GENERACION['max_output_tokens'] * k,
+        'response_mime_type': 'application/json',
+        'response_schema': {
+            'type': 'ARRAY',
+            'items': {
+                'type': 'OBJECT',
+                'properties': {
+                    'id': {'type': 'INTEGER'},
+                    'analisis': {'type': 'STRING'},
+                },
+                'required': ['id', 'analisis'],
+            },
+        },
+    }
 
 
-def obtener_historico(df, indicador):
-    """Obtiene el historico de un indicador."""
-    df_ind = df[df['Indicador'] == indicador].copy()
+def parsear_respuesta_multiple(texto):
+    """{id: analisis} a partir de la respuesta JSON; {} si no es parseable."""
+    try:
+        elementos = json.loads(texto)
+        return {
+            int(e['id']): str(e['analisis']).strip()
+            for e in elementos
+            if isinstance(e, dict) and str(e.get('analisis', '')).strip()
+        }
+    except (TypeError, ValueError, KeyError):
+        return {}
+
+
+def obtener_historico(df_ind):
+    """Obtiene el historico de un indicador a partir de sus filas ya agrupadas."""
     if df_ind.empty:
         return []
 
-    historico = []
-    for _, row in df_ind.iterrows():
-        try:
-            periodo = str(int(row['Año'])) if pd.notna(row.get('Año')) else ''
-            if 'Semestre' in row and pd.notna(row['Semestre']) and row['Semestre'] not in ['', 0]:
-                periodo = f"{int(row['Año'])}-{int(row['Semestre'])}"
-
-            meta = float(row['Meta']) if pd.notna(row.get('Meta')) else 0
-            ejecucion = float(row['Ejecución']) if pd.notna(row.get('Ejecución')) else 0
-            cumplimiento = (ejecucion / meta * 100) if meta > 0 else 0
-
-            if periodo:
-                historico.append({
-                    'periodo': periodo,
-                    'meta': meta,
-                    'ejecucion': ejecucion,
-                    'cumplimiento': cumplimiento
-                })
-        except Exception:
-            continue
-
-    return sorted(historico, key=lambda x: x['periodo'])
+    año = pd.to_numeric(df_ind['Año'], errors='coerce')
+    d = pd.DataFrame({
+        'año': año,
+        'meta': pd.to_numeric(df_ind['Meta'], errors='coerce').fillna(0).astype(float),
+        'ejecucion': pd.to_numeric(df_ind['Ejecución'], errors='coerce').fillna(0).astype(float),
+    })
+    if 'Semestre' in df_ind.columns:
+        d['semestre'] = pd.to_numeric(df_ind['Semestre'], errors='coerce')
+    else:
+        d['semestre'] = np.nan
+    d = d[d['año'].notna()]
+    if d.empty:
+        return []
 
+    # Orden cronologico por claves enteras (año, semestre; sin semestre = 0)
+    d['año_int'] = d['año'].astype(int)
+    d['sem_int'] = d['semestre'].fillna(0).astype(int)
+    d = d.sort_values(['año_int', 'sem_int'], kind='stable')
+
+    # Periodo "Año" o "Año-Semestre" cuando hay semestre distinto de 0
+    año_txt = d['año_int'].astype(str)
+    d['periodo'] = np.where(d['sem_int'] != 0, año_txt + '-' + d['sem_int'].astype(str), año_txt)
+
+    meta = d['meta'].to_numpy()
+    d['cumplimiento'] = np.where(meta > 0, d['ejecucion'].to_numpy() / np.where(meta > 0, meta, 1) * 100, 0.0)
+
+    return d[['periodo', 'meta', 'ejecucion', 'cumplimiento']].to_dict('records')
+
+
+async def generar_analisis(ctx, prompt, config=None):
+    """
+    Genera analisis usando Gemini (cliente asincrono) respetando la cuota.
+    Los errores transitorios se reintentan con backoff exponencial y jitter;
+    con el circuito abierto la llamada falla de inmediato.
+    """
+    config = config or CONFIG_GENERACION
+    estimados = len(prompt) // 4 + config['max_output_tokens']
+    for intento in range(MAX_INTENTOS):
+        # Durante una caida no se gasta red ni cuota: se falla localmente
+        if ctx.breaker.esta_abierto():
+            return f"Error: circuito abierto ({ctx.breaker.tiempo_para_cerrar():.0f}s para reintentar)"
+        await ctx.limitador.acquire_async(estimados)
+        try:
+            response = await ctx.client.aio.models.generate_content(
+                model=ctx.modelo,
+                contents=prompt,
+                config=config
+            )
+            ctx.breaker.registrar_exito()
+            break
+        except Exception as e:
+            if not es_reintentable(e):
+                return f"Error: {str(e)}"
+            if not es_error_cuota(e):
+                ctx.breaker.registrar_fallo()
+            if intento == MAX_INTENTOS - 1:
+                return f"Error: {str(e)}"
+            espera = calcular_espera(e, intento)
+            if es_error_cuota(e):
+                # Pausa global: ningun worker consume cuota hasta que pase
+                print(f"  Limite de cuota: pausando {espera:.0f} segundos...")
+                ctx.limitador.pausar(espera)
+            else:
+                print(f"  Error transitorio ({e}); reintento {intento + 1} en {espera:.1f}s")
+                await asyncio.sleep(espera)
+
+    uso = getattr(response, 'usage_metadata', None)
+    usados = getattr(uso, 'total_token_count', None)
+    if usados:
+        ctx.limitador.reembolsar(estimados - usados)
+    return response.text
+
+
+def guardar_cache(ctx):
+    """
+    Escribe el cache completo en disco de forma atomica (temporal + rename)
+    y descarta la bitacora, cuyo contenido ya quedo en el snapshot.
+    """
+    tmp_path = ctx.cache_path.with_suffix('.json.tmp')
+    if orjson is not None:
+        tmp_path.write_bytes(orjson.dumps(ctx.cache, option=orjson.OPT_INDENT_2))
+    else:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(ctx.cache, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, ctx.cache_path)
+    # El snapshot ya contiene todo lo registrado: compactar la bitacora
+    ctx.wal_path.unlink(missing_ok=True)
+
+
+def registrar_exito(ctx, item, analisis, contadores):
+    """Registra un analisis y persiste el cache por tandas (llamar bajo el lock)."""
+    registrar_analisis(ctx, item, analisis)
+    contadores['generados'] += 1
+    contadores['sin_guardar'] += 1
+
+    # Persistir por tandas para no reescribir el archivo en cada llamada
+    if contadores['sin_guardar'] >= GUARDAR_CADA:
+        guardar_cache(ctx)
+        contadores['sin_guardar'] = 0
+
+
+async def procesar_indicador(ctx, item, sem, lock, contadores):
+    """Genera el analisis de un indicador respetando el limite de concurrencia."""
+    async with sem:
+        print(f"[{item.i}/{item.total}] Generando: {item.indicador[:50]}...")
+        analisis = await generar_analisis(ctx, item.prompt)
 
-def generar_analisis(prompt):
-    """Genera analisis usando Gemini."""
+        if analisis.startswith("Error:"):
+            print(f"  ERROR: {analisis}")
+            contadores['errores'] += 1
+            return
+
+    async with lock:
+        registrar_exito(ctx, item, analisis, contadores)
+
+
+async def procesar_grupo(ctx, grupo, sem, lock, contadores):
+    """
+    Genera los analisis de varios indicadores con una sola llamada. Los que
+    no vengan en la respuesta (o si el JSON no es valido) se reintentan uno
+    por uno con el prompt individual.
+    """
+    if len(grupo) == 1:
+        await procesar_indicador(ctx, grupo[0], sem, lock, contadores)
+        return
+
+    async with sem:
+        print(f"[{grupo[0].i}-{grupo[-1].i}/{grupo[0].total}] Generando grupo de {len(grupo)} indicadores...")
+        texto = await generar_analisis(ctx, generar_prompt_multiple(grupo), config_multiple(len(grupo)))
+    resultados = {} if texto.startswith("Error:") else parsear_respuesta_multiple(texto)
+
+    faltantes = []
+    async with lock:
+        for n, item in enumerate(grupo):
+            if resultados.get(n):
+                registrar_exito(ctx, item, resultados[n], contadores)
+            else:
+                faltantes.append(item)
+
+    if faltantes:
+        print(f"  {len(faltantes)} indicador(es) sin respuesta en el grupo; se generan individualmente")
+        await asyncio.gather(*[
+            procesar_indicador(ctx, item, sem, lock, contadores) for item in faltantes
+        ])
+
+
+async def procesar_pendientes(ctx, pendientes):
+    """Ejecuta las llamadas pendientes con un pool acotado de workers."""
+    sem = asyncio.Semaphore(MAX_CONCURRENCIA)
+    lock = asyncio.Lock()
+    contadores = {'generados': 0, 'errores': 0, 'sin_guardar': 0}
+    k = max(1, INDICADORES_POR_PROMPT)
+    grupos = [pendientes[n:n + k] for n in range(0, len(pendientes), k)]
+    try:
+        await asyncio.gather(*[
+            procesar_grupo(ctx, grupo, sem, lock, contadores) for grupo in grupos
+        ])
+    finally:
+        # Guardar lo pendiente aunque la ejecucion se interrumpa
+        if contadores['sin_guardar']:
+            guardar_cache(ctx)
+    return contadores
+
+
+def hash_prompt(prompt):
+    """Clave de contenido del prompt (dos prompts identicos comparten analisis)."""
+    return hashlib.sha256(prompt.encode('utf-8')).hexdigest()
+
+
+def hash_historico(historico):
+    """Huella corta del historico; si no cambia, el analisis sigue vigente."""
+    contenido = json.dumps(historico, sort_keys=True).encode('utf-8')
+    return hashlib.blake2b(contenido, digest_size=8).hexdigest()
+
+
+# Trabajo pendiente por indicador (posicion, metadatos, prompt y huella)
+Pendiente = namedtuple(
+    'Pendiente',
+    'i total indicador linea objetivo sentido seccion prompt historico_hash',
+)
+
+
+def registrar_analisis(ctx, item, analisis):
+    """Agrega un analisis generado al cache en memoria."""
+    ctx.cache[item.indicador] = {
+        'analisis': analisis,
+        'linea': item.linea,
+        'objetivo': item.objetivo,
+        'sentido': item.sentido,
+        'prompt_sha256': hash_prompt(item.prompt),
+        'historico_hash': item.historico_hash,
+        'fecha_generacion': time.strftime('%Y-%m-%d %H:%M:%S')
+    }
+    # Append O(1) independiente del tamano del cache; permite reanudar
+    with open(ctx.wal_path, 'a', encoding='utf-8') as f:
+        f.write(json.dumps({'indicador': item.indicador, 'payload': ctx.cache[item.indicador]},
+                           ensure_ascii=False) + '\n')
+
+
+def _texto_respuesta_batch(respuesta):
+    """Extrae el texto de una respuesta generateContent serializada en JSON."""
+    try:
+        partes = respuesta['candidates'][0]['content']['parts']
+    except (KeyError, IndexError, TypeError):
+        return ''
+    return ''.join(p.get('text', '') for p in partes)
+
+
+def procesar_en_lote(ctx, pendientes):
+    """
+    Envia todos los prompts pendientes como un unico trabajo de la Batch API.
+
+    Fases: (1) construir el JSONL de solicitudes, (2) subirlo y crear el
+    trabajo, (3) sondear hasta un estado final y (4) descargar los resultados
+    e incorporarlos al cache usando la clave de cada linea.
+    """
+    contadores = {'generados': 0, 'errores': 0}
+    por_clave = {str(item.i): item for item in pendientes}
+
+    # Fase 1: archivo JSONL de solicitudes (clave = posicion del indicador)
+    with tempfile.NamedTemporaryFile('w', suffix='.jsonl', delete=False, encoding='utf-8') as f:
+        for clave, item in por_clave.items():
+            f.write(json.dumps({
+                'key': clave,
+                'request': {
+                    'contents': [{'role': 'user', 'parts': [{'text': item.prompt}]}],
+                    'generation_config': CONFIG_GENERACION,
+                },
+            }, ensure_ascii=False) + '\n')
+        ruta_solicitudes = f.name
+
+    # Fase 2: subir archivo y crear el trabajo
     try:
-        response = client.models.generate_content(
-            model=modelo_nombre,
-            contents=prompt,
-            config={
-                'max_output_tokens': 500,
-                'temperature': 0.7
-            }
+        archivo = ctx.client.files.upload(
+            file=ruta_solicitudes,
+            config={'display_name': 'analisis-pdi', 'mime_type': 'jsonl'},
         )
-        return response.text
-    except Exception as e:
-        return f"Error: {str(e)}"
+    finally:
+        os.remove(ruta_solicitudes)
+
+    job = ctx.client.batches.create(
+        model=ctx.modelo,
+        src=archivo.name,
+        config={'display_name': 'analisis-pdi'},
+    )
+    print(f"Trabajo batch creado: {job.name}")
+
+    # Fase 3: sondeo
+    while job.state.name not in ESTADOS_FINALES_BATCH:
+        print(f"  Estado: {job.state.name}; reintentando en {INTERVALO_SONDEO_BATCH}s...")
+        time.sleep(INTERVALO_SONDEO_BATCH)
+        job = ctx.client.batches.get(name=job.name)
+
+    if job.state.name != 'JOB_STATE_SUCCEEDED':
+        print(f"ERROR: el trabajo batch termino en {job.state.name}: {job.error}")
+        contadores['errores'] = len(pendientes)
+        return contadores
+
+    # Fase 4: descargar y fusionar resultados
+    contenido = ctx.client.files.download(file=job.dest.file_name).decode('utf-8')
+    for linea_jsonl in contenido.splitlines():
+        if not linea_jsonl.strip():
+            continue
+        resultado = json.loads(linea_jsonl)
+        item = por_clave.get(str(resultado.get('key')))
+        if item is None:
+            continue
+        analisis = _texto_respuesta_batch(resultado.get('response'))
+        if 'error' in resultado or not analisis:
+            print(f"[{item.i}/{item.total}] ERROR: {item.indicador[:50]}... {resultado.get('error', 'respuesta vacia')}")
+            contadores['errores'] += 1
+            continue
+        registrar_analisis(ctx, item, analisis)
+        contadores['generados'] += 1
+
+    guardar_cache(ctx)
+    return contadores
 
 
-def main():
+def main(ctx, usar_batch=False):
     """Genera analisis para todos los indicadores."""
-    indicadores = df_unificado['Indicador'].unique()
+    indicadores = ctx.df_unificado['Indicador'].unique()
     total = len(indicadores)
-    generados = 0
-    errores = 0
 
     print(f"\nGenerando analisis para {total} indicadores...")
     print("="*50)
 
+    # Particionar una sola vez: filas por indicador y sentido desde la base
+    grupos = dict(tuple(ctx.df_unificado.groupby('Indicador', sort=False, observed=True)))
+    sentido_map = {}
+    if 'Indicador' in ctx.df_base.columns and 'Sentido' in ctx.df_base.columns:
+        sentidos = ctx.df_base.drop_duplicates('Indicador').set_index('Indicador')['Sentido']
+        sentido_map = sentidos.dropna().astype(str).to_dict()
+
+    # Analisis ya generados indexados por hash de prompt (cache de contenido)
+    prompt_cache = {
+        entrada['prompt_sha256']: entrada['analisis']
+        for entrada in ctx.cache.values()
+        if isinstance(entrada, dict) and entrada.get('prompt_sha256')
+    }
+    reutilizados = 0
+
+    pendientes = []
+    duplicados = []  # prompts repetidos dentro de esta misma ejecucion
+    hashes_pendientes = set()
     for i, indicador in enumerate(indicadores, 1):
-        # Verificar si ya existe en cache
-        if indicador in cache:
-            print(f"[{i}/{total}] {indicador[:50]}... (ya existe)")
-            continue
-
         # Obtener metadatos
-        df_ind = df_unificado[df_unificado['Indicador'] == indicador]
-        if df_ind.empty:
+        df_ind = grupos.get(indicador)
+        if df_ind is None or df_ind.empty:
             continue
 
-        linea = df_ind['Linea'].iloc[0] if 'Linea' in df_ind.columns else 'N/D'
-        objetivo = df_ind['Objetivo'].iloc[0] if 'Objetivo' in df_ind.columns else 'N/D'
+        # Obtener historico y su huella
+        historico = obtener_historico(df_ind)
+        historico_hash = hash_historico(historico)
 
-        # Obtener sentido de df_base
-        sentido = 'Creciente'
-        if 'Indicador' in df_base.columns:
-            ind_base = df_base[df_base['Indicador'] == indicador]
-            if not ind_base.empty and 'Sentido' in ind_base.columns:
-                sentido = str(ind_base['Sentido'].iloc[0]) if pd.notna(ind_base['Sentido'].iloc[0]) else 'Creciente'
+        # Verificar si ya existe en cache y sigue vigente. Las entradas sin
+        # huella (generadas antes de registrarla) se conservan tal cual.
+        entrada = ctx.cache.get(indicador)
+        if entrada is not None:
+            hash_previo = entrada.get('historico_hash') if isinstance(entrada, dict) else None
+            if hash_previo is None or hash_previo == historico_hash:
+                print(f"[{i}/{total}] {indicador[:50]}... (ya existe)")
+                continue
+            print(f"[{i}/{total}] {indicador[:50]}... (historico cambio, se regenera)")
 
-        # Obtener historico
-        historico = obtener_historico(df_unificado, indicador)
-
-        # Generar prompt y analisis
-        prompt = generar_prompt_indicador(indicador, linea, objetivo, sentido, historico)
-
-        print(f"[{i}/{total}] Generando: {indicador[:50]}...")
-
-        analisis = generar_analisis(prompt)
-
-        if analisis.startswith("Error:"):
-            print(f"  ERROR: {analisis}")
-            errores += 1
-            # Esperar si hay error de cuota
-            if "429" in analisis:
-                print("  Esperando 30 segundos por limite de cuota...")
-                time.sleep(30)
+        linea = df_ind['Linea'].iloc[0] if 'Linea' in df_ind.columns else 'N/D'
+        objetivo = df_ind['Objetivo'].iloc[0] if 'Objetivo' in df_ind.columns else 'N/D'
+        sentido = sentido_map.get(indicador, 'Creciente')
+
+        # Generar prompt
+        seccion = generar_seccion_indicador(indicador, linea, objetivo, sentido, historico)
+        prompt = generar_prompt_indicador(seccion)
+        item = Pendiente(i, total, indicador, linea, objetivo, sentido, seccion, prompt, historico_hash)
+        clave = hash_prompt(prompt)
+        if clave in prompt_cache:
+            print(f"[{i}/{total}] {indicador[:50]}... (prompt identico en cache)")
+            registrar_analisis(ctx, item, prompt_cache[clave])
+            reutilizados += 1
+        elif clave in hashes_pendientes:
+            duplicados.append(item)
         else:
-            cache[indicador] = {
-                'analisis': analisis,
-                'linea': linea,
-                'objetivo': objetivo,
-                'sentido': sentido,
-                'fecha_generacion': time.strftime('%Y-%m-%d %H:%M:%S')
-            }
-            generados += 1
-
-            # Guardar cache despues de cada analisis exitoso
-            with open(cache_path, 'w', encoding='utf-8') as f:
-                json.dump(cache, f, ensure_ascii=False, indent=2)
-
-        # Esperar entre llamadas para evitar limite de cuota (5 seg para tier gratuito)
-        time.sleep(5)
+            hashes_pendientes.add(clave)
+            pendientes.append(item)
+
+    contadores = {'generados': 0, 'errores': 0}
+    if pendientes and usar_batch:
+        print(f"Pendientes: {len(pendientes)} (modo Batch API)")
+        contadores = procesar_en_lote(ctx, pendientes)
+    elif pendientes:
+        print(f"Pendientes: {len(pendientes)} (concurrencia: {MAX_CONCURRENCIA}, "
+              f"indicadores por prompt: {INDICADORES_POR_PROMPT})")
+        contadores = asyncio.run(procesar_pendientes(ctx, pendientes))
+
+    # Copiar el resultado a los indicadores cuyo prompt se repetia en la corrida
+    prompt_cache.update(
+        (entrada['prompt_sha256'], entrada['analisis'])
+        for entrada in ctx.cache.values()
+        if isinstance(entrada, dict) and entrada.get('prompt_sha256')
+    )
+    for item in duplicados:
+        analisis = prompt_cache.get(hash_prompt(item.prompt))
+        if analisis:
+            registrar_analisis(ctx, item, analisis)
+            reutilizados += 1
+    if reutilizados:
+        guardar_cache(ctx)
+        print(f"Reutilizados por prompt identico: {reutilizados}")
 
     print("="*50)
-    print(f"Completado: {generados} generados, {errores} errores")
-    print(f"Cache guardado en: {cache_path}")
+    print(f"Completado: {contadores['generados']} generados, {contadores['errores']} errores")
+    print(f"Cache guardado en: {ctx.cache_path}")
 
 
 if __name__ == "__main__":
-    main()
+    main(setup(), usar_batch="--batch" in sys.argv[1:])
@@ -5,33 +5,81 @@ Desacopla la lógica de generación de los views.
 
 from __future__ import annotations
 
+import io
 import json
+import time
+from functools import lru_cache, partial
 from pathlib import Path
-from typing import Optional
+from typing import Callable, Iterator, Optional
 
 from ai.gemini_provider import GeminiProvider
+from ai.response_cache import RespuestaCache, clave_respuesta
 from ai.static_provider import StaticProvider
 from ai.prompts import (
+    SISTEMA_GENERAL,
+    SISTEMA_LINEA,
+    SISTEMA_INDICADOR,
+    MAX_TOKENS_GENERAL,
+    MAX_TOKENS_LINEA,
+    MAX_TOKENS_INDICADOR,
     prompt_analisis_general,
     prompt_analisis_linea,
     prompt_analisis_indicador,
 )
-from core.config import CACHE_ANALISIS_PATH
+from core.calculations import tendencia_cumplimiento
+from core.config import (
+    CACHE_ANALISIS_PATH, CACHE_FALLOS_TTL, CACHE_RESPUESTAS_PATH, CACHE_RESPUESTAS_TTL,
+)
+
+try:  # parser JSON rápido opcional; json estándar si no está instalado
+    import orjson
+except ImportError:
+    orjson = None
+
+# Fila de la serie histórica en el prompt; `*` marca la línea base (2021)
+_FILA_HISTORICO = "\n{}{},{:.2f},{:.2f},{:.1f}".format
+
+
+@lru_cache(maxsize=4)
+def cargar_cache_analisis(path: Path, mtime: float = 0.0) -> dict[str, str]:
+    """
+    Lee el cache de análisis pre-generado una sola vez por versión del
+    archivo: `mtime` forma parte de la clave, así que al regenerarlo
+    (generar_analisis.py) se vuelve a leer sin reiniciar la aplicación.
+    lru_cache lo hace seguro entre los hilos de Streamlit.
+    Retorna {indicador: análisis} ya aplanado, sin entradas vacías; {} si
+    el archivo no existe o no es válido.
+    """
+    try:
+        contenido = path.read_bytes()
+        crudo = orjson.loads(contenido) if orjson is not None else json.loads(contenido)
+    except Exception:
+        return {}
+    return {
+        nombre: entrada["analisis"]
+        for nombre, entrada in crudo.items()
+        if isinstance(entrada, dict) and entrada.get("analisis")
+    }
 
 
 class AIService:
     """
     Pipeline de análisis inteligente:
     1. Busca en cache JSON pre-generado
-    2. Intenta con GeminiProvider (si API key disponible)
+    2. Intenta con GeminiProvider (si API key disponible), pasando antes
+       por la caché persistente de respuestas
     3. Cae a StaticProvider (siempre disponible)
     """
 
     def __init__(self, base_path: Optional[Path] = None) -> None:
         self._base = base_path or self._detectar_raiz()
         self._gemini = GeminiProvider()
+        # Línea e indicador: textos cortos sobre pocos datos → modelo ligero
+        self._gemini_ligero = GeminiProvider(model=GeminiProvider.MODEL_LIGERO)
         self._static = StaticProvider()
-        self._cache: dict = self._cargar_cache()
+        self._respuestas = RespuestaCache(self._base / CACHE_RESPUESTAS_PATH, ttl=CACHE_RESPUESTAS_TTL)
+        # Caché negativa en memoria: clave → instante (monotonic) en que vence
+        self._fallos: dict[str, float] = {}
 
     # ------------------------------------------------------------------
     # Análisis general del PDI
@@ -42,31 +90,53 @@ class AIService:
         cumplimiento_por_linea: list[dict],
     ) -> str:
         if self._gemini.is_available():
-            # Texto resumido para el encabezado del prompt
-            lineas_texto = "\n".join(
-                f"- {i['linea']}: {i['cumplimiento']:.1f}% ({i['indicadores']} indicadores)"
-                for i in cumplimiento_por_linea
-            ) or "No hay datos disponibles"
-
-            # Detalle enriquecido: agrega cumplidos y atención si están disponibles
-            lineas_detalle = []
-            for i in cumplimiento_por_linea:
-                lineas_detalle.append({
-                    "linea":        i.get("linea", ""),
-                    "cumplimiento": float(i.get("cumplimiento", 0)),
-                    "indicadores":  int(i.get("indicadores", 0)),
-                    "cumplidos":    int(i.get("cumplidos", 0)),
-                    "atencion":     int(i.get("atencion", i.get("no_cumplidos", 0))),
-                })
-
-            resultado = self._gemini.generate(
-                prompt_analisis_general(metricas, lineas_texto, lineas_detalle)
+            resultado = self._generar(
+                self._prompt_general(metricas, cumplimiento_por_linea),
+                max_tokens=MAX_TOKENS_GENERAL,
+                system=SISTEMA_GENERAL,
             )
             if resultado:
                 return resultado
 
         return self._static.analisis_general(metricas, cumplimiento_por_linea)
 
+    def analisis_general_stream(
+        self,
+        metricas: dict,
+        cumplimiento_por_linea: list[dict],
+    ) -> Iterator[str]:
+        """Como analisis_general, pero entrega el texto a medida que se genera."""
+        respaldo = partial(self._static.analisis_general, metricas, cumplimiento_por_linea)
+        if not self._gemini.is_available():
+            yield respaldo()
+            return
+        yield from self._generar_stream(
+            self._prompt_general(metricas, cumplimiento_por_linea),
+            SISTEMA_GENERAL, MAX_TOKENS_GENERAL, respaldo,
+        )
+
+    @staticmethod
+    def _prompt_general(metricas: dict, cumplimiento_por_linea: list[dict]) -> str:
+        """Mensaje de usuario del resumen ejecutivo a partir del resumen por línea."""
+        # Texto resumido para el encabezado del prompt
+        lineas_texto = "\n".join(
+            f"- {i['linea']}: {i['cumplimiento']:.1f}% ({i['indicadores']} indicadores)"
+            for i in cumplimiento_por_linea
+        ) or "No hay datos disponibles"
+
+        # Detalle enriquecido: agrega cumplidos y atención si están disponibles
+        lineas_detalle = [
+            {
+                "linea":        i.get("linea", ""),
+                "cumplimiento": float(i.get("cumplimiento", 0)),
+                "indicadores":  int(i.get("indicadores", 0)),
+                "cumplidos":    int(i.get("cumplidos", 0)),
+                "atencion":     int(i.get("atencion", i.get("no_cumplidos", 0))),
+            }
+            for i in cumplimiento_por_linea
+        ]
+        return prompt_analisis_general(metricas, lineas_texto, lineas_detalle)
+
     # ------------------------------------------------------------------
     # Análisis por línea estratégica
     # ------------------------------------------------------------------
@@ -79,59 +149,14 @@ class AIService:
         indicadores_data: Optional[list[dict]] = None,
     ) -> str:
         if self._gemini.is_available():
-            objetivos_texto = "\n".join(
-                f"- {o['objetivo']}: {o['cumplimiento']:.1f}% ({o.get('indicadores', 0)} indicadores)"
-                for o in objetivos_data
-            ) or "No hay datos de objetivos disponibles"
-
-            indicadores_section = ""
-            if indicadores_data:
-                def _gap(ind) -> float:
-                    try:
-                        return float(ind.get("meta", 0) or 0) - float(ind.get("ejecucion", 0) or 0)
-                    except Exception:
-                        return 0.0
-
-                def _fmt_ind(ind) -> str:
-                    nombre = ind.get("nombre", "Indicador")
-                    cumpl  = float(ind.get("cumplimiento", 0))
-                    meta   = ind.get("meta")
-                    ejec   = ind.get("ejecucion")
-                    estado = "✓" if cumpl >= 100 else ("⚠" if cumpl >= 80 else "✗")
-                    partes = [f"{estado} {nombre}: {cumpl:.1f}%"]
-                    if meta is not None and ejec is not None:
-                        try:
-                            m, e  = float(meta), float(ejec)
-                            brecha = m - e
-                            partes.append(f"(Meta {m:.1f} | Ejec {e:.1f} | brecha {brecha:+.1f})")
-                        except Exception:
-                            pass
-                    return " ".join(partes)
-
-                # Ordenar: atención por mayor brecha primero, luego progreso, luego cumplidos
-                en_atencion = sorted(
-                    [i for i in indicadores_data if float(i.get("cumplimiento", 0)) < 80],
-                    key=_gap, reverse=True
-                )
-                en_prog = sorted(
-                    [i for i in indicadores_data if 80 <= float(i.get("cumplimiento", 0)) < 100],
-                    key=_gap, reverse=True
-                )
-                cumplidos = [i for i in indicadores_data if float(i.get("cumplimiento", 0)) >= 100]
-
-                lineas_inds = (
-                    [_fmt_ind(i) for i in en_atencion]
-                    + [_fmt_ind(i) for i in en_prog]
-                    + [_fmt_ind(i) for i in cumplidos]
-                )
-                indicadores_section = "\n".join(lineas_inds)
-
-            resultado = self._gemini.generate(
-                prompt_analisis_linea(
+            resultado = self._generar(
+                self._prompt_linea(
                     nombre_linea, total_indicadores, cumplimiento_promedio,
-                    objetivos_texto, indicadores_section,
+                    objetivos_data, indicadores_data,
                 ),
-                max_tokens=1200,
+                max_tokens=MAX_TOKENS_LINEA,
+                system=SISTEMA_LINEA,
+                proveedor=self._gemini_ligero,
             )
             if resultado:
                 return resultado
@@ -140,6 +165,124 @@ class AIService:
             nombre_linea, total_indicadores, cumplimiento_promedio, objetivos_data
         )
 
+    def analisis_linea_stream(
+        self,
+        nombre_linea: str,
+        total_indicadores: int,
+        cumplimiento_promedio: float,
+        objetivos_data: list[dict],
+        indicadores_data: Optional[list[dict]] = None,
+    ) -> Iterator[str]:
+        """Como analisis_linea, pero entrega el texto a medida que se genera."""
+        respaldo = partial(
+            self._static.analisis_linea,
+            nombre_linea, total_indicadores, cumplimiento_promedio, objetivos_data,
+        )
+        if not self._gemini.is_available():
+            yield respaldo()
+            return
+        yield from self._generar_stream(
+            self._prompt_linea(
+                nombre_linea, total_indicadores, cumplimiento_promedio,
+                objetivos_data, indicadores_data,
+            ),
+            SISTEMA_LINEA, MAX_TOKENS_LINEA, respaldo,
+            proveedor=self._gemini_ligero,
+        )
+
+    def analisis_lineas(self, lineas: list[dict]) -> dict[str, str]:
+        """
+        Análisis de varias líneas a la vez: las solicitudes que no están en
+        caché se envían concurrentemente (ver GeminiProvider.generate_many).
+        Cada elemento: {linea, indicadores, cumplimiento, objetivos, indicadores_data}.
+        """
+        textos = [""] * len(lineas)
+        if self._gemini.is_available() and lineas:
+            solicitudes = [
+                (
+                    self._prompt_linea(
+                        l["linea"], l.get("indicadores", 0), l.get("cumplimiento", 0.0),
+                        l.get("objetivos", []), l.get("indicadores_data"),
+                    ),
+                    SISTEMA_LINEA,
+                    MAX_TOKENS_LINEA,
+                )
+                for l in lineas
+            ]
+            textos = self._generar_varios(solicitudes, proveedor=self._gemini_ligero)
+
+        return {
+            l["linea"]: texto or self._static.analisis_linea(
+                l["linea"], l.get("indicadores", 0), l.get("cumplimiento", 0.0),
+                l.get("objetivos", []),
+            )
+            for l, texto in zip(lineas, textos)
+        }
+
+    @staticmethod
+    def _prompt_linea(
+        nombre_linea: str,
+        total_indicadores: int,
+        cumplimiento_promedio: float,
+        objetivos_data: list[dict],
+        indicadores_data: Optional[list[dict]] = None,
+    ) -> str:
+        """Mensaje de usuario de una línea: objetivos e indicadores ordenados por brecha."""
+        objetivos_texto = "\n".join(
+            f"- {o['objetivo']}: {o['cumplimiento']:.1f}% ({o.get('indicadores', 0)} indicadores)"
+            for o in objetivos_data
+        ) or "No hay datos de objetivos disponibles"
+
+        indicadores_section = ""
+        if indicadores_data:
+            def _gap(ind) -> float:
+                try:
+                    return float(ind.get("meta", 0) or 0) - float(ind.get("ejecucion", 0) or 0)
+                except Exception:
+                    return 0.0
+
+            def _fmt_ind(estado: str, cumpl: float, ind) -> str:
+                nombre = ind.get("nombre", "Indicador")
+                meta   = ind.get("meta")
+                ejec   = ind.get("ejecucion")
+                partes = [f"{estado} {nombre}: {cumpl:.1f}%"]
+                if meta is not None and ejec is not None:
+                    try:
+                        m, e  = float(meta), float(ejec)
+                        brecha = m - e
+                        partes.append(f"(Meta {m:.1f} | Ejec {e:.1f} | brecha {brecha:+.1f})")
+                    except Exception:
+                        pass
+                return " ".join(partes)
+
+            # Una sola pasada: cada cumplimiento se convierte una vez y el
+            # indicador cae en su grupo (NaN no entra en ninguno)
+            en_atencion, en_prog, cumplidos = [], [], []
+            for ind in indicadores_data:
+                cumpl = float(ind.get("cumplimiento", 0))
+                if cumpl >= 100:
+                    cumplidos.append((cumpl, ind))
+                elif cumpl >= 80:
+                    en_prog.append((cumpl, ind))
+                elif cumpl < 80:
+                    en_atencion.append((cumpl, ind))
+
+            # Ordenar: atención por mayor brecha primero, luego progreso, luego cumplidos
+            en_atencion.sort(key=lambda par: _gap(par[1]), reverse=True)
+            en_prog.sort(key=lambda par: _gap(par[1]), reverse=True)
+
+            buf = io.StringIO()
+            for estado, grupo in (("✗", en_atencion), ("⚠", en_prog), ("✓", cumplidos)):
+                for cumpl, ind in grupo:
+                    buf.write(_fmt_ind(estado, cumpl, ind))
+                    buf.write("\n")
+            indicadores_section = buf.getvalue().rstrip("\n")
+
+        return prompt_analisis_linea(
+            nombre_linea, total_indicadores, cumplimiento_promedio,
+            objetivos_texto, indicadores_section,
+        )
+
     # ------------------------------------------------------------------
     # Análisis por indicador
     # ------------------------------------------------------------------
@@ -152,30 +295,23 @@ class AIService:
         sentido: str = "Creciente",
     ) -> str:
         # 1. Cache pre-generado
-        cached = self._cache.get(nombre_indicador, {}).get("analisis")
+        cached = self._cache.get(nombre_indicador)
         if cached:
             return f"**Análisis del Indicador**\n\n{cached}"
 
         # 2. IA en vivo
         if self._gemini.is_available() and historico_data:
-            historico_texto = "\n".join(
-                f"- {h['año']}{' (Línea Base)' if h['año'] == 2021 else ''}: "
-                f"Meta: {h['meta']:.2f}, Ejecución: {h['ejecucion']:.2f}, Cumplimiento: {h['cumplimiento']:.1f}%"
-                for h in historico_data
-            )
-            if len(historico_data) >= 2:
-                primer_cumpl = historico_data[0]["cumplimiento"]
-                ultimo_cumpl = historico_data[-1]["cumplimiento"]
-                variacion = ultimo_cumpl - primer_cumpl
-                tendencia = "ascendente" if variacion > 5 else "descendente" if variacion < -5 else "estable"
-            else:
-                variacion, tendencia = 0.0, "no determinada"
-
-            resultado = self._gemini.generate(
+            historico_texto, años, cumplimientos = self._historico_csv(historico_data)
+            variacion, tendencia = tendencia_cumplimiento(años, cumplimientos)
+
+            resultado = self._generar(
                 prompt_analisis_indicador(
                     nombre_indicador, linea, descripcion,
                     historico_texto, tendencia, variacion, sentido,
-                )
+                ),
+                max_tokens=MAX_TOKENS_INDICADOR,
+                system=SISTEMA_INDICADOR,
+                proveedor=self._gemini_ligero,
             )
             if resultado:
                 return resultado
@@ -185,19 +321,147 @@ class AIService:
             nombre_indicador, linea, historico_data, sentido
         )
 
+    def limpiar_respuestas(self) -> None:
+        """Olvida las respuestas guardadas: el próximo análisis se pide al modelo."""
+        self._respuestas.limpiar()
+        self._fallos.clear()
+
     # ------------------------------------------------------------------
     # Internos
     # ------------------------------------------------------------------
-    def _cargar_cache(self) -> dict:
-        path = self._base / CACHE_ANALISIS_PATH
-        if not path.exists():
-            # compatibilidad con ruta legacy
-            legacy = self._base / "Data" / "analisis_cache.json"
-            path = legacy if legacy.exists() else path
+    @staticmethod
+    def _historico_csv(historico_data: list[dict]) -> tuple[str, list, list]:
+        """
+        Tabla compacta tipo CSV de la serie (es la mayor parte del prompt),
+        junto con años y cumplimientos, en una sola pasada sobre los datos.
+        """
+        años, cumplimientos = [], []
+        buf = io.StringIO()
+        buf.write("año,meta,ejecucion,cumplimiento%")
+        for h in historico_data:
+            año, cumpl = h["año"], h["cumplimiento"]
+            años.append(año)
+            cumplimientos.append(cumpl)
+            buf.write(_FILA_HISTORICO(año, "*" if año == 2021 else "", h["meta"], h["ejecucion"], cumpl))
+        return buf.getvalue(), años, cumplimientos
+
+    @staticmethod
+    def _clave(proveedor: GeminiProvider, prompt: str, system: str, max_tokens: int) -> str:
+        return clave_respuesta(
+            proveedor.model, prompt, system=system, max_tokens=max_tokens,
+            temperatura=proveedor.TEMPERATURE,
+        )
+
+    def _generar(
+        self,
+        prompt: str,
+        system: str,
+        max_tokens: int = 1000,
+        proveedor: Optional[GeminiProvider] = None,
+    ) -> str:
+        """
+        Respuesta de Gemini (modelo de `proveedor`, por defecto el principal),
+        reutilizando la guardada para la misma solicitud.
+        """
+        proveedor = proveedor or self._gemini
+        clave = self._clave(proveedor, prompt, system, max_tokens)
+        guardada = self._respuestas.get(clave)
+        if guardada:
+            return guardada
+        resultado = proveedor.generate(prompt, max_tokens=max_tokens, system=system)
+        if resultado:
+            self._respuestas.set(clave, resultado)
+        return resultado
+
+    def _fallo_reciente(self, clave: str) -> bool:
+        """True si la solicitud falló hace menos de CACHE_FALLOS_TTL segundos."""
+        vence = self._fallos.get(clave)
+        if vence is None:
+            return False
+        if time.monotonic() < vence:
+            return True
+        self._fallos.pop(clave, None)
+        return False
+
+    def _registrar_fallo(self, clave: str) -> None:
+        self._fallos[clave] = time.monotonic() + CACHE_FALLOS_TTL
+
+    def _generar_stream(
+        self,
+        prompt: str,
+        system: str,
+        max_tokens: int,
+        respaldo: Callable[[], str],
+        proveedor: Optional[GeminiProvider] = None,
+    ) -> Iterator[str]:
+        """
+        Versión por fragmentos de _generar: una respuesta en caché se entrega
+        completa de una vez; si no, se transmite desde Gemini y al terminar se
+        guarda. Si el modelo no produce nada se entrega `respaldo()`.
+        Las páginas llaman a esto en cada rerun (no pasa por st.cache_data),
+        así que un fallo se recuerda CACHE_FALLOS_TTL segundos y mientras
+        tanto se entrega `respaldo()` sin volver a llamar al modelo.
+        """
+        proveedor = proveedor or self._gemini
+        clave = self._clave(proveedor, prompt, system, max_tokens)
+        guardada = self._respuestas.get(clave)
+        if guardada:
+            yield guardada
+            return
+        if self._fallo_reciente(clave):
+            yield respaldo()
+            return
+        partes: list[str] = []
         try:
-            with open(path, "r", encoding="utf-8") as f:
-                return json.load(f)
+            for fragmento in proveedor.generate_stream(prompt, max_tokens=max_tokens, system=system):
+                partes.append(fragmento)
+                yield fragmento
         except Exception:
+            # Respuesta cortada: lo ya mostrado se queda, pero no se guarda
+            self._registrar_fallo(clave)
+            if not partes:
+                yield respaldo()
+            return
+        if partes:
+            self._respuestas.set(clave, "".join(partes))
+        else:
+            self._registrar_fallo(clave)
+            yield respaldo()
+
+    def _generar_varios(
+        self,
+        solicitudes: list[tuple[str, str, int]],
+        proveedor: Optional[GeminiProvider] = None,
+    ) -> list[str]:
+        """
+        Igual que _generar para una lista de (prompt, system, max_tokens):
+        las que no están en caché se resuelven en paralelo con una sola ronda.
+        """
+        proveedor = proveedor or self._gemini
+        claves = [self._clave(proveedor, *sol) for sol in solicitudes]
+        textos = [self._respuestas.get(c) or "" for c in claves]
+        pendientes = [i for i, t in enumerate(textos) if not t]
+        if pendientes:
+            nuevos = proveedor.generate_many([solicitudes[i] for i in pendientes])
+            for i, texto in zip(pendientes, nuevos):
+                if texto:
+                    self._respuestas.set(claves[i], texto)
+                    textos[i] = texto
+        return textos
+
+    @property
+    def _cache(self) -> dict[str, str]:
+        """Cache pre-generado vigente; solo cuesta un stat() por consulta."""
+        path = self._base / CACHE_ANALISIS_PATH
+        try:
+            return cargar_cache_analisis(path, path.stat().st_mtime)
+        except OSError:
+            pass
+        # compatibilidad con ruta legacy
+        legacy = self._base / "Data" / "analisis_cache.json"
+        try:
+            return cargar_cache_analisis(legacy, legacy.stat().st_mtime)
+        except OSError:
             return {}
 
     @staticmethod
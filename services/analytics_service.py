@@ -5,6 +5,7 @@ Esta capa NO importa Streamlit; el @st.cache_data va en los views.
 
 from __future__ import annotations
 
+import numpy as np
 import pandas as pd
 from typing import Optional
 
@@ -22,10 +23,8 @@ from core.calculations import (
     cumplimiento_jerarquico,
 )
 from core.filters import (
+    filtrar_corte,
     filtrar_por_año,
-    filtrar_años_validos,
-    filtrar_por_fuente,
-    filtrar_indicadores,
     filtrar_proyectos,
     excluir_standby,
     contar_standby,
@@ -51,10 +50,10 @@ class AnalyticsService:
             return MetricasGenerales.vacio()
 
         año = año or obtener_año_mas_reciente(df_unificado)
-        df = filtrar_por_año(df_unificado, año)
-        df = filtrar_años_validos(df, AÑOS_PDI)
-        df = filtrar_por_fuente(df, FUENTE_AVANCE)
-        df = filtrar_indicadores(df)
+        df = filtrar_corte(
+            df_unificado, año=año, años_validos=AÑOS_PDI,
+            fuente=FUENTE_AVANCE, proyectos=0,
+        )
 
         stand_by = contar_standby(df)
         df = excluir_standby(df)
@@ -97,9 +96,7 @@ class AnalyticsService:
             return []
 
         año = año or obtener_año_mas_reciente(df_unificado)
-        df = filtrar_por_año(df_unificado, año)
-        df = filtrar_indicadores(df)
-        df = filtrar_por_fuente(df, FUENTE_AVANCE)
+        df = filtrar_corte(df_unificado, año=año, fuente=FUENTE_AVANCE, proyectos=0)
         df = excluir_standby(df)
 
         if "Linea" not in df.columns or "Cumplimiento" not in df.columns:
@@ -114,7 +111,7 @@ class AnalyticsService:
             df_linea = df_full[df_full["Linea"] == linea]
 
             if "Objetivo" in df_linea.columns:
-                por_obj = df_linea.groupby("Objetivo")["Cumplimiento"].mean()
+                por_obj = df_linea.groupby("Objetivo", observed=True)["Cumplimiento"].mean()
                 cumpl = round(float(por_obj.mean()), 1) if len(por_obj) else 0.0
             else:
                 cumpl = round(float(df_linea["Cumplimiento"].mean()), 1)
@@ -212,7 +209,7 @@ class AnalyticsService:
             if "Semestre" in df_ind.columns:
                 df_anual = df_ind[df_ind["Semestre"].isna() | (df_ind["Semestre"] == "") | (df_ind["Semestre"] == 0)]
                 if df_anual.empty:
-                    df_ind = df_ind.groupby("Año").agg({
+                    df_ind = df_ind.groupby("Año", observed=True).agg({
                         "Meta": "mean", "Ejecución": "mean", "Cumplimiento": "mean",
                         "Indicador": "first", "Linea": "first", "Objetivo": "first",
                     }).reset_index()
@@ -239,14 +236,11 @@ class AnalyticsService:
             return pd.DataFrame()
 
         año = año or obtener_año_mas_reciente(df_unificado)
-        df = filtrar_por_año(df_unificado, año)
-        df = filtrar_años_validos(df, AÑOS_PDI)
-        df = filtrar_por_fuente(df, FUENTE_AVANCE)
-
-        if filtro_tipo == "indicadores":
-            df = filtrar_indicadores(df)
-        elif filtro_tipo == "proyectos":
-            df = filtrar_proyectos(df)
+        proyectos = {"indicadores": 0, "proyectos": 1}.get(filtro_tipo)
+        df = filtrar_corte(
+            df_unificado, año=año, años_validos=AÑOS_PDI,
+            fuente=FUENTE_AVANCE, proyectos=proyectos,
+        )
 
         if "Cumplimiento" in df.columns:
             df = df.copy()
@@ -264,7 +258,7 @@ class AnalyticsService:
         for linea in sorted(df["Linea"].dropna().unique()):
             df_linea = df[df["Linea"] == linea]
             if "Objetivo" in df_linea.columns and df_linea["Objetivo"].notna().any():
-                por_obj = df_linea.groupby("Objetivo")["Cumplimiento"].mean()
+                por_obj = df_linea.groupby("Objetivo", observed=True)["Cumplimiento"].mean()
                 cumpl_linea = float(por_obj.mean()) if len(por_obj) else 0.0
             else:
                 cumpl_linea = float(df_linea["Cumplimiento"].mean()) if "Cumplimiento" in df_linea.columns else 0.0
@@ -308,14 +302,19 @@ class AnalyticsService:
     def preparar_historico_para_ia(self, df_indicador: pd.DataFrame) -> list[dict]:
         if df_indicador is None or df_indicador.empty:
             return []
-        resultado = []
-        for _, row in df_indicador.sort_values("Año").iterrows():
-            año = int(row["Año"]) if "Año" in row and pd.notna(row["Año"]) else None
-            meta = float(row["Meta"]) if "Meta" in row and pd.notna(row["Meta"]) else 0.0
-            ejec = float(row["Ejecución"]) if "Ejecución" in row and pd.notna(row["Ejecución"]) else 0.0
-            cumpl = (ejec / meta * 100) if meta > 0 else 0.0
-            resultado.append({"año": año, "meta": meta, "ejecucion": ejec, "cumplimiento": cumpl})
-        return resultado
+        df = df_indicador.sort_values("Año")
+        ceros = np.zeros(len(df))
+        meta = df["Meta"].fillna(0).to_numpy(dtype=float) if "Meta" in df.columns else ceros
+        ejec = df["Ejecución"].fillna(0).to_numpy(dtype=float) if "Ejecución" in df.columns else ceros
+        cumpl = np.where(meta > 0, ejec / np.where(meta > 0, meta, 1) * 100, 0.0)
+        años = (
+            [int(a) if pd.notna(a) else None for a in df["Año"].to_numpy()]
+            if "Año" in df.columns else [None] * len(df)
+        )
+        return [
+            {"año": a, "meta": m, "ejecucion": e, "cumplimiento": c}
+            for a, m, e, c in zip(años, meta.tolist(), ejec.tolist(), cumpl.tolist())
+        ]
 
     def preparar_objetivos_para_ia(
         self,
@@ -326,13 +325,7 @@ class AnalyticsService:
             return []
         if año and "Año" in df_linea.columns:
             df_linea = df_linea[df_linea["Año"] == año]
-        resultado = []
-        for obj in df_linea["Objetivo"].dropna().unique():
-            df_o = df_linea[df_linea["Objetivo"] == obj]
-            cumpl = df_o["Cumplimiento"].mean() if "Cumplimiento" in df_o.columns else 0.0
-            inds = df_o["Indicador"].nunique() if "Indicador" in df_o.columns else len(df_o)
-            resultado.append({"objetivo": obj, "cumplimiento": float(cumpl) if pd.notna(cumpl) else 0.0, "indicadores": inds})
-        return sorted(resultado, key=lambda x: x["cumplimiento"], reverse=True)
+        return self._resumen_para_ia(df_linea, "Objetivo", "objetivo")
 
     def preparar_lineas_para_ia(
         self,
@@ -343,17 +336,33 @@ class AnalyticsService:
             return []
         if año and "Año" in df_unificado.columns:
             df_unificado = df_unificado[df_unificado["Año"] == año]
-        resultado = []
-        for linea in df_unificado["Linea"].dropna().unique():
-            df_l = df_unificado[df_unificado["Linea"] == linea]
-            cumpl = df_l["Cumplimiento"].mean() if "Cumplimiento" in df_l.columns else 0.0
-            inds = df_l["Indicador"].nunique() if "Indicador" in df_l.columns else len(df_l)
-            resultado.append({"linea": linea, "cumplimiento": float(cumpl) if pd.notna(cumpl) else 0.0, "indicadores": inds})
-        return sorted(resultado, key=lambda x: x["cumplimiento"], reverse=True)
+        return self._resumen_para_ia(df_unificado, "Linea", "linea")
 
     # ------------------------------------------------------------------
     # Helpers privados
     # ------------------------------------------------------------------
+    @staticmethod
+    def _resumen_para_ia(df: pd.DataFrame, columna: str, clave: str) -> list[dict]:
+        """
+        {clave, cumplimiento, indicadores} por cada valor de `columna` (un solo
+        groupby), ordenado de mayor a menor cumplimiento; los empates conservan
+        el orden de aparición.
+        """
+        if df.empty:
+            return []
+        grupos = df.groupby(columna, sort=False, observed=True)
+        cumpl = grupos["Cumplimiento"].mean() if "Cumplimiento" in df.columns else None
+        inds = grupos["Indicador"].nunique() if "Indicador" in df.columns else grupos.size()
+        resultado = [
+            {
+                clave: valor,
+                "cumplimiento": float(cumpl[valor]) if cumpl is not None and pd.notna(cumpl[valor]) else 0.0,
+                "indicadores": int(n),
+            }
+            for valor, n in inds.items()
+        ]
+        return sorted(resultado, key=lambda x: x["cumplimiento"], reverse=True)
+
     @staticmethod
     def _metadatos_indicador(
         df_base: Optional[pd.DataFrame],
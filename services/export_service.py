@@ -5,10 +5,24 @@ Centraliza toda la lógica de exportación.
 
 from __future__ import annotations
 
+import importlib.util
 import io
+from functools import lru_cache
+
 import pandas as pd
 
 
+@lru_cache(maxsize=1)
+def motor_escritura_excel() -> str:
+    """
+    Motor para pd.ExcelWriter: 'xlsxwriter' (escritura en streaming, más
+    rápida) cuando está instalado; en otro caso 'openpyxl'.
+    """
+    if importlib.util.find_spec("xlsxwriter") is not None:
+        return "xlsxwriter"
+    return "openpyxl"
+
+
 class ExportService:
 
     @staticmethod
@@ -19,6 +33,15 @@ class ExportService:
             df.to_excel(writer, sheet_name=nombre_hoja, index=False)
         return buffer.getvalue()
 
+    @staticmethod
+    def exportar_excel_hojas(hojas: dict[str, pd.DataFrame]) -> bytes:
+        """Serializa varias hojas {nombre: DataFrame} en un solo libro .xlsx."""
+        buffer = io.BytesIO()
+        with pd.ExcelWriter(buffer, engine=motor_escritura_excel()) as writer:
+            for nombre_hoja, df in hojas.items():
+                df.to_excel(writer, sheet_name=nombre_hoja, index=False)
+        return buffer.getvalue()
+
     @staticmethod
     def exportar_pdf_reportlab(
         df_base: pd.DataFrame,
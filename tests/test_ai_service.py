@@ -0,0 +1,116 @@
+"""
+AIService: caché negativa de los análisis por fragmentos. Un fallo del
+modelo se recuerda un tiempo para que los reruns de la página no vuelvan
+a llamarlo y muestren directamente el análisis estático.
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from services.ai_service import AIService  # noqa: E402
+
+METRICAS = {
+    "cumplimiento_promedio": 85.0, "total_indicadores": 10,
+    "indicadores_cumplidos": 4, "en_progreso": 3, "no_cumplidos": 3,
+}
+LINEAS = [{"linea": "Calidad", "cumplimiento": 85.0, "indicadores": 10}]
+
+
+class ProveedorFalso:
+    """Sustituto de GeminiProvider que cuenta llamadas y puede fallar."""
+
+    model = "modelo-falso"
+    TEMPERATURE = 0.3
+
+    def __init__(self, fragmentos=(), error=None):
+        self.fragmentos = list(fragmentos)
+        self.error = error
+        self.llamadas = 0
+
+    def is_available(self):
+        return True
+
+    def generate_stream(self, prompt, max_tokens=1000, system=None):
+        self.llamadas += 1
+        yield from self.fragmentos
+        if self.error is not None:
+            raise self.error
+
+
+@pytest.fixture
+def servicio(tmp_path):
+    return AIService(base_path=tmp_path)
+
+
+def test_general_stream_recuerda_el_fallo(servicio):
+    proveedor = ProveedorFalso(error=RuntimeError("503 UNAVAILABLE"))
+    servicio._gemini = proveedor
+    estatico = servicio._static.analisis_general(METRICAS, LINEAS)
+
+    assert "".join(servicio.analisis_general_stream(METRICAS, LINEAS)) == estatico
+    assert "".join(servicio.analisis_general_stream(METRICAS, LINEAS)) == estatico
+    assert proveedor.llamadas == 1
+
+
+def test_general_stream_reintenta_al_vencer_el_fallo(servicio, monkeypatch):
+    import services.ai_service as modulo
+
+    monkeypatch.setattr(modulo, "CACHE_FALLOS_TTL", 0)
+    proveedor = ProveedorFalso()
+    servicio._gemini = proveedor
+
+    list(servicio.analisis_general_stream(METRICAS, LINEAS))
+    list(servicio.analisis_general_stream(METRICAS, LINEAS))
+    assert proveedor.llamadas == 2
+
+
+def test_general_stream_guarda_la_respuesta(servicio):
+    proveedor = ProveedorFalso(fragmentos=["Hola ", "mundo"])
+    servicio._gemini = proveedor
+
+    assert list(servicio.analisis_general_stream(METRICAS, LINEAS)) == ["Hola ", "mundo"]
+    assert list(servicio.analisis_general_stream(METRICAS, LINEAS)) == ["Hola mundo"]
+    assert proveedor.llamadas == 1
+
+
+def test_limpiar_respuestas_olvida_los_fallos(servicio):
+    proveedor = ProveedorFalso()
+    servicio._gemini = proveedor
+
+    list(servicio.analisis_general_stream(METRICAS, LINEAS))
+    servicio.limpiar_respuestas()
+    list(servicio.analisis_general_stream(METRICAS, LINEAS))
+    assert proveedor.llamadas == 2
+
+
+OBJETIVOS = [{"objetivo": "Mejorar la calidad", "cumplimiento": 70.0, "indicadores": 2}]
+
+
+def _linea_stream(servicio):
+    return "".join(servicio.analisis_linea_stream("Calidad", 5, 85.0, OBJETIVOS))
+
+
+def test_linea_stream_recuerda_el_fallo(servicio):
+    servicio._gemini = ProveedorFalso()
+    ligero = ProveedorFalso(error=RuntimeError("429 RESOURCE_EXHAUSTED"))
+    servicio._gemini_ligero = ligero
+    estatico = servicio._static.analisis_linea("Calidad", 5, 85.0, OBJETIVOS)
+
+    assert _linea_stream(servicio) == estatico
+    assert _linea_stream(servicio) == estatico
+    assert ligero.llamadas == 1
+
+
+def test_linea_stream_respuesta_cortada_no_se_guarda(servicio):
+    servicio._gemini = ProveedorFalso()
+    ligero = ProveedorFalso(fragmentos=["Parcial"], error=RuntimeError("503"))
+    servicio._gemini_ligero = ligero
+    estatico = servicio._static.analisis_linea("Calidad", 5, 85.0, OBJETIVOS)
+
+    assert _linea_stream(servicio) == "Parcial"
+    assert _linea_stream(servicio) == estatico
+    assert ligero.llamadas == 1
@@ -0,0 +1,37 @@
+"""
+Prueba de humo de generar_analisis.setup(): recorre la inicialización
+completa con el cliente de Gemini y la lectura del Excel sustituidos,
+de modo que un error que rompa el script entero no pase inadvertido.
+"""
+
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+pytest.importorskip("dotenv")
+import generar_analisis  # noqa: E402
+
+
+def test_setup_construye_contexto(monkeypatch, tmp_path):
+    cliente = object()
+    df_base = pd.DataFrame({"Indicador": ["A", "B"]})
+    df_unificado = pd.DataFrame({"Indicador": ["A", "A", "B"], "Año": [2022, 2023, 2023]})
+
+    monkeypatch.setenv("GOOGLE_API_KEY", "clave-de-prueba")
+    monkeypatch.setattr(generar_analisis, "load_dotenv", lambda: None)
+    monkeypatch.setattr(generar_analisis, "BASE_PATH", tmp_path)
+    monkeypatch.setattr(generar_analisis, "crear_cliente_genai", lambda api_key: cliente)
+    monkeypatch.setattr(generar_analisis, "elegir_modelo", lambda client: "models/gemini-prueba")
+    monkeypatch.setattr(generar_analisis, "cargar_datos", lambda path: (df_base, df_unificado))
+
+    ctx = generar_analisis.setup()
+
+    assert ctx.client is cliente
+    assert ctx.modelo == "models/gemini-prueba"
+    assert ctx.df_unificado is df_unificado
+    assert ctx.cache == {}
+    assert ctx.cache_path == tmp_path / "Data" / "analisis_cache.json"
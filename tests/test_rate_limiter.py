@@ -0,0 +1,117 @@
+"""
+ai.rate_limiter: aritmética de espera del token bucket, pausas tras un 429
+y lectura del tiempo de espera sugerido por el servidor.
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import ai.rate_limiter as rl  # noqa: E402
+from ai.rate_limiter import TokenBucket, es_error_cuota, segundos_de_espera  # noqa: E402
+
+
+class Reloj:
+    """time.monotonic controlable desde la prueba."""
+
+    def __init__(self):
+        self.ahora = 1000.0
+
+    def __call__(self):
+        return self.ahora
+
+
+@pytest.fixture
+def reloj(monkeypatch):
+    r = Reloj()
+    monkeypatch.setattr(rl.time, "monotonic", r)
+    return r
+
+
+class ErrorHttp(Exception):
+    def __init__(self, mensaje="", code=None, headers=None):
+        super().__init__(mensaje)
+        self.code = code
+        if headers is not None:
+            self.response = type("Respuesta", (), {"headers": headers})()
+
+
+# ---------------------------------------------------------------------------
+# TokenBucket
+# ---------------------------------------------------------------------------
+def test_consume_hasta_agotar_rpm(reloj):
+    cubeta = TokenBucket(rpm=60)
+    for _ in range(60):
+        assert cubeta._intentar_consumir(0) == 0.0
+    # Recarga de 1 solicitud por segundo: falta exactamente una
+    assert cubeta._intentar_consumir(0) == pytest.approx(1.0)
+    reloj.ahora += 1.0
+    assert cubeta._intentar_consumir(0) == 0.0
+
+
+def test_espera_por_tokens(reloj):
+    cubeta = TokenBucket(rpm=1000, tpm=600)
+    assert cubeta._intentar_consumir(600) == 0.0
+    # 10 tokens/s: 300 tokens tardan 30 s en recargarse
+    assert cubeta._intentar_consumir(300) == pytest.approx(30.0)
+    reloj.ahora += 30.0
+    assert cubeta._intentar_consumir(300) == 0.0
+
+
+def test_solicitud_mayor_que_la_capacidad_se_limita(reloj):
+    cubeta = TokenBucket(rpm=60, tpm=100)
+    assert cubeta._intentar_consumir(10_000) == 0.0
+
+
+def test_pausar_bloquea_y_no_se_acorta(reloj):
+    cubeta = TokenBucket(rpm=60)
+    cubeta.pausar(10)
+    cubeta.pausar(2)
+    assert cubeta._intentar_consumir(0) == pytest.approx(10.0)
+    reloj.ahora += 10.0
+    assert cubeta._intentar_consumir(0) == 0.0
+
+
+def test_acquire_con_timeout_no_espera_una_pausa_larga(reloj, monkeypatch):
+    monkeypatch.setattr(rl.time, "sleep", lambda s: pytest.fail("no debe dormir"))
+    cubeta = TokenBucket(rpm=60)
+    cubeta.pausar(3600)
+    assert cubeta.acquire(timeout=20) is False
+
+
+def test_reembolsar_devuelve_tokens_sin_superar_la_capacidad(reloj):
+    cubeta = TokenBucket(rpm=1000, tpm=600)
+    cubeta._intentar_consumir(500)
+    cubeta.reembolsar(400)
+    assert cubeta._tokens == pytest.approx(500)
+    cubeta.reembolsar(10_000)
+    assert cubeta._tokens == pytest.approx(600)
+    cubeta.reembolsar(-50)
+    assert cubeta._tokens == pytest.approx(600)
+
+
+# ---------------------------------------------------------------------------
+# Errores de cuota
+# ---------------------------------------------------------------------------
+@pytest.mark.parametrize("mensaje, esperado", [
+    ("429 RESOURCE_EXHAUSTED. Please retry in 23.5s.", 23.5),
+    ("{'retryDelay': '3600s'}", 3600.0),
+    ("Retry-After: 30", 30.0),
+    ("500 INTERNAL", 7.0),
+])
+def test_segundos_de_espera_desde_el_mensaje(mensaje, esperado):
+    assert segundos_de_espera(ErrorHttp(mensaje), por_defecto=7.0) == esperado
+
+
+def test_segundos_de_espera_prefiere_el_encabezado():
+    exc = ErrorHttp("retry in 5s", headers={"retry-after": "12"})
+    assert segundos_de_espera(exc, por_defecto=0.0) == 12.0
+
+
+def test_es_error_cuota():
+    assert es_error_cuota(ErrorHttp(code=429))
+    assert es_error_cuota(ErrorHttp("RESOURCE_EXHAUSTED"))
+    assert not es_error_cuota(ErrorHttp("503 UNAVAILABLE", code=503))
@@ -0,0 +1,105 @@
+"""
+ai.response_cache: claves estables, lectura/escritura, expiración por ttl
+y degradación silenciosa cuando SQLite no puede abrir el archivo.
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import ai.response_cache as rc  # noqa: E402
+from ai.response_cache import RespuestaCache, clave_respuesta  # noqa: E402
+
+
+class Reloj:
+    def __init__(self):
+        self.ahora = 1_000_000.0
+
+    def __call__(self):
+        return self.ahora
+
+
+@pytest.fixture
+def reloj(monkeypatch):
+    r = Reloj()
+    monkeypatch.setattr(rc.time, "time", r)
+    return r
+
+
+def test_clave_estable_e_independiente_del_orden():
+    a = clave_respuesta("m", "p", system="s", max_tokens=10)
+    b = clave_respuesta("m", "p", max_tokens=10, system="s")
+    assert a == b
+    assert a != clave_respuesta("m", "p", system="s", max_tokens=11)
+
+
+def test_get_set(tmp_path, reloj):
+    cache = RespuestaCache(tmp_path / "r.sqlite3", ttl=60)
+    assert cache.get("k") is None
+    cache.set("k", "texto")
+    assert cache.get("k") == "texto"
+    cache.set("vacio", "")
+    assert cache.get("vacio") is None
+
+
+def test_expira_y_se_purga_al_abrir(tmp_path, reloj):
+    ruta = tmp_path / "r.sqlite3"
+    cache = RespuestaCache(ruta, ttl=60)
+    cache.set("k", "texto")
+    reloj.ahora += 61
+    assert cache.get("k") is None
+
+    reabierta = RespuestaCache(ruta, ttl=60)
+    filas = reabierta._conn.execute("SELECT COUNT(*) FROM respuestas").fetchone()[0]
+    assert filas == 0
+
+
+def test_limpiar(tmp_path, reloj):
+    cache = RespuestaCache(tmp_path / "r.sqlite3", ttl=60)
+    cache.set("k", "texto")
+    cache.limpiar()
+    assert cache.get("k") is None
+
+
+def test_ruta_no_escribible_no_rompe(tmp_path):
+    # Un archivo ocupa el lugar del directorio: no se puede crear la base
+    bloqueo = tmp_path / "bloqueo"
+    bloqueo.write_text("")
+    cache = RespuestaCache(bloqueo / "r.sqlite3", ttl=60)
+    cache.set("k", "texto")
+    assert cache.get("k") is None
+    cache.limpiar()
+
+
+def test_base_de_solo_lectura_no_rompe(tmp_path, monkeypatch):
+    def solo_lectura(*args, **kwargs):
+        raise rc.sqlite3.OperationalError("attempt to write a readonly database")
+
+    monkeypatch.setattr(rc.sqlite3, "connect", solo_lectura)
+    cache = RespuestaCache(tmp_path / "r.sqlite3", ttl=60)
+    cache.set("k", "texto")
+    assert cache.get("k") is None
+
+
+def test_escritura_fallida_no_rompe(tmp_path, reloj):
+    cache = RespuestaCache(tmp_path / "r.sqlite3", ttl=60)
+    cache.set("k", "texto")
+
+    class ConexionSoloLectura:
+        def execute(self, sql, *args):
+            if not sql.startswith("SELECT"):
+                raise rc.sqlite3.OperationalError("attempt to write a readonly database")
+            return real.execute(sql, *args)
+
+        def commit(self):
+            pass
+
+    real = cache._conn
+    cache._conn = ConexionSoloLectura()
+    cache.set("otra", "texto")
+    cache.limpiar()
+    assert cache.get("k") == "texto"
+    assert cache.get("otra") is None
@@ -0,0 +1,84 @@
+"""
+ai.retry: clasificación de errores reintentables, cálculo de la espera
+entre intentos y estados del circuit breaker.
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import ai.retry as retry  # noqa: E402
+from ai.retry import CircuitBreaker, calcular_espera, es_reintentable  # noqa: E402
+
+
+class ErrorHttp(Exception):
+    def __init__(self, mensaje="", code=None):
+        super().__init__(mensaje)
+        self.code = code
+
+
+@pytest.mark.parametrize("exc, esperado", [
+    (ErrorHttp("400 INVALID_ARGUMENT", code=400), False),
+    (ErrorHttp("403 PERMISSION_DENIED", code=403), False),
+    (ErrorHttp("429 RESOURCE_EXHAUSTED", code=429), True),
+    (ErrorHttp("503 UNAVAILABLE", code=503), True),
+    (ErrorHttp("The service is currently UNAVAILABLE"), True),
+    (ErrorHttp("RESOURCE_EXHAUSTED: quota"), True),
+    (ConnectionError("reset"), True),
+    (TimeoutError(), True),
+    (ValueError("respuesta mal formada"), False),
+])
+def test_es_reintentable(exc, esperado):
+    assert es_reintentable(exc) is esperado
+
+
+def test_codigo_definitivo_prevalece_sobre_el_texto():
+    assert not es_reintentable(ErrorHttp("400 ... UNAVAILABLE", code=400))
+
+
+def test_calcular_espera_cuota_usa_el_retry_after_con_jitter(monkeypatch):
+    monkeypatch.setattr(retry.random, "uniform", lambda a, b: b)
+    exc = ErrorHttp("429 RESOURCE_EXHAUSTED, retry in 10s", code=429)
+    assert calcular_espera(exc, intento=0) == pytest.approx(15.0)
+
+
+def test_calcular_espera_sin_retry_after_usa_backoff(monkeypatch):
+    monkeypatch.setattr(retry.random, "uniform", lambda a, b: b)
+    assert calcular_espera(ErrorHttp("503", code=503), intento=0) == 1.0
+    assert calcular_espera(ErrorHttp("503", code=503), intento=3) == 8.0
+    assert calcular_espera(ErrorHttp("RESOURCE_EXHAUSTED"), intento=10) == 60.0
+
+
+class Reloj:
+    def __init__(self):
+        self.ahora = 0.0
+
+    def __call__(self):
+        return self.ahora
+
+
+def test_circuit_breaker_abre_y_reabre(monkeypatch):
+    reloj = Reloj()
+    monkeypatch.setattr(retry.time, "monotonic", reloj)
+    cb = CircuitBreaker(umbral_fallos=2, tiempo_reapertura=60)
+
+    cb.registrar_fallo()
+    assert not cb.esta_abierto()
+    cb.registrar_fallo()
+    assert cb.esta_abierto()
+    assert cb.tiempo_para_cerrar() == pytest.approx(60)
+
+    reloj.ahora += 60
+    assert not cb.esta_abierto()
+    # Un fallo tras la reapertura vuelve a abrir de inmediato
+    cb.registrar_fallo()
+    assert cb.esta_abierto()
+
+    reloj.ahora += 60
+    cb.registrar_exito()
+    assert not cb.esta_abierto()
+    cb.registrar_fallo()
+    assert not cb.esta_abierto()
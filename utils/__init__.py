@@ -30,8 +30,12 @@ from utils.visualizations import (
 # ── ai ──
 from utils.ai_analysis import (
     generar_analisis_general,
+    generar_analisis_general_stream,
     generar_analisis_linea,
+    generar_analisis_linea_stream,
+    generar_analisis_lineas,
     generar_analisis_indicador,
+    limpiar_cache_ia,
 )
 
 __all__ = [
@@ -47,5 +51,7 @@ __all__ = [
     "crear_grafico_historico", "crear_grafico_lineas",
     "crear_grafico_semaforo", "crear_grafico_proyectos",
     # ai
-    "generar_analisis_general", "generar_analisis_linea", "generar_analisis_indicador",
+    "generar_analisis_general", "generar_analisis_general_stream",
+    "generar_analisis_linea", "generar_analisis_linea_stream", "generar_analisis_lineas",
+    "generar_analisis_indicador", "limpiar_cache_ia",
 ]
@@ -16,13 +16,40 @@ import pandas as pd
 from services.ai_service import AIService
 from services.analytics_service import AnalyticsService
 
-_ai = AIService()
 _svc = AnalyticsService()
 
 
+@st.cache_resource(show_spinner=False)
+def _servicio_ia() -> AIService:
+    """
+    Un AIService por proceso, compartido entre reruns y sesiones (clientes
+    Gemini con su pool de conexiones, caché de análisis y de respuestas).
+    Se crea la primera vez que una página pide un análisis, no al importar.
+    """
+    return AIService()
+
+
+def limpiar_cache_ia() -> None:
+    """
+    Regenerar análisis: vacía la caché persistente de respuestas (SQLite),
+    que sobrevive a st.cache_data.clear(). Los botones de actualización
+    la llaman junto con st.cache_data.clear().
+    """
+    _servicio_ia().limpiar_respuestas()
+
+
 @st.cache_data(ttl=3600, show_spinner=False)
 def generar_analisis_general(metricas_dict: dict, cumplimiento_por_linea: list) -> str:
-    return _ai.analisis_general(metricas_dict, cumplimiento_por_linea)
+    return _servicio_ia().analisis_general(metricas_dict, cumplimiento_por_linea)
+
+
+def generar_analisis_general_stream(metricas_dict: dict, cumplimiento_por_linea: list):
+    """
+    Fragmentos del resumen ejecutivo a medida que se generan (para
+    mostrar_analisis_ia). Las repeticiones salen de la caché persistente
+    de respuestas, por lo que no pasa por st.cache_data.
+    """
+    return _servicio_ia().analisis_general_stream(metricas_dict, cumplimiento_por_linea)
 
 
 @st.cache_data(ttl=3600, show_spinner=False)
@@ -33,12 +60,32 @@ def generar_analisis_linea(
     objetivos_data: list,
     indicadores_data: list | None = None,
 ) -> str:
-    return _ai.analisis_linea(
+    return _servicio_ia().analisis_linea(
         nombre_linea, total_indicadores, cumplimiento_promedio,
         objetivos_data, indicadores_data,
     )
 
 
+def generar_analisis_linea_stream(
+    nombre_linea: str,
+    total_indicadores: int,
+    cumplimiento_promedio: float,
+    objetivos_data: list,
+    indicadores_data: list | None = None,
+):
+    """Fragmentos del análisis de una línea (ver generar_analisis_general_stream)."""
+    return _servicio_ia().analisis_linea_stream(
+        nombre_linea, total_indicadores, cumplimiento_promedio,
+        objetivos_data, indicadores_data,
+    )
+
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def generar_analisis_lineas(lineas: list) -> dict:
+    """Análisis de varias líneas en una sola ronda concurrente → {linea: texto}."""
+    return _servicio_ia().analisis_lineas(lineas)
+
+
 @st.cache_data(ttl=3600, show_spinner=False)
 def generar_analisis_indicador(
     nombre_indicador: str,
@@ -47,18 +94,21 @@ def generar_analisis_indicador(
     historico_data: list,
     sentido: str = "Creciente",
 ) -> str:
-    return _ai.analisis_indicador(
+    return _servicio_ia().analisis_indicador(
         nombre_indicador, linea, descripcion, historico_data, sentido
     )
 
 
+@st.cache_data(ttl=24 * 3600, show_spinner=False)
 def preparar_historico_para_analisis(df_indicador: pd.DataFrame) -> list:
     return _svc.preparar_historico_para_ia(df_indicador)
 
 
+@st.cache_data(ttl=24 * 3600, show_spinner=False)
 def preparar_objetivos_para_analisis(df_linea: pd.DataFrame, año=None) -> list:
     return _svc.preparar_objetivos_para_ia(df_linea, año)
 
 
+@st.cache_data(ttl=24 * 3600, show_spinner=False)
 def preparar_lineas_para_analisis(df_unificado: pd.DataFrame, año=None) -> list:
     return _svc.preparar_lineas_para_ia(df_unificado, año)
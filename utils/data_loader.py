@@ -24,13 +24,19 @@ from core.config import (
 )
 from core.calculations import (
     calcular_cumplimiento,
+    calcular_cumplimiento_vec,
     obtener_color_semaforo,
     obtener_estado_semaforo,
     es_objetivo_standby,
 )
 from core.filters import (
+    filtrar_corte,
     filtrar_por_linea,
     filtrar_por_objetivo,
+    indexar_por_indicador,
+    filas_indicador,
+    metadatos_por_indicador,
+    huella_datos,
     obtener_lista_indicadores,
     obtener_lista_objetivos,
 )
@@ -101,9 +107,9 @@ def obtener_historico_indicador(df_unificado: pd.DataFrame, indicador_id):
     if df_unificado is None or df_unificado.empty:
         return pd.DataFrame()
     if "Id" in df_unificado.columns:
-        df = df_unificado[df_unificado["Id"] == indicador_id].copy()
+        df = df_unificado[df_unificado["Id"] == indicador_id]
     elif "Indicador" in df_unificado.columns:
-        df = df_unificado[df_unificado["Indicador"] == indicador_id].copy()
+        df = df_unificado[df_unificado["Indicador"] == indicador_id]
     else:
         return pd.DataFrame()
     if not df.empty and "Año" in df.columns:
@@ -125,12 +131,13 @@ def obtener_cumplimiento_cascada(
 __all__ = [
     "COLORS", "COLORES_LINEAS", "LINEAS_ESTRATEGICAS", "OBJETIVO_STANDBY",
     "cargar_datos",
-    "calcular_cumplimiento", "obtener_color_semaforo", "obtener_estado_semaforo",
+    "calcular_cumplimiento", "calcular_cumplimiento_vec", "obtener_color_semaforo", "obtener_estado_semaforo",
     "es_objetivo_standby", "normalizar_columnas",
     "calcular_metricas_generales", "calcular_estado_proyectos",
     "obtener_cumplimiento_por_linea", "obtener_historico_indicador",
     "obtener_historico_indicador_completo", "obtener_cumplimiento_cascada",
-    "filtrar_por_linea", "filtrar_por_objetivo",
+    "filtrar_corte", "filtrar_por_linea", "filtrar_por_objetivo",
+    "indexar_por_indicador", "filas_indicador", "metadatos_por_indicador", "huella_datos",
     "obtener_lista_indicadores", "obtener_lista_objetivos",
     "exportar_a_excel",
 ]
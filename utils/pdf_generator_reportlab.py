@@ -141,6 +141,19 @@ def _norm(s: str) -> str:
     return unicodedata.normalize('NFD', str(s)).encode('ascii', 'ignore').decode().lower().strip().replace('_', ' ')
 
 
+def _columna(df: pd.DataFrame, nombres: Tuple[str, ...], default: Any = 0) -> pd.Series:
+    """First existing column among `nombres`, or a constant Series with `default`."""
+    for n in nombres:
+        if n in df.columns:
+            return df[n]
+    return pd.Series(default, index=df.index)
+
+
+def _columna_int(df: pd.DataFrame, nombres: Tuple[str, ...]) -> List[int]:
+    """Integer column (missing/NaN → 0) as a plain Python list."""
+    return pd.to_numeric(_columna(df, nombres), errors='coerce').fillna(0).astype(int).tolist()
+
+
 def is_light_color(c: colors.Color) -> bool:
     """True when luminance > 0.65 → color needs dark text (never use as direct text)."""
     return 0.299 * c.red + 0.587 * c.green + 0.114 * c.blue > 0.65
@@ -1316,13 +1329,13 @@ class PDFReportePOLI:
 
         # Extract per-line data
         lineas = []
-        for _, r in df_lineas.iterrows():
-            nom   = str(r.get('Linea', r.get('Línea', '')))
-            pct   = float(r.get('Cumplimiento', 0) or 0)
-            n_ind = int(r.get('Total_Indicadores', 0) or 0)
-            cn    = int(r.get('Cumplidos', r.get('indicadores_cumplidos', 0)) or 0)
-            ep    = int(r.get('En_Progreso', r.get('en_progreso', 0)) or 0)
-            ac    = int(r.get('No_Cumplidos', r.get('Atencion', 0)) or 0)
+        noms  = _columna(df_lineas, ('Linea', 'Línea'), '').astype(str).tolist()
+        pcts  = pd.to_numeric(_columna(df_lineas, ('Cumplimiento',)), errors='coerce').fillna(0).astype(float).tolist()
+        n_inds = _columna_int(df_lineas, ('Total_Indicadores',))
+        cns   = _columna_int(df_lineas, ('Cumplidos', 'indicadores_cumplidos'))
+        eps   = _columna_int(df_lineas, ('En_Progreso', 'en_progreso'))
+        acs   = _columna_int(df_lineas, ('No_Cumplidos', 'Atencion'))
+        for nom, pct, n_ind, cn, ep, ac in zip(noms, pcts, n_inds, cns, eps, acs):
             if cn == 0 and ep == 0 and ac == 0 and n_ind > 0:
                 cn = round(n_ind * min(pct / 100, 1.0))
                 ep = round((n_ind - cn) * (0.6 if pct >= 80 else 0.3))
@@ -2688,13 +2701,13 @@ def exportar_informe_pdf_reportlab(
                     return None if (v is None or str(v) in ('nan', 'None', '')) else v
 
                 if not df_src.empty and _ind_col:
-                    for obj_name, df_obj in df_src.groupby('Objetivo', sort=True):
+                    for obj_name, df_obj in df_src.groupby('Objetivo', sort=True, observed=True):
                         cumpl_obj = float(df_obj[_cumpl_col].mean()) if _cumpl_col else 0.0
                         metas_list = []
 
                         # Agrupar indicadores por Meta_PDI (Nivel 3)
                         if _mpdi_col and df_obj[_mpdi_col].notna().any():
-                            for meta_val, df_meta in df_obj.groupby(_mpdi_col, sort=True):
+                            for meta_val, df_meta in df_obj.groupby(_mpdi_col, sort=True, observed=True):
                                 cumpl_meta = float(df_meta[_cumpl_col].mean()) if _cumpl_col else 0.0
                                 inds = []
                                 for _, ir in df_meta.drop_duplicates(_ind_col).iterrows():
@@ -2879,11 +2892,11 @@ def _build_objetivos(df_src, año: int) -> list:
     if df_src.empty or not _ind_col:
         return objs
 
-    for obj_name, df_obj in df_src.groupby('Objetivo', sort=True):
+    for obj_name, df_obj in df_src.groupby('Objetivo', sort=True, observed=True):
         cumpl_obj = float(df_obj[_cumpl_col].mean()) if _cumpl_col else 0.0
         metas_list = []
         if _mpdi_col and df_obj[_mpdi_col].notna().any():
-            for meta_val, df_meta in df_obj.groupby(_mpdi_col, sort=True):
+            for meta_val, df_meta in df_obj.groupby(_mpdi_col, sort=True, observed=True):
                 cumpl_meta = float(df_meta[_cumpl_col].mean()) if _cumpl_col else 0.0
                 inds = []
                 for _, ir in df_meta.drop_duplicates(_ind_col).iterrows():
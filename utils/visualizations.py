@@ -4,10 +4,48 @@ Módulo de visualizaciones para el Dashboard Estratégico POLI.
 
 import plotly.graph_objects as go
 import plotly.express as px
+import numpy as np
 import pandas as pd
 import streamlit as st
 from core.config import COLORS, COLORES_LINEAS
-from core.calculations import calcular_cumplimiento, obtener_color_semaforo
+from core.calculations import calcular_cumplimiento_vec, obtener_color_semaforo
+
+# Puntos por trazo a partir de los cuales se reduce la serie con LTTB
+MAX_PUNTOS_TRAZO = 500
+
+
+def indices_lttb(x, y, n_salida=MAX_PUNTOS_TRAZO):
+    """
+    Índices de los puntos que conserva Largest-Triangle-Three-Buckets:
+    primero y último fijos y, en cada cubeta intermedia, el punto que forma
+    el triángulo de mayor área con el punto anterior elegido y el promedio
+    de la cubeta siguiente. Conserva la forma visual con muchos menos puntos.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.nan_to_num(np.asarray(y, dtype=float))
+    n = len(x)
+    if n_salida >= n or n_salida < 3:
+        return np.arange(n)
+
+    bordes = np.linspace(1, n - 1, n_salida - 1).astype(int)
+    indices = np.empty(n_salida, dtype=int)
+    indices[0], indices[-1] = 0, n - 1
+    a = 0
+    for i in range(n_salida - 2):
+        ini, fin = bordes[i], bordes[i + 1]
+        sig_ini, sig_fin = (bordes[i + 1], bordes[i + 2]) if i + 2 < len(bordes) else (n - 1, n)
+        cx, cy = x[sig_ini:sig_fin].mean(), y[sig_ini:sig_fin].mean()
+        area = np.abs((x[a] - cx) * (y[ini:fin] - y[a]) - (x[a] - x[ini:fin]) * (cy - y[a]))
+        a = ini + int(np.argmax(area))
+        indices[i + 1] = a
+    return indices
+
+
+def reducir_serie(df, col_x, col_y, n_salida=MAX_PUNTOS_TRAZO):
+    """Filas de df reducidas con LTTB si superan n_salida (df ordenado por col_x)."""
+    if len(df) <= n_salida:
+        return df
+    return df.iloc[indices_lttb(df[col_x].to_numpy(), df[col_y].to_numpy(), n_salida)]
 
 
 def crear_grafico_historico(df_indicador, nombre_indicador, sentido='Creciente', unidad='', periodicidad='Anual', linea_estrategica=None):
@@ -125,10 +163,8 @@ def crear_grafico_historico(df_indicador, nombre_indicador, sentido='Creciente',
         ))
 
         # Calcular cumplimientos considerando el sentido
-        cumplimientos = []
-        for m, e in zip(metas, ejecuciones):
-            c = calcular_cumplimiento(m, e, sentido)
-            cumplimientos.append(float(c) if c is not None else 0.0)
+        cumplimientos = calcular_cumplimiento_vec(metas, ejecuciones, sentido)
+        cumplimientos = np.where(np.isnan(cumplimientos), 0.0, cumplimientos).tolist()
 
         # Línea de Cumplimiento en eje secundario
         # Usar un color distintivo para el cumplimiento (magenta/fucsia)
@@ -513,10 +549,8 @@ def crear_grafico_tendencia(df_indicador, nombre_indicador):
     df = df_indicador.sort_values('Año')
 
     # Calcular cumplimientos
-    df['Cumplimiento_Calc'] = df.apply(
-        lambda x: calcular_cumplimiento(x['Meta'], x['Ejecución']),
-        axis=1
-    )
+    df['Cumplimiento_Calc'] = calcular_cumplimiento_vec(df['Meta'].to_numpy(), df['Ejecución'].to_numpy())
+    df = reducir_serie(df, 'Año', 'Cumplimiento_Calc')
 
     fig = go.Figure()
 
@@ -1162,8 +1196,9 @@ def crear_grafico_barras_objetivos(df_cascada, linea_seleccionada=None, titulo="
         df_objetivos = df_objetivos.sort_values('Cumplimiento', ascending=True)
 
         # Truncar nombres largos
-        df_objetivos['Objetivo_corto'] = df_objetivos['Objetivo'].apply(
-            lambda x: str(x)[:60] + '...' if len(str(x)) > 60 else str(x)
+        objetivos = df_objetivos['Objetivo'].map(str)
+        df_objetivos['Objetivo_corto'] = objetivos.where(
+            objetivos.str.len() <= 60, objetivos.str[:60] + '...'
         )
 
         # Asignar colores según semáforo
@@ -7,7 +7,6 @@ Versión optimizada con Tabs para reducir scroll
 import streamlit as st
 import pandas as pd
 import plotly.graph_objects as go
-import re
 
 import sys
 from pathlib import Path
@@ -24,8 +23,9 @@ from utils.visualizations import (
     crear_grafico_barras_objetivos
 )
 from utils.ai_analysis import (
-    generar_analisis_linea, preparar_objetivos_para_analisis
+    generar_analisis_linea_stream, preparar_objetivos_para_analisis
 )
+from components.analisis_ia import mostrar_analisis_ia
 
 
 def mostrar_pagina():
@@ -177,7 +177,7 @@ def mostrar_pagina():
         st.markdown("#### 📊 Cumplimiento por Objetivo")
 
         if 'Objetivo' in df_linea_año.columns and 'Cumplimiento' in df_linea_año.columns:
-            df_objetivos = df_linea_año.groupby('Objetivo').agg({
+            df_objetivos = df_linea_año.groupby('Objetivo', observed=True).agg({
                 'Cumplimiento': 'mean',
                 'Indicador': 'nunique'
             }).reset_index()
@@ -356,7 +356,7 @@ def mostrar_pagina():
 
             if 'Año' in df_linea.columns and 'Cumplimiento' in df_linea.columns:
                 # Filtrar solo Fuente = 'Avance' y excluir proyectos
-                df_linea_hist = df_linea.copy()
+                df_linea_hist = df_linea  # los filtros siguientes crean frames nuevos
                 if 'Fuente' in df_linea_hist.columns:
                     df_linea_hist = df_linea_hist[df_linea_hist['Fuente'] == 'Avance']
                 if 'Proyectos' in df_linea_hist.columns:
@@ -369,17 +369,17 @@ def mostrar_pagina():
                 # Calcular cumplimiento jerárquico: indicadores -> objetivos -> línea
                 if 'Objetivo' in df_linea_hist.columns:
                     # Paso 1: Promedio de indicadores por objetivo y año
-                    df_por_objetivo = df_linea_hist.groupby(['Año', 'Objetivo'])['Cumplimiento'].mean().reset_index()
+                    df_por_objetivo = df_linea_hist.groupby(['Año', 'Objetivo'], observed=True)['Cumplimiento'].mean().reset_index()
                     # Paso 2: Promedio de objetivos por año
-                    df_historico = df_por_objetivo.groupby('Año').agg({
+                    df_historico = df_por_objetivo.groupby('Año', observed=True).agg({
                         'Cumplimiento': 'mean'
                     }).reset_index()
                     # Agregar conteo de indicadores
-                    indicadores_por_año = df_linea_hist.groupby('Año')['Indicador'].nunique().reset_index()
+                    indicadores_por_año = df_linea_hist.groupby('Año', observed=True)['Indicador'].nunique().reset_index()
                     indicadores_por_año.columns = ['Año', 'Total_Indicadores']
                     df_historico = df_historico.merge(indicadores_por_año, on='Año', how='left')
                 else:
-                    df_historico = df_linea_hist.groupby('Año').agg({
+                    df_historico = df_linea_hist.groupby('Año', observed=True).agg({
                         'Cumplimiento': 'mean',
                         'Indicador': 'nunique'
                     }).reset_index()
@@ -531,21 +531,15 @@ def mostrar_pagina():
 
             with st.spinner("Generando análisis..."):
                 objetivos_data = preparar_objetivos_para_analisis(df_linea, año_actual)
-                analisis = generar_analisis_linea(
+            # El texto se muestra a medida que el modelo lo genera
+            mostrar_analisis_ia(
+                generar_analisis_linea_stream(
                     nombre_linea=linea_seleccionada,
                     total_indicadores=total_indicadores,
                     cumplimiento_promedio=cumplimiento_linea,
                     objetivos_data=objetivos_data
                 )
-
-                analisis_html = re.sub(r'\*\*([^*]+)\*\*', r'<strong>\1</strong>', analisis)
-                analisis_html = analisis_html.replace('\n', '<br>')
-
-                st.markdown(f"""
-                <div class="ai-analysis">
-                    {analisis_html}
-                </div>
-                """, unsafe_allow_html=True)
+            )
 
     # ============================================================
     # TAB 3: INDICADORES
@@ -568,7 +562,7 @@ def mostrar_pagina():
             )
 
         # Aplicar filtros
-        df_mostrar = df_linea_año.copy()
+        df_mostrar = df_linea_año  # solo lectura: se filtra y la tabla se copia aparte
 
         # Filtrar solo indicadores (excluir proyectos)
         if 'Proyectos' in df_mostrar.columns:
@@ -185,9 +185,9 @@ def mostrar_pagina():
         return
 
     # Normalizar columna Año
-    if 'Año' in df_unificado.columns:
-        df_unificado = df_unificado.copy()
-        df_unificado['Año'] = pd.to_numeric(df_unificado['Año'], errors='coerce')
+    # Solo se copia si hace falta convertir (el dataset ya trae Año numérico)
+    if 'Año' in df_unificado.columns and not pd.api.types.is_numeric_dtype(df_unificado['Año']):
+        df_unificado = df_unificado.assign(Año=pd.to_numeric(df_unificado['Año'], errors='coerce'))
 
     # ============================================================
     # FILTROS
@@ -249,10 +249,8 @@ def mostrar_pagina():
     # MULTISELECT DE INDICADORES/PROYECTOS
     # Filtro preliminar para obtener las opciones disponibles
     # ============================================================
-    df_prev = df_unificado.copy()
-    if 'Año' in df_prev.columns:
-        df_prev['Año'] = pd.to_numeric(df_prev['Año'], errors='coerce')
-    df_prev = df_prev[df_prev['Año'] == anio_sel]
+    # Vista de solo lectura: 'Año' ya es numérico (normalizado arriba)
+    df_prev = df_unificado[df_unificado['Año'] == anio_sel]
     if 'Proyectos' in df_prev.columns:
         if tipo_sel == "Indicadores":
             df_prev = df_prev[df_prev['Proyectos'].fillna(0) == 0]
@@ -8,7 +8,6 @@ import streamlit as st
 import pandas as pd
 from datetime import datetime
 import io
-import re
 
 import sys
 from pathlib import Path
@@ -17,15 +16,17 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 from utils.data_loader import (
     COLORS, calcular_metricas_generales, obtener_cumplimiento_por_linea,
     obtener_color_semaforo, exportar_a_excel, obtener_cumplimiento_cascada,
-    calcular_estado_proyectos
+    calcular_estado_proyectos, filtrar_corte
 )
 from utils.visualizations import (
     crear_grafico_lineas, crear_grafico_semaforo, crear_tarjeta_kpi,
     crear_grafico_cascada, crear_tabla_cascada_html, crear_grafico_proyectos
 )
 from utils.ai_analysis import (
-    generar_analisis_general, preparar_lineas_para_analisis, generar_analisis_linea
+    generar_analisis_general, generar_analisis_general_stream,
+    preparar_lineas_para_analisis, generar_analisis_lineas
 )
+from components.analisis_ia import mostrar_analisis_ia
 from utils.pdf_generator_reportlab import exportar_informe_pdf_reportlab
 
 
@@ -244,18 +245,12 @@ def mostrar_pagina():
 
         # Análisis IA - ancho completo con max-width para legibilidad
         st.markdown("#### Analisis Inteligente - Resumen Ejecutivo")
-        with st.spinner("Generando analisis..."):
-            lineas_data = preparar_lineas_para_analisis(df_unificado, año_actual)
-            analisis = generar_analisis_general(metricas, lineas_data)
-
-            analisis_html = re.sub(r'\*\*([^*]+)\*\*', r'<strong>\1</strong>', analisis)
-            analisis_html = analisis_html.replace('\n', '<br>')
-
-            st.markdown(f"""
-            <div class="ai-analysis" style="max-width: 750px;">
-                {analisis_html}
-            </div>
-            """, unsafe_allow_html=True)
+        # El texto se muestra a medida que el modelo lo genera
+        lineas_data = preparar_lineas_para_analisis(df_unificado, año_actual)
+        mostrar_analisis_ia(
+            generar_analisis_general_stream(metricas, lineas_data),
+            estilo="max-width: 750px;",
+        )
 
         # Vista de cascada en expander (opcional)
         with st.expander("Ver desglose jerarquico completo", expanded=False):
@@ -286,9 +281,7 @@ def mostrar_pagina():
         """, unsafe_allow_html=True)
 
         # Preparar datos para el PDF
-        df_año_pdf = df_unificado[df_unificado['Año'] == año_actual] if 'Año' in df_unificado.columns else df_unificado
-        if 'Fuente' in df_año_pdf.columns:
-            df_año_pdf = df_año_pdf[df_año_pdf['Fuente'] == 'Avance']
+        df_año_pdf = filtrar_corte(df_unificado, año=año_actual, fuente='Avance')
 
         # Columnas: botón de descarga + descripción
         col_pdf1, col_pdf2 = st.columns([2, 1])
@@ -311,36 +304,57 @@ def mostrar_pagina():
                 analisis_lineas_pdf = {}
                 try:
                     with st.spinner('Generando análisis IA por línea...'):
-                        for _, lr in df_lineas.iterrows():
-                            nom     = str(lr.get('Linea', lr.get('Línea', '')))
-                            cumpl_l = float(lr.get('Cumplimiento', 0) or 0)
-                            n_ind_l = int(lr.get('Total_Indicadores', 0) or 0)
-                            objs_l  = []
-                            if df_cascada_pdf is not None and not df_cascada_pdf.empty:
-                                mask = (df_cascada_pdf['Nivel'] == 2) & (df_cascada_pdf['Linea'] == nom)
-                                for _, or_ in df_cascada_pdf[mask].iterrows():
-                                    objs_l.append({
-                                        'objetivo':     str(or_.get('Objetivo', '')),
-                                        'cumplimiento': float(or_.get('Cumplimiento', 0) or 0),
-                                        'indicadores':  int(or_.get('Total_Indicadores', 0) or 0),
-                                    })
-                            # Indicadores individuales para análisis contextual
-                            inds_l = []
-                            if 'Linea' in df_año_pdf.columns and 'Indicador' in df_año_pdf.columns:
-                                df_linea_ind = df_año_pdf[df_año_pdf['Linea'] == nom]
-                                _c_col = next((c for c in ['Cumplimiento'] if c in df_linea_ind.columns), None)
-                                _m_col = next((c for c in ['Meta', 'meta'] if c in df_linea_ind.columns), None)
-                                _e_col = next((c for c in ['Ejecución', 'Ejecucion', 'ejecucion'] if c in df_linea_ind.columns), None)
-                                for _, ir in df_linea_ind.drop_duplicates('Indicador').iterrows():
-                                    inds_l.append({
-                                        'nombre':       str(ir.get('Indicador', '')),
-                                        'meta':         ir.get(_m_col) if _m_col else None,
-                                        'ejecucion':    ir.get(_e_col) if _e_col else None,
-                                        'cumplimiento': float(ir.get(_c_col, 0) or 0) if _c_col else 0.0,
-                                    })
-                            analisis_lineas_pdf[nom] = generar_analisis_linea(
-                                nom, n_ind_l, cumpl_l, objs_l,
-                                indicadores_data=inds_l if inds_l else None)
+                        # Particionar una sola vez por línea (en lugar de una máscara por línea)
+                        objs_por_linea = {}
+                        if df_cascada_pdf is not None and not df_cascada_pdf.empty:
+                            df_nivel2 = df_cascada_pdf[df_cascada_pdf['Nivel'] == 2]
+                            for nom_g, df_o in df_nivel2.groupby('Linea', sort=False, observed=True):
+                                objs_por_linea[nom_g] = [
+                                    {
+                                        'objetivo':     str(obj),
+                                        'cumplimiento': float(cumpl or 0),
+                                        'indicadores':  int(n_ind or 0),
+                                    }
+                                    for obj, cumpl, n_ind in zip(
+                                        df_o['Objetivo'], df_o['Cumplimiento'], df_o['Total_Indicadores']
+                                    )
+                                ]
+                        # Indicadores individuales para análisis contextual
+                        inds_por_linea = {}
+                        if 'Linea' in df_año_pdf.columns and 'Indicador' in df_año_pdf.columns:
+                            _c_col = next((c for c in ['Cumplimiento'] if c in df_año_pdf.columns), None)
+                            _m_col = next((c for c in ['Meta', 'meta'] if c in df_año_pdf.columns), None)
+                            _e_col = next((c for c in ['Ejecución', 'Ejecucion', 'ejecucion'] if c in df_año_pdf.columns), None)
+                            for nom_g, df_linea_ind in df_año_pdf.groupby('Linea', sort=False, observed=True):
+                                df_linea_ind = df_linea_ind.drop_duplicates('Indicador')
+                                n_filas = len(df_linea_ind)
+                                inds_por_linea[nom_g] = [
+                                    {
+                                        'nombre':       str(ind),
+                                        'meta':         meta,
+                                        'ejecucion':    ejec,
+                                        'cumplimiento': float(cumpl or 0) if _c_col else 0.0,
+                                    }
+                                    for ind, meta, ejec, cumpl in zip(
+                                        df_linea_ind['Indicador'],
+                                        df_linea_ind[_m_col] if _m_col else [None] * n_filas,
+                                        df_linea_ind[_e_col] if _e_col else [None] * n_filas,
+                                        df_linea_ind[_c_col] if _c_col else [None] * n_filas,
+                                    )
+                                ]
+
+                        # Todas las líneas en una sola ronda concurrente
+                        solicitudes_lineas = []
+                        for lr in df_lineas.to_dict('records'):
+                            nom = str(lr.get('Linea', lr.get('Línea', '')))
+                            solicitudes_lineas.append({
+                                'linea':            nom,
+                                'indicadores':      int(lr.get('Total_Indicadores', 0) or 0),
+                                'cumplimiento':     float(lr.get('Cumplimiento', 0) or 0),
+                                'objetivos':        objs_por_linea.get(nom, []),
+                                'indicadores_data': inds_por_linea.get(nom) or None,
+                            })
+                        analisis_lineas_pdf = generar_analisis_lineas(solicitudes_lineas)
                 except Exception:
                     analisis_lineas_pdf = {}
 
@@ -454,7 +468,7 @@ def mostrar_pagina():
         with col_f2:
             estado_filtro = st.selectbox("Filtrar por Estado:", ['Todos', '✅ Cumplido', '⚠️ Alerta', '❌ Peligro'], key="filtro_estado_datos")
 
-        df_filtrado = df_año.copy()
+        df_filtrado = df_año  # solo lectura: se filtra y la tabla se copia aparte
 
         # Filtrar solo indicadores (excluir proyectos)
         if 'Proyectos' in df_filtrado.columns:
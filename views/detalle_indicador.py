@@ -4,10 +4,10 @@ Análisis individual de cada indicador con histórico y IA
 """
 
 import streamlit as st
+import numpy as np
 import pandas as pd
 import plotly.graph_objects as go
 from datetime import datetime
-import io
 import re
 
 import sys
@@ -15,18 +15,279 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from utils.data_loader import (
-    COLORS, calcular_cumplimiento, obtener_color_semaforo,
+    COLORS, calcular_cumplimiento_vec, obtener_color_semaforo,
     filtrar_por_linea, filtrar_por_objetivo, obtener_lista_objetivos,
+    indexar_por_indicador, filas_indicador, metadatos_por_indicador, huella_datos,
     obtener_lista_indicadores, obtener_historico_indicador,
     obtener_historico_indicador_completo
 )
 from utils.visualizations import (
-    crear_grafico_historico, crear_grafico_tendencia,
+    crear_grafico_historico, crear_grafico_tendencia, reducir_serie,
     crear_indicador_semaforo_html
 )
 from utils.ai_analysis import (
-    generar_analisis_indicador, preparar_historico_para_analisis
+    generar_analisis_indicador, limpiar_cache_ia, preparar_historico_para_analisis
 )
+from services.export_service import ExportService
+
+
+# Las funciones cacheadas reciben los DataFrames de sesión con prefijo "_"
+# (st.cache_data no los hashea) y se indexan por `version`, la huella del
+# contenido calculada una vez por carga en app.py: si los datos cambian al
+# recargar cambia la clave, sin recorrer las filas en cada rerun.
+
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def _datos_cierre(version: str, _df_por_ind: pd.DataFrame, indicador: str) -> pd.DataFrame:
+    """Registros del indicador con Fuente='Cierre' (para gráficas y exportación)."""
+    df_indicador = filas_indicador(_df_por_ind, indicador)
+    if 'Fuente' in df_indicador.columns:
+        df_indicador = df_indicador[df_indicador['Fuente'] == 'Cierre']
+    return df_indicador
+
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def _historico_indicador(version: str, _df_unificado: pd.DataFrame, _df_base: pd.DataFrame, indicador: str):
+    """Histórico agregado y metadatos del indicador, reutilizado entre reruns."""
+    return obtener_historico_indicador_completo(_df_unificado, _df_base, indicador)
+
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def _cumplimiento_anual(version: str, _df_por_ind: pd.DataFrame, indicador: str) -> pd.DataFrame:
+    """Cumplimiento promedio por año de un indicador (gráfico de comparación)."""
+    df_comparar = filas_indicador(_df_por_ind, indicador)
+    if df_comparar.empty or 'Año' not in df_comparar.columns:
+        return pd.DataFrame()
+    # groupby ordena las claves: no hace falta un sort_values posterior
+    return df_comparar.groupby('Año', sort=True, observed=True).agg(
+        Cumplimiento=('Cumplimiento', 'mean')
+    ).reset_index()
+
+
+@st.cache_data(show_spinner=False)
+def _nombres_en_minuscula(indicadores: tuple) -> tuple:
+    """Nombres en minúscula para la búsqueda (se calculan una vez por lista)."""
+    return tuple(i.lower() for i in indicadores)
+
+
+@st.cache_data(show_spinner=False)
+def _otros_indicadores(indicadores: tuple, indicador: str) -> tuple:
+    """Indicadores disponibles para comparar (todos menos el seleccionado)."""
+    return tuple(i for i in indicadores if i != indicador)
+
+
+def _formatear_con_unidad(valor, unidad):
+    if pd.isna(valor):
+        return "N/D"
+    if unidad == '%':
+        return f"{valor:.1f}%"
+    elif unidad == '$':
+        return f"${valor:,.0f}"
+    elif unidad == 'ENT':
+        return f"{valor:,.0f}"
+    else:
+        return f"{valor:.2f}"
+
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def _tabla_indicador(version: str, _df_unificado: pd.DataFrame, _df_base: pd.DataFrame, indicador: str, sentido: str) -> pd.DataFrame:
+    """Tabla de datos históricos detallados ya formateada para mostrar."""
+    df_historico, _, _, unidad_meta, unidad_ejec = _historico_indicador(version, _df_unificado, _df_base, indicador)
+    if df_historico.empty:
+        return pd.DataFrame()
+
+    df_tabla = df_historico.copy()
+
+    # Calcular cumplimiento con sentido
+    cumplimiento = calcular_cumplimiento_vec(
+        df_tabla['Meta'].to_numpy(), df_tabla['Ejecución'].to_numpy(), sentido
+    )
+    df_tabla['Cumplimiento_calc'] = cumplimiento
+
+    # Agregar estado
+    df_tabla['Estado'] = np.select(
+        [cumplimiento >= 100, cumplimiento >= 80, ~np.isnan(cumplimiento)],
+        ['✅ Meta cumplida', '⚠️ Alerta', '❌ Peligro'],
+        default='N/D',
+    )
+
+    # Agregar nota para línea base
+    df_tabla['Nota'] = df_tabla['Periodo'].apply(
+        lambda x: 'Linea Base' if str(x) in ['2021', '2021-1'] else ''
+    )
+
+    # Formatear columnas
+    df_tabla['Meta_fmt'] = df_tabla['Meta'].apply(lambda x: _formatear_con_unidad(x, unidad_meta))
+    df_tabla['Ejecucion_fmt'] = df_tabla['Ejecución'].apply(lambda x: _formatear_con_unidad(x, unidad_ejec))
+    df_tabla['Cumplimiento_fmt'] = df_tabla['Cumplimiento_calc'].apply(lambda x: f"{x:.1f}%" if pd.notna(x) else "N/D")
+
+    # Seleccionar y renombrar columnas para mostrar
+    columnas_mostrar = ['Periodo', 'Meta_fmt', 'Ejecucion_fmt', 'Cumplimiento_fmt', 'Estado', 'Nota']
+    return df_tabla[columnas_mostrar].set_axis(
+        ['Periodo', 'Meta', 'Ejecucion', 'Cumplimiento', 'Estado', 'Nota'], axis=1
+    )
+
+
+# Plantillas HTML (colores fijos ya resueltos; se completan con format_map)
+_BADGE_HTML = (
+    f'<div style="flex: 1; background: {COLORS["light"]}; padding: 10px; border-radius: 5px; text-align: center;">'
+    f'<small style="color: {COLORS["gray"]};">{{etiqueta}}</small><br>'
+    '<strong>{valor}</strong></div>'
+)
+
+_ESTADO_ACTUAL_HTML = """
+<div style="
+    text-align: center;
+    padding: 25px;
+    background: {color};
+    color: {color_texto};
+    border-radius: 15px;
+    box-shadow: 0 4px 6px rgba(0,0,0,0.15);
+">
+    <div style="font-size: 12px; opacity: 0.9; text-transform: uppercase;">
+        Cumplimiento {año}
+    </div>
+    <div style="font-size: 48px; font-weight: bold; margin: 10px 0;">
+        {cumplimiento:.1f}%
+    </div>
+    <div style="font-size: 14px;">
+        {estado}
+    </div>
+</div>
+"""
+
+
+def _badge(etiqueta, valor):
+    """Recuadro de metadato del indicador (etiqueta pequeña y valor en negrita)."""
+    return _BADGE_HTML.format_map({'etiqueta': etiqueta, 'valor': valor})
+
+
+@st.cache_data(show_spinner=False)
+def _estado_actual_html(cumplimiento: float, año: int) -> str:
+    """Tarjeta de cumplimiento del último año con el color del semáforo."""
+    color = obtener_color_semaforo(cumplimiento)
+    return _ESTADO_ACTUAL_HTML.format_map({
+        'color': color,
+        'color_texto': '#333' if color == COLORS['warning'] else 'white',
+        'año': año,
+        'cumplimiento': cumplimiento,
+        'estado': '✅ Meta cumplida' if cumplimiento >= 100 else '⚠️ Alerta' if cumplimiento >= 80 else '❌ Peligro',
+    })
+
+
+# Umbral de puntos a partir del cual los trazos se dibujan con WebGL
+_MAX_PUNTOS_SVG = 100
+
+# Estilos del gráfico de comparación (plotly copia estos dicts al usarlos)
+_MARKER_10 = dict(size=10)
+_LINEA_PRINCIPAL = dict(color=COLORS['primary'], width=3)
+_LINEA_COMPARADA = dict(color=COLORS['accent'], width=3, dash='dash')
+_LAYOUT_COMPARACION = dict(
+    title="Comparación de Cumplimiento",
+    xaxis_title="Año",
+    yaxis_title="% Cumplimiento",
+    yaxis=dict(range=[0, 120]),
+    height=350,
+    plot_bgcolor='white',
+    legend=dict(
+        orientation="h",
+        yanchor="bottom",
+        y=-0.3,
+        xanchor="center",
+        x=0.5
+    )
+)
+
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def _figura_historico(version: str, _df_unificado, _df_base, indicador, sentido, unidad, periodicidad, linea):
+    """Gráfico histórico del indicador, construido una vez por selección."""
+    df_historico = _historico_indicador(version, _df_unificado, _df_base, indicador)[0]
+    return crear_grafico_historico(
+        df_historico,
+        indicador,
+        sentido=sentido,
+        unidad=unidad,
+        periodicidad=periodicidad,
+        linea_estrategica=linea
+    )
+
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def _figura_tendencia(version: str, _df_unificado, _df_base, indicador):
+    """Gráfico de tendencia de cumplimiento, construido una vez por selección."""
+    df_historico = _historico_indicador(version, _df_unificado, _df_base, indicador)[0]
+    return crear_grafico_tendencia(df_historico, indicador)
+
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def _figura_comparacion(version: str, _df_unificado, _df_base, _df_por_ind, indicador, indicador_comparar):
+    """Cumplimiento anual del indicador frente al indicador de comparación."""
+    df_historico = _historico_indicador(version, _df_unificado, _df_base, indicador)[0]
+    df_comp = _cumplimiento_anual(version, _df_por_ind, indicador_comparar)
+    if not df_historico.empty:
+        df_historico = reducir_serie(df_historico, 'Año', 'Cumplimiento')
+    df_comp = reducir_serie(df_comp, 'Año', 'Cumplimiento')
+    puntos = max(len(df_historico), len(df_comp))
+    trazo = go.Scattergl if puntos > _MAX_PUNTOS_SVG else go.Scatter
+
+    # Gráfico de comparación
+    fig_comp = go.Figure()
+
+    # Indicador principal
+    if not df_historico.empty:
+        fig_comp.add_trace(trazo(
+            x=df_historico['Año'],
+            y=df_historico['Cumplimiento'],
+            name=indicador[:30] + "...",
+            line=_LINEA_PRINCIPAL,
+            marker=_MARKER_10
+        ))
+
+    # Indicador de comparación
+    fig_comp.add_trace(trazo(
+        x=df_comp['Año'],
+        y=df_comp['Cumplimiento'],
+        name=indicador_comparar[:30] + "...",
+        line=_LINEA_COMPARADA,
+        marker=_MARKER_10
+    ))
+
+    fig_comp.update_layout(**_LAYOUT_COMPARACION)
+    return fig_comp
+
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def _analisis_html(version: str, _df_unificado, _df_base, _df_por_ind, indicador, linea, descripcion, sentido):
+    """
+    Análisis IA del indicador ya convertido a HTML. Se cachea por selección,
+    de modo que un rerun no vuelve a preparar el histórico ni a formatear.
+    """
+    df_historico = _historico_indicador(version, _df_unificado, _df_base, indicador)[0]
+    if df_historico.empty:
+        df_historico = _datos_cierre(version, _df_por_ind, indicador)
+
+    analisis = generar_analisis_indicador(
+        nombre_indicador=indicador,
+        linea=linea,
+        descripcion=descripcion,
+        historico_data=preparar_historico_para_analisis(df_historico),
+        sentido=sentido
+    )
+
+    # Convertir markdown a HTML para renderizado correcto
+    analisis_html = re.sub(r'\*\*([^*]+)\*\*', r'<strong>\1</strong>', analisis)
+    return analisis_html.replace('\n', '<br>')
+
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def _excel_indicador(version: str, _df_unificado, _df_base, _df_por_ind, indicador) -> bytes:
+    """Libro con los datos de cierre y el resumen histórico del indicador."""
+    hojas = {'Datos_Indicador': _datos_cierre(version, _df_por_ind, indicador)}
+    df_historico = _historico_indicador(version, _df_unificado, _df_base, indicador)[0]
+    if not df_historico.empty:
+        hojas['Resumen_Historico'] = df_historico
+    return ExportService.exportar_excel_hojas(hojas)
 
 
 def mostrar_pagina():
@@ -44,6 +305,19 @@ def mostrar_pagina():
         st.error("⚠️ No se pudieron cargar los datos.")
         return
 
+    # Identificador de la carga actual (clave de las funciones cacheadas)
+    version = st.session_state.get('version_datos')
+    if version is None:
+        version = huella_datos(df_unificado, df_base)
+
+    # Copia indexada por Indicador y metadatos (construidos en app.py al cargar)
+    df_unificado_por_ind = st.session_state.get('df_unificado_por_ind')
+    if df_unificado_por_ind is None:
+        df_unificado_por_ind = indexar_por_indicador(df_unificado)
+    meta_by_ind = st.session_state.get('meta_by_ind')
+    if meta_by_ind is None:
+        meta_by_ind = metadatos_por_indicador(df_base)
+
     # Filtros jerárquicos
     st.markdown("### 🔎 Selección de Indicador")
 
@@ -53,7 +327,12 @@ def mostrar_pagina():
         # Selector de Línea Estratégica
         lineas_disponibles = []
         if 'Linea' in df_unificado.columns:
-            lineas_disponibles = sorted(df_unificado['Linea'].dropna().unique().tolist())
+            lineas = df_unificado['Linea']
+            if isinstance(lineas.dtype, pd.CategoricalDtype):
+                # Categorías ya ordenadas y únicas (se crean al cargar el dataset)
+                lineas_disponibles = lineas.cat.categories.tolist()
+            else:
+                lineas_disponibles = sorted(lineas.dropna().unique().tolist())
 
         if not lineas_disponibles:
             st.warning("No se encontraron líneas estratégicas.")
@@ -98,7 +377,11 @@ def mostrar_pagina():
 
     indicadores_filtrados = indicadores_disponibles
     if busqueda:
-        indicadores_filtrados = [i for i in indicadores_disponibles if busqueda.lower() in i.lower()]
+        termino = busqueda.lower()
+        nombres_lower = _nombres_en_minuscula(tuple(indicadores_disponibles))
+        indicadores_filtrados = [
+            i for i, nombre in zip(indicadores_disponibles, nombres_lower) if termino in nombre
+        ]
 
     with col_selector:
         if indicadores_filtrados:
@@ -113,12 +396,8 @@ def mostrar_pagina():
 
     st.markdown("---")
 
-    # Obtener datos del indicador - filtrar solo registros con Fuente='Cierre'
-    df_indicador = df_unificado[df_unificado['Indicador'] == indicador_seleccionado].copy()
-
-    # Filtrar solo registros con Fuente = 'Cierre' para las gráficas
-    if 'Fuente' in df_indicador.columns:
-        df_indicador = df_indicador[df_indicador['Fuente'] == 'Cierre']
+    # Obtener datos del indicador - solo registros con Fuente='Cierre'
+    df_indicador = _datos_cierre(version, df_unificado_por_ind, indicador_seleccionado)
 
     if df_indicador.empty:
         st.warning("No se encontraron datos de cierre para este indicador.")
@@ -132,94 +411,47 @@ def mostrar_pagina():
 
         # Obtener descripción y metadatos del indicador
         descripcion = ""
-        periodicidad = ""
-        sentido = "Creciente"
-        meta_pdi = ""
-
-        if df_base is not None and 'Indicador' in df_base.columns:
-            indicador_base = df_base[df_base['Indicador'] == indicador_seleccionado]
-            if not indicador_base.empty:
-                fila = indicador_base.iloc[0]
-                if 'Periodicidad' in fila:
-                    periodicidad = fila.get('Periodicidad', '')
-                if 'Sentido' in fila:
-                    sentido = fila.get('Sentido', 'Creciente')
-                if 'Meta_PDI' in fila:
-                    meta_pdi = fila.get('Meta_PDI', '')
-
-        # Información en badges
-        info_cols = st.columns(4)
-
-        with info_cols[0]:
-            st.markdown(f"""
-            <div style="background: {COLORS['light']}; padding: 10px; border-radius: 5px; text-align: center;">
-                <small style="color: {COLORS['gray']};">Línea</small><br>
-                <strong>{linea_seleccionada}</strong>
-            </div>
-            """, unsafe_allow_html=True)
-
-        with info_cols[1]:
-            st.markdown(f"""
-            <div style="background: {COLORS['light']}; padding: 10px; border-radius: 5px; text-align: center;">
-                <small style="color: {COLORS['gray']};">Periodicidad</small><br>
-                <strong>{periodicidad if periodicidad else 'N/D'}</strong>
-            </div>
-            """, unsafe_allow_html=True)
-
-        with info_cols[2]:
-            st.markdown(f"""
-            <div style="background: {COLORS['light']}; padding: 10px; border-radius: 5px; text-align: center;">
-                <small style="color: {COLORS['gray']};">Sentido</small><br>
-                <strong>{'📈' if sentido == 'Creciente' else '📉'} {sentido}</strong>
-            </div>
-            """, unsafe_allow_html=True)
-
-        with info_cols[3]:
-            st.markdown(f"""
-            <div style="background: {COLORS['light']}; padding: 10px; border-radius: 5px; text-align: center;">
-                <small style="color: {COLORS['gray']};">Meta PDI</small><br>
-                <strong>{meta_pdi if meta_pdi else 'N/D'}</strong>
-            </div>
-            """, unsafe_allow_html=True)
+        meta_info = meta_by_ind.get(indicador_seleccionado, {})
+        periodicidad = meta_info.get('Periodicidad', '')
+        sentido = meta_info.get('Sentido', 'Creciente')
+        meta_pdi = meta_info.get('Meta_PDI', '')
+
+        # Información en badges (un solo bloque HTML)
+        badges = "".join([
+            _badge("Línea", linea_seleccionada),
+            _badge("Periodicidad", periodicidad if periodicidad else 'N/D'),
+            _badge("Sentido", f"{'📈' if sentido == 'Creciente' else '📉'} {sentido}"),
+            _badge("Meta PDI", meta_pdi if meta_pdi else 'N/D'),
+        ])
+        st.markdown(f'<div style="display: flex; gap: 8px;">{badges}</div>', unsafe_allow_html=True)
 
     with col_estado:
         # Estado actual (último año)
-        año_actual = df_indicador['Año'].max() if 'Año' in df_indicador.columns else 2025
-        df_actual = df_indicador[df_indicador['Año'] == año_actual] if 'Año' in df_indicador.columns else df_indicador
+        # Las filas vienen ordenadas por Año (indexar_por_indicador): el último
+        # año se recorta con búsqueda binaria en lugar de una máscara completa
+        if 'Año' in df_indicador.columns and not df_indicador.empty:
+            años = df_indicador['Año'].to_numpy()
+            año_actual = df_indicador['Año'].max()
+            inicio = np.searchsorted(años, año_actual, side='left')
+            fin = np.searchsorted(años, año_actual, side='right')
+            df_actual = df_indicador.iloc[inicio:fin]
+        else:
+            año_actual = 2025
+            df_actual = df_indicador
 
         cumplimiento_actual = 0
         if 'Cumplimiento' in df_actual.columns and not df_actual.empty:
             cumplimiento_actual = df_actual['Cumplimiento'].mean()
             cumplimiento_actual = cumplimiento_actual if pd.notna(cumplimiento_actual) else 0
 
-        color = obtener_color_semaforo(cumplimiento_actual)
-
-        st.markdown(f"""
-        <div style="
-            text-align: center;
-            padding: 25px;
-            background: {color};
-            color: {'#333' if color == COLORS['warning'] else 'white'};
-            border-radius: 15px;
-            box-shadow: 0 4px 6px rgba(0,0,0,0.15);
-        ">
-            <div style="font-size: 12px; opacity: 0.9; text-transform: uppercase;">
-                Cumplimiento {int(año_actual)}
-            </div>
-            <div style="font-size: 48px; font-weight: bold; margin: 10px 0;">
-                {cumplimiento_actual:.1f}%
-            </div>
-            <div style="font-size: 14px;">
-                {'✅ Meta cumplida' if cumplimiento_actual >= 100 else '⚠️ Alerta' if cumplimiento_actual >= 80 else '❌ Peligro'}
-            </div>
-        </div>
-        """, unsafe_allow_html=True)
-
-    st.markdown("---")
+        st.markdown(
+            _estado_actual_html(float(cumplimiento_actual), int(año_actual)),
+            unsafe_allow_html=True
+        )
 
     # Obtener histórico completo con manejo de periodicidad
-    df_historico, periodicidad_ind, sentido_ind, unidad_meta, unidad_ejec = obtener_historico_indicador_completo(
-        df_unificado, df_base, indicador_seleccionado
+    df_historico, periodicidad_ind, sentido_ind, unidad_meta, unidad_ejec = _historico_indicador(
+        version, df_unificado, df_base, indicador_seleccionado
     )
 
     # Actualizar variables de sentido y periodicidad
@@ -228,107 +460,51 @@ def mostrar_pagina():
 
     # Gráfico histórico
     titulo_periodo = "Evolución Histórica (Semestral)" if periodicidad.lower() == 'semestral' else "Evolución Histórica 2021-2025"
-    st.markdown(f"### 📊 {titulo_periodo}")
+    st.markdown(f"---\n\n### 📊 {titulo_periodo}")
 
     if not df_historico.empty:
         # Crear gráfico con los nuevos parámetros
-        fig = crear_grafico_historico(
-            df_historico,
-            indicador_seleccionado,
-            sentido=sentido,
-            unidad=unidad_meta,
-            periodicidad=periodicidad,
-            linea_estrategica=linea_seleccionada
+        fig = _figura_historico(
+            version, df_unificado, df_base, indicador_seleccionado,
+            sentido, unidad_meta, periodicidad, linea_seleccionada
         )
         config = {'displayModeBar': True, 'responsive': True}
-        st.plotly_chart(fig, use_container_width=True, config=config)
+        # Key estable: el frontend actualiza la figura en lugar de recrearla
+        st.plotly_chart(fig, use_container_width=True, config=config, key="detalle_historico")
 
         # Info del indicador
         st.info(f"**Sentido:** {sentido} {'(Mayor es mejor)' if sentido == 'Creciente' else '(Menor es mejor)'} | **Periodicidad:** {periodicidad} | **Unidad:** {unidad_meta if unidad_meta else 'N/D'}")
 
         # Gráfico de tendencia adicional
         with st.expander("📈 Ver gráfico de tendencia de cumplimiento"):
-            fig_tendencia = crear_grafico_tendencia(df_historico, indicador_seleccionado)
+            fig_tendencia = _figura_tendencia(version, df_unificado, df_base, indicador_seleccionado)
             config = {'displayModeBar': True, 'responsive': True}
-            st.plotly_chart(fig_tendencia, use_container_width=True, config=config)
+            st.plotly_chart(fig_tendencia, use_container_width=True, config=config, key="detalle_tendencia")
     else:
         st.warning("No hay datos históricos disponibles para este indicador.")
 
-    st.markdown("---")
-
-    # Análisis con IA
-    st.markdown("### 🤖 Análisis Inteligente del Indicador")
+    # Análisis con IA (separador y título en un solo bloque)
+    st.markdown("---\n\n### 🤖 Análisis Inteligente del Indicador")
 
     with st.expander("Ver análisis generado por IA", expanded=True):
         with st.spinner("Analizando indicador..."):
-            # Preparar datos históricos
-            historico_data = preparar_historico_para_analisis(df_historico if 'df_historico' in dir() else df_indicador)
-
-            analisis = generar_analisis_indicador(
-                nombre_indicador=indicador_seleccionado,
-                linea=linea_seleccionada,
-                descripcion=descripcion,
-                historico_data=historico_data,
-                sentido=sentido
+            analisis_html = _analisis_html(
+                version, df_unificado, df_base, df_unificado_por_ind,
+                indicador_seleccionado, linea_seleccionada, descripcion, sentido
             )
 
-            # Convertir markdown a HTML para renderizado correcto
-            analisis_html = re.sub(r'\*\*([^*]+)\*\*', r'<strong>\1</strong>', analisis)
-            analisis_html = analisis_html.replace('\n', '<br>')
-
             st.markdown(f"""
             <div class="ai-analysis">
                 {analisis_html}
             </div>
             """, unsafe_allow_html=True)
 
-    st.markdown("---")
-
     # Tabla de datos históricos detallados
-    st.markdown("### 📋 Datos Históricos Detallados")
-
-    # Preparar tabla usando df_historico que ya tiene los datos filtrados
-    if not df_historico.empty:
-        df_tabla = df_historico.copy()
-
-        # Calcular cumplimiento con sentido
-        df_tabla['Cumplimiento_calc'] = df_tabla.apply(
-            lambda x: calcular_cumplimiento(x['Meta'], x['Ejecución'], sentido),
-            axis=1
-        )
-
-        # Agregar estado
-        df_tabla['Estado'] = df_tabla['Cumplimiento_calc'].apply(
-            lambda x: '✅ Meta cumplida' if pd.notna(x) and x >= 100 else '⚠️ Alerta' if pd.notna(x) and x >= 80 else '❌ Peligro' if pd.notna(x) else 'N/D'
-        )
-
-        # Agregar nota para línea base
-        df_tabla['Nota'] = df_tabla['Periodo'].apply(
-            lambda x: 'Linea Base' if str(x) in ['2021', '2021-1'] else ''
-        )
-
-        # Formatear columnas
-        def formatear_con_unidad(valor, unidad):
-            if pd.isna(valor):
-                return "N/D"
-            if unidad == '%':
-                return f"{valor:.1f}%"
-            elif unidad == '$':
-                return f"${valor:,.0f}"
-            elif unidad == 'ENT':
-                return f"{valor:,.0f}"
-            else:
-                return f"{valor:.2f}"
-
-        df_tabla['Meta_fmt'] = df_tabla['Meta'].apply(lambda x: formatear_con_unidad(x, unidad_meta))
-        df_tabla['Ejecucion_fmt'] = df_tabla['Ejecución'].apply(lambda x: formatear_con_unidad(x, unidad_ejec))
-        df_tabla['Cumplimiento_fmt'] = df_tabla['Cumplimiento_calc'].apply(lambda x: f"{x:.1f}%" if pd.notna(x) else "N/D")
-
-        # Seleccionar y renombrar columnas para mostrar
-        columnas_mostrar = ['Periodo', 'Meta_fmt', 'Ejecucion_fmt', 'Cumplimiento_fmt', 'Estado', 'Nota']
-        df_display = df_tabla[columnas_mostrar].copy()
-        df_display.columns = ['Periodo', 'Meta', 'Ejecucion', 'Cumplimiento', 'Estado', 'Nota']
+    st.markdown("---\n\n### 📋 Datos Históricos Detallados")
 
+    # Tabla preparada a partir de df_historico (cacheada por selección)
+    df_display = _tabla_indicador(version, df_unificado, df_base, indicador_seleccionado, sentido)
+    if not df_display.empty:
         st.dataframe(
             df_display,
             use_container_width=True,
@@ -345,97 +521,52 @@ def mostrar_pagina():
     with col_comp:
         st.markdown("### 🔄 Comparar con otro indicador")
 
-        # Selector para comparación
-        otros_indicadores = [i for i in indicadores_disponibles if i != indicador_seleccionado]
+        # La comparación (selector y figura) solo se construye si se pide
+        if st.checkbox("Mostrar comparación", key="comparar_detalle"):
+            otros_indicadores = _otros_indicadores(tuple(indicadores_disponibles), indicador_seleccionado)
 
-        if otros_indicadores:
-            indicador_comparar = st.selectbox(
-                "Seleccione indicador para comparar:",
-                ["Ninguno"] + otros_indicadores
-            )
+            if otros_indicadores:
+                indicador_comparar = st.selectbox(
+                    "Seleccione indicador para comparar:",
+                    ["Ninguno"] + list(otros_indicadores)
+                )
 
-            if indicador_comparar != "Ninguno":
-                df_comparar = df_unificado[df_unificado['Indicador'] == indicador_comparar].copy()
-
-                if not df_comparar.empty and 'Año' in df_comparar.columns:
-                    df_comp = df_comparar.groupby('Año').agg({
-                        'Cumplimiento': 'mean'
-                    }).reset_index()
-                    df_comp = df_comp.sort_values('Año')
-
-                    # Gráfico de comparación
-                    fig_comp = go.Figure()
-
-                    # Indicador principal
-                    if 'df_historico' in dir():
-                        fig_comp.add_trace(go.Scatter(
-                            x=df_historico['Año'],
-                            y=df_historico['Cumplimiento'],
-                            name=indicador_seleccionado[:30] + "...",
-                            line=dict(color=COLORS['primary'], width=3),
-                            marker=dict(size=10)
-                        ))
-
-                    # Indicador de comparación
-                    fig_comp.add_trace(go.Scatter(
-                        x=df_comp['Año'],
-                        y=df_comp['Cumplimiento'],
-                        name=indicador_comparar[:30] + "...",
-                        line=dict(color=COLORS['accent'], width=3, dash='dash'),
-                        marker=dict(size=10)
-                    ))
-
-                    fig_comp.update_layout(
-                        title="Comparación de Cumplimiento",
-                        xaxis_title="Año",
-                        yaxis_title="% Cumplimiento",
-                        yaxis=dict(range=[0, 120]),
-                        height=350,
-                        plot_bgcolor='white',
-                        legend=dict(
-                            orientation="h",
-                            yanchor="bottom",
-                            y=-0.3,
-                            xanchor="center",
-                            x=0.5
-                        )
-                    )
+                if indicador_comparar != "Ninguno":
+                    df_comp = _cumplimiento_anual(version, df_unificado_por_ind, indicador_comparar)
 
-                    config = {'displayModeBar': True, 'responsive': True}
-                    st.plotly_chart(fig_comp, use_container_width=True, config=config)
-        else:
-            st.info("No hay otros indicadores disponibles para comparar.")
+                    if not df_comp.empty:
+                        fig_comp = _figura_comparacion(
+                            version, df_unificado, df_base, df_unificado_por_ind,
+                            indicador_seleccionado, indicador_comparar
+                        )
+                        config = {'displayModeBar': True, 'responsive': True}
+                        st.plotly_chart(fig_comp, use_container_width=True, config=config, key="detalle_comparacion")
+            else:
+                st.info("No hay otros indicadores disponibles para comparar.")
 
     with col_export:
         st.markdown("### 📥 Exportar Datos")
 
-        if st.button("📊 Preparar Excel del Indicador", use_container_width=True):
-            try:
-                buffer = io.BytesIO()
-                with pd.ExcelWriter(buffer, engine='openpyxl') as writer:
-                    # Datos del indicador
-                    df_indicador.to_excel(writer, sheet_name='Datos_Indicador', index=False)
-
-                    # Resumen histórico
-                    if 'df_historico' in dir() and not df_historico.empty:
-                        df_historico.to_excel(writer, sheet_name='Resumen_Historico', index=False)
-
-                st.download_button(
-                    label="⬇️ Descargar Excel",
-                    data=buffer.getvalue(),
-                    file_name=f"indicador_{indicador_seleccionado[:20]}_{datetime.now().strftime('%Y%m%d')}.xlsx",
-                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-                )
-            except Exception as e:
-                st.error(f"Error al generar Excel: {str(e)}")
+        try:
+            st.download_button(
+                label="⬇️ Descargar Excel del Indicador",
+                data=_excel_indicador(version, df_unificado, df_base, df_unificado_por_ind, indicador_seleccionado),
+                file_name=f"indicador_{indicador_seleccionado[:20]}_{datetime.now().strftime('%Y%m%d')}.xlsx",
+                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                use_container_width=True
+            )
+        except Exception as e:
+            st.error(f"Error al generar Excel: {str(e)}")
 
         if st.button("🔄 Regenerar Análisis IA", use_container_width=True):
             st.cache_data.clear()
+            limpiar_cache_ia()
             st.rerun()
 
     # Información adicional
-    st.markdown("---")
     st.markdown(f"""
+    ---
+
     <div class="info-box">
         <strong>📌 Información del análisis:</strong>
         <ul>